@@ -1,6 +1,7 @@
 import sqlite3
 import pandas as pd
 import database # Import database module to get connection function
+import analytics # Score-bucket aggregation (DuckDB or SQLite/pandas)
 from datetime import datetime, timedelta
 import numpy as np # For handling potential NaN/Inf
 import config # Import config for log file path
@@ -11,22 +12,6 @@ import sys # Import sys
 logger = setup_logger('analysis', config.LOG_FILE_ANALYSIS)
 # -------------
 
-# Define score buckets for analysis
-SCORE_BUCKETS = [
-    (-float('inf'), -2), # Very Low
-    (-2, 0),             # Low
-    (0, 2),              # Neutral
-    (2, 4),              # High
-    (4, float('inf'))    # Very High
-]
-BUCKET_LABELS = [
-    "Score < -2",
-    "-2 <= Score < 0",
-    "0 <= Score < 2",
-    "2 <= Score < 4",
-    "Score >= 4"
-]
-
 def analyze_performance(days_history=30):
     """
     Analyzes the relationship between calculated scores and next-day performance.
@@ -44,45 +29,19 @@ def analyze_performance(days_history=30):
     end_date_str = end_date.strftime('%Y-%m-%d') # Although we usually score for D-1, query up to today
 
     try:
-        # Query relevant data
-        query = """
-            SELECT
-                date,
-                score,
-                next_day_perf_pct
-            FROM daily_scores
-            WHERE date >= ? AND date <= ? AND next_day_perf_pct IS NOT NULL
-        """
-        cursor.execute(query, (start_date, end_date_str))
-        data = cursor.fetchall()
+        # Bucket averages of next-day performance (DuckDB or SQLite/pandas, see analytics.py)
+        engine = analytics.open_engine()
+        try:
+            analysis = engine.score_buckets(start_date, end_date_str)
+        finally:
+            engine.close()
+        logger.info(f"Aggregated with the {engine.name} analytics engine.")
 
-        if not data:
+        if analysis['count'].sum() == 0:
             logger.warning("No score data with next-day performance found in the specified date range.")
             conn.close()
             return
 
-        # Load into pandas DataFrame
-        df = pd.DataFrame(data, columns=['date', 'score', 'next_day_perf_pct'])
-
-        # Handle potential non-finite values just in case
-        df.replace([np.inf, -np.inf], np.nan, inplace=True)
-        df.dropna(subset=['score', 'next_day_perf_pct'], inplace=True)
-
-        if df.empty:
-            logger.warning("No valid score data with next-day performance found after cleaning.")
-            conn.close()
-            return
-
-        # Create score buckets
-        bins = [b[0] for b in SCORE_BUCKETS] + [SCORE_BUCKETS[-1][1]]
-        df['score_bucket'] = pd.cut(df['score'], bins=bins, labels=BUCKET_LABELS, right=False)
-
-        # Group by bucket and calculate stats
-        analysis = df.groupby('score_bucket', observed=False).agg(
-            average_next_day_perf=('next_day_perf_pct', 'mean'),
-            count=('score', 'size')
-        )
-
         logger.info("\n--- Performance Analysis Results ---")
         # Log the DataFrame - consider logging analysis.to_string() for better formatting in logs
         logger.info(f"\n{analysis.to_string()}")
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import time
+import config # Import the config file
+from json_store import JsonFileStore
+
+
+def normalize_url(url):
+    """URL with surrounding whitespace, trailing slashes and case differences removed."""
+    return (url or '').strip().rstrip('/').lower()
+
+def normalize_results(search_results):
+    """
+    Returns the (url, snippet) pairs that identify a search-result set, independent of
+    result order, URL case/trailing slashes and snippet whitespace.
+    """
+    pairs = set()
+    for result in search_results:
+        url = normalize_url(result.get('url'))
+        snippet = ' '.join((result.get('snippet') or '').split())
+        pairs.add((url, snippet))
+    return sorted(pairs)
+
+def analysis_key(ticker, company_name, search_results, model_name, prompt_version):
+    """SHA-256 of everything that determines the analysis prompt and the model that answers it."""
+    payload = json.dumps({
+        'ticker': ticker,
+        'company_name': company_name,
+        'results': normalize_results(search_results),
+        'model': model_name,
+        'prompt_version': prompt_version,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache(JsonFileStore):
+    """
+    On-disk cache of Gemini analyses keyed by a hash of the analysis inputs.
+
+    When a ticker's search results (URLs + snippets), the model name and the prompt
+    version are the same as in an earlier run, the stored summary, bullish/bearish
+    points and sentiment score are reused instead of calling Gemini again. Only
+    successfully parsed analyses are stored. Entries not used for
+    ANALYSIS_CACHE_MAX_AGE_DAYS are dropped on save().
+
+    File layout: {key: {"analysis": {...}, "ticker": ..., "created_at": unix_seconds, "last_used": unix_seconds}}
+    """
+
+    label = "analysis cache"
+
+    def __init__(self, path=None, max_age_days=None):
+        super().__init__(path or config.ANALYSIS_CACHE_FILE)
+        self.max_age_seconds = (max_age_days or config.ANALYSIS_CACHE_MAX_AGE_DAYS) * 86400
+        self.hits = 0
+        self.misses = 0
+        self._call_seconds = [] # Duration of the Gemini calls made on misses
+
+    def _prune(self):
+        """Drops entries not used for ANALYSIS_CACHE_MAX_AGE_DAYS (runs on save())."""
+        cutoff = time.time() - self.max_age_seconds
+        self._entries = {key: entry for key, entry in self._entries.items() if entry['last_used'] >= cutoff}
+
+    def get(self, key):
+        """Returns a copy of the cached analysis for key (recording a hit) or None (recording a miss)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry['last_used'] = time.time()
+            return json.loads(json.dumps(entry['analysis'])) # Callers may modify the result
+
+    def put(self, key, ticker, analysis, call_seconds=None):
+        """Stores a successful analysis; call_seconds is the Gemini latency it cost, for the savings estimate."""
+        now = time.time()
+        with self._lock:
+            self._entries[key] = {'analysis': analysis, 'ticker': ticker, 'created_at': now, 'last_used': now}
+            if call_seconds is not None:
+                self._call_seconds.append(call_seconds)
+
+    def log_stats(self, logger):
+        """Logs the hit rate, the Gemini calls saved and an estimate of the call time saved."""
+        total = self.hits + self.misses
+        if total:
+            saved_text = ""
+            if self._call_seconds and self.hits:
+                avg_call = sum(self._call_seconds) / len(self._call_seconds)
+                saved_text = f", ~{self.hits * avg_call:.0f}s of Gemini time saved (avg call {avg_call:.2f}s)"
+            logger.info(f"Analysis cache: {self.hits} hits, {self.misses} misses ({self.hits / total:.0%} hit rate); {self.hits} Gemini analysis calls saved{saved_text}.")
+        logger.info(f"Analysis cache holds {len(self._entries)} entries ({self.path}).")
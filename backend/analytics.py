@@ -0,0 +1,197 @@
+"""
+Analytics queries over stocks.db: score-bucket performance, cross-sectional score
+quantiles per date (the backtest building block) and trailing returns across all tickers.
+
+Two interchangeable engines:
+- DuckDBAnalytics attaches the SQLite file read-only to an in-process DuckDB and runs
+  each aggregation as one vectorized SQL query (`pip install duckdb`; the sqlite
+  extension is installed on first use).
+- PandasAnalytics reads the rows through a read-only SQLite connection and aggregates
+  them in pandas. Used when DuckDB is not installed.
+
+Both return the same DataFrames. ANALYTICS_ENGINE picks one ('auto' = DuckDB if available).
+"""
+import numpy as np
+import pandas as pd
+try:
+    import duckdb
+except ImportError: # Optional: without duckdb the pandas engine is used
+    duckdb = None
+import config # Import the config file
+import database # Import database functions
+from log_setup import setup_logger # Import logger setup
+
+# --- Logger ---
+logger = setup_logger('analysis', config.LOG_FILE_ANALYSIS)
+# -------------
+
+# Score buckets of the performance analysis: (lower bound inclusive, upper bound exclusive, label)
+SCORE_BUCKETS = [
+    (-float('inf'), -2, "Score < -2"),
+    (-2, 0, "-2 <= Score < 0"),
+    (0, 2, "0 <= Score < 2"),
+    (2, 4, "2 <= Score < 4"),
+    (4, float('inf'), "Score >= 4"),
+]
+BUCKET_LABELS = [label for _, _, label in SCORE_BUCKETS]
+
+
+def _bucket_frame(stats):
+    """Indexes per-bucket stats by label, in bucket order, with empty buckets kept (count 0)."""
+    frame = pd.DataFrame(stats, columns=['bucket', 'average_next_day_perf', 'count'])
+    # Explicit dtypes: an empty range gives object columns, which fillna would downcast (FutureWarning)
+    frame = frame.astype({'bucket': int, 'average_next_day_perf': float, 'count': float}).set_index('bucket')
+    frame = frame.reindex(range(len(SCORE_BUCKETS)))
+    frame['count'] = frame['count'].fillna(0).astype(int)
+    frame.index = pd.CategoricalIndex(BUCKET_LABELS, categories=BUCKET_LABELS, ordered=True, name='score_bucket')
+    return frame
+
+def _quantile_frame(frame):
+    return frame.sort_values(['date', 'quantile']).reset_index(drop=True)
+
+
+class DuckDBAnalytics:
+    """Aggregations as DuckDB SQL over the attached SQLite database (read-only)."""
+    name = 'duckdb'
+
+    def __init__(self, db_path=None):
+        self.con = duckdb.connect()
+        self.con.execute("INSTALL sqlite")
+        self.con.execute("LOAD sqlite")
+        path = (db_path or database.DATABASE_NAME).replace("'", "''")
+        self.con.execute(f"ATTACH '{path}' AS stocks (TYPE sqlite, READ_ONLY)")
+
+    def close(self):
+        self.con.close()
+
+    def score_buckets(self, start_date, end_date):
+        case = " ".join(f"WHEN score < {upper} THEN {i}" for i, (_, upper, _) in enumerate(SCORE_BUCKETS[:-1]))
+        rows = self.con.execute(f"""
+            SELECT CASE {case} ELSE {len(SCORE_BUCKETS) - 1} END AS bucket,
+                   AVG(next_day_perf_pct) AS average_next_day_perf,
+                   COUNT(*) AS count
+            FROM stocks.daily_scores
+            WHERE date >= ? AND date <= ?
+              AND isfinite(score) AND isfinite(next_day_perf_pct)
+            GROUP BY bucket
+        """, [start_date, end_date]).fetchall()
+        return _bucket_frame(rows)
+
+    def score_quantiles(self, start_date, end_date, n_quantiles=10):
+        frame = self.con.execute("""
+            WITH ranked AS (
+                SELECT date, next_day_perf_pct,
+                       RANK() OVER (PARTITION BY date ORDER BY score) AS score_rank,
+                       COUNT(*) OVER (PARTITION BY date) AS n
+                FROM stocks.daily_scores
+                WHERE date >= ? AND date <= ?
+                  AND isfinite(score) AND isfinite(next_day_perf_pct)
+            )
+            SELECT date,
+                   CAST(LEAST(?, FLOOR((score_rank - 1) * ? / n)) AS INTEGER) + 1 AS quantile,
+                   AVG(next_day_perf_pct) AS average_next_day_perf,
+                   COUNT(*) AS count
+            FROM ranked
+            GROUP BY date, quantile
+        """, [start_date, end_date, n_quantiles - 1, n_quantiles]).df()
+        return _quantile_frame(frame)
+
+    def trailing_returns(self, start_date, end_date, window=20):
+        frame = self.con.execute(f"""
+            WITH returns AS (
+                SELECT ticker, date,
+                       close_price / LAG(close_price, {int(window)}) OVER (PARTITION BY ticker ORDER BY date) - 1 AS trailing_return
+                FROM stocks.price_history
+                WHERE date <= ?
+            )
+            SELECT ticker, date, trailing_return
+            FROM returns
+            WHERE date >= ? AND trailing_return IS NOT NULL
+            ORDER BY ticker, date
+        """, [end_date, start_date]).df()
+        return frame
+
+
+class PandasAnalytics:
+    """The same aggregations on rows read from SQLite and grouped in pandas."""
+    name = 'pandas'
+
+    def __init__(self, db_path=None):
+        self.conn = database.connect(db_path, readonly=True)
+
+    def close(self):
+        self.conn.close()
+
+    def _scores(self, start_date, end_date):
+        cursor = self.conn.cursor()
+        cursor.row_factory = None # Plain tuples load much faster than sqlite3.Row
+        cursor.execute("""
+            SELECT date, score, next_day_perf_pct
+            FROM daily_scores
+            WHERE date >= ? AND date <= ? AND next_day_perf_pct IS NOT NULL
+        """, (start_date, end_date))
+        df = pd.DataFrame(cursor.fetchall(), columns=['date', 'score', 'next_day_perf_pct'])
+        df = df.replace([np.inf, -np.inf], np.nan).dropna(subset=['score', 'next_day_perf_pct'])
+        return df
+
+    def score_buckets(self, start_date, end_date):
+        df = self._scores(start_date, end_date)
+        bins = [lower for lower, _, _ in SCORE_BUCKETS] + [SCORE_BUCKETS[-1][1]]
+        df['bucket'] = pd.cut(df['score'], bins=bins, labels=False, right=False)
+        stats = df.groupby('bucket').agg(average_next_day_perf=('next_day_perf_pct', 'mean'), count=('score', 'size'))
+        return _bucket_frame(stats.reset_index().to_numpy().tolist())
+
+    def score_quantiles(self, start_date, end_date, n_quantiles=10):
+        df = self._scores(start_date, end_date)
+        by_date = df.groupby('date')['score']
+        score_rank = by_date.rank(method='min')
+        n = by_date.transform('size')
+        df['quantile'] = (np.minimum(n_quantiles - 1, np.floor((score_rank - 1) * n_quantiles / n)) + 1).astype(np.int32)
+        frame = df.groupby(['date', 'quantile'], as_index=False).agg(
+            average_next_day_perf=('next_day_perf_pct', 'mean'), count=('score', 'size'))
+        return _quantile_frame(frame)
+
+    def trailing_returns(self, start_date, end_date, window=20):
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        cursor.execute("SELECT ticker, date, close_price FROM price_history WHERE date <= ? ORDER BY ticker, date", (end_date,))
+        df = pd.DataFrame(cursor.fetchall(), columns=['ticker', 'date', 'close_price'])
+        df['trailing_return'] = df['close_price'] / df.groupby('ticker')['close_price'].shift(window) - 1
+        df = df[(df['date'] >= start_date) & df['trailing_return'].notna()]
+        return df[['ticker', 'date', 'trailing_return']].reset_index(drop=True)
+
+
+ENGINES = {'duckdb': DuckDBAnalytics, 'pandas': PandasAnalytics}
+
+def duckdb_available():
+    return duckdb is not None
+
+def open_engine(name=None, db_path=None):
+    """
+    Opens an analytics engine on db_path (default DATABASE_NAME). Close it when done.
+
+    Args:
+        name (str): 'duckdb', 'pandas' or 'auto' (default ANALYTICS_ENGINE); 'auto'
+            uses DuckDB when it is installed.
+    """
+    name = name or config.ANALYTICS_ENGINE
+    if name == 'auto':
+        if duckdb_available():
+            try:
+                return DuckDBAnalytics(db_path)
+            except duckdb.Error as e: # e.g. the sqlite extension cannot be downloaded on an offline host
+                logger.warning(f"DuckDB analytics unavailable ({e}); using the pandas engine.")
+        return PandasAnalytics(db_path)
+    if name == 'duckdb' and not duckdb_available():
+        raise RuntimeError("ANALYTICS_ENGINE is 'duckdb' but the duckdb package is not installed (pip install duckdb).")
+    return ENGINES[name](db_path)
+
+
+def long_short_returns(quantiles):
+    """
+    Daily top-minus-bottom quantile spread of next-day performance (in %) from
+    score_quantiles output, with the compounded equity curve of that spread.
+    """
+    by_date = quantiles.pivot(index='date', columns='quantile', values='average_next_day_perf')
+    spread = by_date[by_date.columns.max()] - by_date[by_date.columns.min()]
+    return pd.DataFrame({'spread_pct': spread, 'equity': (1 + spread.fillna(0) / 100).cumprod()})
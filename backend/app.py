@@ -32,45 +32,46 @@ def index():
 @app.route('/api/highlighted-stocks')
 def get_highlighted_stocks():
     """API endpoint to get the highlighted stocks for the latest scored date."""
-    conn = database.get_db_connection()
+    conn = database.get_db_connection(readonly=True)
     cursor = conn.cursor()
 
     try:
-        # Find the most recent date for which scores exist
-        cursor.execute("SELECT MAX(date) FROM daily_scores")
+        # Find the most recent date for which scores exist (ticker_latest holds one row per ticker)
+        cursor.execute("SELECT MAX(score_date) FROM ticker_latest")
         latest_date_row = cursor.fetchone()
         if not latest_date_row or not latest_date_row[0]:
             logger.warning("No scores found in the database for /api/highlighted-stocks")
+            conn.close()
             return jsonify([]) # Return empty list if no scores yet
 
         latest_date = latest_date_row[0]
         logger.info(f"Fetching highlighted stocks for date: {latest_date}")
 
-        # Fetch scores and company info for the latest date
+        # Fetch scores and company info for the tickers scored on the latest date
         cursor.execute("""
             SELECT
-                ds.ticker,
+                tl.ticker,
                 c.name,
                 c.sector,
-                ds.score,
-                ds.price_change_pct,
-                ds.volume_ratio,
-                ds.avg_sentiment,
-                ds.pe_ratio,
-                ds.dividend_yield,
-                ds.price_vs_ma50,
-                ds.rsi,
-                ds.macd_signal,
-                ds.bbands_signal,
-                ds.debt_to_equity,
-                ds.pb_ratio,
-                ds.ps_ratio,
-                ds.price_vs_ma200,
-                ds.atr_value -- Add ATR value column
-            FROM daily_scores ds
-            JOIN companies c ON ds.ticker = c.ticker
-            WHERE ds.date = ?
-            ORDER BY ds.score DESC -- Default sort by score descending
+                tl.score,
+                tl.price_change_pct,
+                tl.volume_ratio,
+                tl.avg_sentiment,
+                tl.pe_ratio,
+                tl.dividend_yield,
+                tl.price_vs_ma50,
+                tl.rsi,
+                tl.macd_signal,
+                tl.bbands_signal,
+                tl.debt_to_equity,
+                tl.pb_ratio,
+                tl.ps_ratio,
+                tl.price_vs_ma200,
+                tl.atr_value -- Add ATR value column
+            FROM ticker_latest tl
+            JOIN companies c ON tl.ticker = c.ticker
+            WHERE tl.score_date = ?
+            ORDER BY tl.score DESC -- Default sort by score descending
         """, (latest_date,))
 
         # Convert rows to dicts and handle non-JSON serializable values (Infinity, NaN)
@@ -97,7 +98,7 @@ def get_highlighted_stocks():
 def get_stock_details(ticker):
     """API endpoint to get details for a specific stock."""
     ticker = ticker.upper() # Ensure ticker is uppercase
-    conn = database.get_db_connection()
+    conn = database.get_db_connection(readonly=True)
     cursor = conn.cursor()
 
     details = {'ticker': ticker}
@@ -169,7 +170,7 @@ def get_stock_details(ticker):
 @app.route('/api/portfolio', methods=['GET'])
 def get_portfolio():
     """API endpoint to get all portfolio holdings."""
-    conn = database.get_db_connection()
+    conn = database.get_db_connection(readonly=True)
     cursor = conn.cursor()
     try:
         # Fetch portfolio holdings along with company name and latest price/score for context
@@ -177,12 +178,11 @@ def get_portfolio():
             SELECT
                 p.id, p.ticker, p.quantity, p.purchase_price, p.purchase_date,
                 c.name,
-                (SELECT close_price FROM price_history ph
-                 WHERE ph.ticker = p.ticker ORDER BY ph.date DESC LIMIT 1) as latest_price,
-                (SELECT score FROM daily_scores ds
-                 WHERE ds.ticker = p.ticker ORDER BY ds.date DESC LIMIT 1) as latest_score
+                tl.close_price as latest_price,
+                tl.score as latest_score
             FROM portfolio p
             JOIN companies c ON p.ticker = c.ticker
+            LEFT JOIN ticker_latest tl ON tl.ticker = p.ticker
             ORDER BY p.purchase_date DESC, p.ticker ASC
         """)
         portfolio_data = [dict(row) for row in cursor.fetchall()]
@@ -0,0 +1,363 @@
+"""
+Asynchronous Brave + Gemini analysis pipeline.
+
+Runs the same steps as gemini_analyzer.get_analysis_for_stock (plan queries, search,
+analyze) for many tickers at once on one asyncio event loop:
+
+- up to ANALYSIS_MAX_TICKERS_IN_FLIGHT tickers are generating queries / searching at a time;
+- a ticker's Brave searches run concurrently instead of one after another;
+- every Brave / Gemini call goes through the API's shared fetch_engine.UpstreamController
+  (token-bucket rate limit, adaptive concurrency capped by ANALYSIS_CONCURRENCY,
+  backoff with jitter on 429s and transient errors, circuit breaker);
+- Brave requests reuse keep-alive connections from one pooled requests.Session (run in
+  worker threads, since requests is blocking); Gemini calls use the SDK's native
+  generate_content_async;
+- with ANALYSIS_BATCH_SIZE > 1, tickers whose results are ready are packed into
+  multi-ticker analysis requests (AnalysisBatcher).
+
+Per-stage latency statistics are logged when the run finishes.
+"""
+import asyncio
+import contextlib
+import statistics
+import time
+from collections import defaultdict
+import requests
+from requests.adapters import HTTPAdapter
+import config # Import the config file
+import fetch_engine # Shared per-upstream rate limiters
+import gemini_analyzer # Prompts, parsing and the Gemini models
+from log_setup import pipeline_logger # Import logger setup
+
+# --- Logger ---
+logger = pipeline_logger(__name__)
+# -------------
+
+
+class LatencyStats:
+    """Collects durations per named stage and logs count / mean / p50 / p95 / max."""
+
+    def __init__(self):
+        self._samples = defaultdict(list)
+
+    def record(self, stage, seconds):
+        self._samples[stage].append(seconds)
+
+    def summary(self):
+        """Returns {stage: {'count', 'mean', 'p50', 'p95', 'max', 'total'}} in seconds."""
+        result = {}
+        for stage, samples in self._samples.items():
+            ordered = sorted(samples)
+            result[stage] = {
+                'count': len(ordered),
+                'mean': statistics.fmean(ordered),
+                'p50': ordered[len(ordered) // 2],
+                'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                'max': ordered[-1],
+                'total': sum(ordered),
+            }
+        return result
+
+    def log(self, log=logger):
+        for stage, s in self.summary().items():
+            log.info(f"Latency '{stage}': n={s['count']}, mean {s['mean']:.2f}s, p50 {s['p50']:.2f}s, p95 {s['p95']:.2f}s, max {s['max']:.2f}s.")
+
+
+def create_brave_session(pool_size=None):
+    """Returns a requests.Session whose connection pool holds enough keep-alive connections for the Brave cap."""
+    pool_size = pool_size or config.ANALYSIS_CONCURRENCY['brave']
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(gemini_analyzer.BRAVE_HEADERS)
+    return session
+
+
+class AnalysisBatcher:
+    """
+    Packs the analysis requests of several tickers into one Gemini prompt.
+
+    Tickers join the pending batch as their search results come in. The batch is sent
+    when it holds batch_size tickers, when the next ticker would push the estimated
+    prompt size over ANALYSIS_BATCH_TOKEN_BUDGET, or ANALYSIS_BATCH_MAX_WAIT_SECONDS
+    after its first ticker arrived. Each ticker's section of the JSON reply is validated
+    on its own; only tickers whose section is missing or malformed are retried with a
+    single-ticker request. When the request itself fails (the controller already retried
+    it), the batch's tickers are marked failed instead, so a throttled API does not get
+    one request per ticker; the pipeline's retry passes pick them up later.
+    """
+
+    def __init__(self, analyzer, batch_size, token_budget=None, max_wait=None):
+        self.analyzer = analyzer
+        self.batch_size = batch_size
+        self.token_budget = token_budget or config.ANALYSIS_BATCH_TOKEN_BUDGET
+        self.max_wait = config.ANALYSIS_BATCH_MAX_WAIT_SECONDS if max_wait is None else max_wait
+        self._pending = [] # [((ticker, company_name, search_results), future)]
+        self._pending_tokens = 0
+        self._timer = None
+        self._tasks = set() # Keeps running batch tasks referenced until they finish
+        self.batch_calls = 0
+        self.batched_tickers = 0
+        self.retried = 0
+        self.failed = 0
+
+    async def submit(self, ticker, company_name, search_results):
+        """Queues one ticker and waits for its (analysis, ok, call_seconds)."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        tokens = gemini_analyzer.estimate_tokens(gemini_analyzer.build_batch_section(ticker, company_name, search_results))
+        if self._pending and self._pending_tokens + tokens > self.token_budget:
+            self._flush()
+        self._pending.append(((ticker, company_name, search_results), future))
+        self._pending_tokens += tokens
+        if len(self._pending) >= self.batch_size or self._pending_tokens >= self.token_budget:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        try:
+            if len(batch) == 1:
+                (ticker, company_name, search_results), future = batch[0]
+                future.set_result(await self.analyzer.analyze_single(ticker, company_name, search_results))
+                return
+            await self._run_batch(batch)
+        except Exception as e:
+            logger.exception(f"Batched analysis failed: {e}")
+        finally:
+            for _, future in batch:
+                if not future.done():
+                    future.set_result((gemini_analyzer.default_analysis("Analysis error."), False, 0.0))
+
+    async def _run_batch(self, batch):
+        items = [item for item, _ in batch]
+        tickers = [ticker for ticker, _, _ in items]
+        prompt = gemini_analyzer.build_batch_analysis_prompt(items)
+        model = gemini_analyzer.analysis_model
+        start = time.perf_counter()
+        try:
+            response = await self.analyzer._limited('gemini', 'gemini batch analysis', lambda: model.generate_content_async(prompt))
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Batched Gemini analysis failed for {', '.join(tickers)}: {e}; marking the {len(batch)} tickers failed.")
+            elapsed = time.perf_counter() - start
+            for _, future in batch:
+                future.set_result((gemini_analyzer.default_analysis("Analysis error."), False, elapsed / len(batch)))
+            return
+        try:
+            analyses = gemini_analyzer.parse_batch_analysis(tickers, response.text)
+        except Exception as e:
+            logger.error(f"Error parsing batched Gemini analysis for {', '.join(tickers)}: {e}")
+            analyses = {}
+        elapsed = time.perf_counter() - start
+        self.batch_calls += 1
+        self.batched_tickers += len(batch)
+
+        retry = []
+        for item, future in batch:
+            ticker = item[0]
+            if ticker in analyses:
+                future.set_result((analyses[ticker], True, elapsed / len(batch)))
+            else:
+                retry.append((item, future))
+        if retry:
+            self.retried += len(retry)
+            logger.warning(f"Retrying {len(retry)}/{len(batch)} tickers individually after batched analysis: {', '.join(item[0] for item, _ in retry)}")
+            results = await asyncio.gather(*(self.analyzer.analyze_single(*item) for item, _ in retry))
+            for (_, future), result in zip(retry, results):
+                future.set_result(result)
+
+    def log_stats(self, log=logger):
+        """Logs batch sizes, retries and the Gemini calls saved compared with one request per ticker."""
+        if self.failed:
+            log.warning(f"Batched analysis: {self.failed} tickers failed with their batch request and were not retried individually.")
+        if not self.batch_calls:
+            return
+        saved = self.batched_tickers - self.batch_calls - self.retried
+        log.info(f"Batched analysis: {self.batched_tickers} tickers in {self.batch_calls} requests "
+                 f"(avg {self.batched_tickers / self.batch_calls:.1f}/request, max {self.batch_size}), "
+                 f"{self.retried} retried individually; {saved} Gemini calls saved vs per-ticker mode.")
+
+
+class AsyncAnalyzer:
+    """
+    Analyzes many tickers concurrently. Use run() from synchronous code, or
+    `await analyze_tickers(...)` from a running event loop.
+    """
+
+    def __init__(self, session=None, max_in_flight=None, cache=None, plans=None, batch_size=None, store=None):
+        self.session = session or create_brave_session()
+        self.cache = cache # analysis_cache.AnalysisCache; None disables reuse of earlier analyses
+        self.plans = plans # query_plans.QueryPlanStore; None generates queries every run
+        self.store = store # search_store.SearchResultStore; None searches Brave and sends every result each run
+        batch_size = config.ANALYSIS_BATCH_SIZE if batch_size is None else batch_size
+        self.batcher = AnalysisBatcher(self, batch_size) if batch_size > 1 else None
+        self.max_in_flight = max_in_flight or config.ANALYSIS_MAX_TICKERS_IN_FLIGHT
+        self.stats = LatencyStats()
+
+    async def _limited(self, api, stage, call):
+        """Runs call() through the API's shared controller (rate limit, adaptive concurrency, retries), recording its latency."""
+        start = time.perf_counter()
+        try:
+            return await fetch_engine.get_controller(api).call_async(call)
+        finally:
+            self.stats.record(stage, time.perf_counter() - start)
+
+    async def generate_search_queries(self, ticker, company_name):
+        model = gemini_analyzer.query_generation_model
+        if not model:
+            logger.error("Gemini query generation model not initialized.")
+            return []
+        prompt = gemini_analyzer.build_query_prompt(ticker, company_name)
+        try:
+            response = await self._limited('gemini', 'gemini queries', lambda: model.generate_content_async(prompt))
+            return gemini_analyzer.parse_search_queries(ticker, response.text)
+        except Exception as e:
+            logger.error(f"Error generating search queries for {ticker} with Gemini: {e}")
+            return []
+
+    async def get_search_queries(self, ticker, company_name):
+        """Async equivalent of gemini_analyzer.get_search_queries."""
+        queries = gemini_analyzer.lookup_query_plan(ticker, company_name, self.plans)
+        if queries is None:
+            generated = await self.generate_search_queries(ticker, company_name)
+            queries = gemini_analyzer.finish_query_plan(ticker, company_name, generated, self.plans)
+        return queries
+
+    async def search_with_brave(self, query):
+        if self.store is not None:
+            stored = self.store.get_query(query)
+            if stored is not None:
+                return stored
+        try:
+            data = await self._limited('brave', 'brave search', lambda: asyncio.to_thread(gemini_analyzer.brave_get, self.session, query))
+            results = gemini_analyzer.parse_brave_results(data)
+            if self.store is not None:
+                self.store.put_query(query, results)
+            return results
+        except Exception as e:
+            logger.error(f"Error during Brave search for query '{query}': {e}")
+            return []
+
+    async def analyze_search_results(self, ticker, company_name, search_results):
+        """Returns a cached analysis when the inputs are unchanged; otherwise asks Gemini (batched when enabled)."""
+        if not gemini_analyzer.analysis_model:
+            logger.error("Gemini analysis model not initialized.")
+            return gemini_analyzer.default_analysis("Error: Analysis model not available.")
+        key = gemini_analyzer.cache_key(ticker, company_name, search_results) if self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.info(f"Reusing cached Gemini analysis for {ticker} (search results unchanged).")
+                if self.store is not None:
+                    self.store.mark_analyzed(ticker, search_results[:gemini_analyzer.MAX_CONTEXT_RESULTS])
+                return cached
+
+        if self.batcher is not None:
+            analysis, ok, call_seconds = await self.batcher.submit(ticker, company_name, search_results)
+        else:
+            analysis, ok, call_seconds = await self.analyze_single(ticker, company_name, search_results)
+        if ok and key is not None:
+            self.cache.put(key, ticker, analysis, call_seconds=call_seconds)
+        if ok and self.store is not None:
+            self.store.mark_analyzed(ticker, search_results[:gemini_analyzer.MAX_CONTEXT_RESULTS])
+        return analysis
+
+    async def analyze_single(self, ticker, company_name, search_results):
+        """
+        One Gemini analysis request for one ticker.
+
+        Returns:
+            tuple: (analysis, ok, call_seconds).
+        """
+        model = gemini_analyzer.analysis_model
+        prompt = gemini_analyzer.build_analysis_prompt(ticker, company_name, search_results)
+        start = time.perf_counter()
+        try:
+            response = await self._limited('gemini', 'gemini analysis', lambda: model.generate_content_async(prompt))
+            analysis, ok = gemini_analyzer.parse_analysis(ticker, response.text)
+            return analysis, ok, time.perf_counter() - start
+        except Exception as e:
+            logger.error(f"Error analyzing search results for {ticker} with Gemini: {e}")
+            return gemini_analyzer.default_analysis("Analysis error."), False, time.perf_counter() - start
+
+    async def analyze_ticker(self, ticker, company_name, in_flight=None):
+        """
+        Async equivalent of gemini_analyzer.get_analysis_for_stock (None = nothing new, keep the stored analysis).
+
+        Args:
+            in_flight (asyncio.Semaphore, optional): Held while the ticker's queries and
+                searches run, then released before the analysis so tickers waiting for a
+                batch do not block others from searching.
+        """
+        start = time.perf_counter()
+        try:
+            async with in_flight or contextlib.nullcontext():
+                search_queries = await self.get_search_queries(ticker, company_name)
+                if not search_queries:
+                    return gemini_analyzer.default_analysis("Failed to generate search queries.")
+                results_per_query = await asyncio.gather(*(self.search_with_brave(query) for query in search_queries))
+            unique_results = gemini_analyzer.collect_unique_results(ticker, search_queries, results_per_query)
+            if not unique_results:
+                return gemini_analyzer.default_analysis("No unique search results found after querying.")
+            unique_results = gemini_analyzer.new_results_only(ticker, unique_results, self.store)
+            if unique_results is None:
+                return None
+            analysis = await self.analyze_search_results(ticker, company_name, unique_results)
+            return gemini_analyzer.local_fallback(ticker, analysis, unique_results)
+        finally:
+            self.stats.record('ticker total', time.perf_counter() - start)
+
+    async def analyze_tickers(self, company_names, on_result):
+        """
+        Analyzes every ticker in company_names (ticker -> name) and calls
+        on_result(ticker, analysis) as each one finishes (analysis is None when the ticker
+        had no new search results). Errors never abort the batch.
+
+        Returns:
+            int: Number of tickers analyzed.
+        """
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        total = len(company_names)
+        progress_every = max(1, total // 10)
+        done = 0
+        run_start = time.perf_counter()
+
+        async def run_one(ticker, company_name):
+            nonlocal done
+            try:
+                analysis = await self.analyze_ticker(ticker, company_name, in_flight=in_flight)
+            except Exception as e:
+                logger.exception(f"Async analysis failed for {ticker}: {e}")
+                analysis = gemini_analyzer.default_analysis("Analysis failed.")
+            on_result(ticker, analysis)
+            done += 1
+            if done % progress_every == 0 or done == total:
+                logger.info(f"async-analysis: {done}/{total} done ({time.perf_counter() - run_start:.1f}s elapsed).")
+
+        await asyncio.gather(*(run_one(ticker, name) for ticker, name in company_names.items()))
+        logger.info(f"async-analysis: finished {total} tickers with up to {self.max_in_flight} in flight in {time.perf_counter() - run_start:.1f}s.")
+        if self.batcher is not None:
+            self.batcher.log_stats()
+        return total
+
+    def run(self, company_names, on_result):
+        """Runs analyze_tickers() on a new event loop, then logs per-stage latency and closes the session."""
+        try:
+            return asyncio.run(self.analyze_tickers(company_names, on_result))
+        finally:
+            self.stats.log()
+            self.session.close()
@@ -0,0 +1,934 @@
+"""
+Offline benchmarks for the Stock Analyzer backend.
+
+Each benchmark builds its own synthetic data in a temporary database, so it never
+touches stocks.db or the network. Run from the backend directory:
+
+    python3 benchmarks.py price-write [--tickers 600] [--days 250]
+    python3 benchmarks.py scoring [--tickers 600 3000] [--days 300]
+    python3 benchmarks.py indicators [--series 200] [--tickers 600] [--days 250]
+    python3 benchmarks.py backfill [--tickers 600] [--dates 250]
+    python3 benchmarks.py analysis-batching [--tickers 600] [--batch-sizes 4 8 16]
+    python3 benchmarks.py sentiment-tiers [--tickers 600]
+    python3 benchmarks.py pipeline [--mode synthetic|replay] [--tickers 100] [--latency-scale 0.01]
+    python3 benchmarks.py concurrent-reads [--tickers 600] [--readers 3] [--seconds 15]
+    python3 benchmarks.py latest-reads [--tickers 600] [--days 250 2520]
+    python3 benchmarks.py archive [--tickers 600] [--days 2520] [--dates 250]
+    python3 benchmarks.py analytics [--tickers 600] [--days 2520] [--score-days 1000]
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import config
+import database
+
+
+@contextlib.contextmanager
+def temp_database():
+    """Points the database module at a fresh temporary stocks.db for the duration of a benchmark."""
+    original_path = database.DATABASE_NAME
+    tmp_dir = tempfile.mkdtemp(prefix="stock_bench_")
+    database.DATABASE_NAME = os.path.join(tmp_dir, "bench.db")
+    try:
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            database.init_db()
+        yield database.DATABASE_NAME
+    finally:
+        database.close_connections()
+        database.DATABASE_NAME = original_path
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def synthetic_history_frames(n_tickers, n_days, seed=42):
+    """Returns ticker -> yfinance-shaped OHLCV DataFrame following a random walk."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n_days)
+    frames = {}
+    for i in range(n_tickers):
+        close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, n_days)))
+        open_ = close * (1 + rng.normal(0, 0.005, n_days))
+        frames[f"SYN{i:04d}"] = pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, n_days))),
+            'Low': np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, n_days))),
+            'Close': close,
+            'Volume': rng.integers(100_000, 2_000_000, n_days),
+        }, index=dates)
+    return frames
+
+
+def _report(label, rows, elapsed):
+    print(f"  {label:<28} {rows:>10,} rows  {elapsed:8.3f}s  {rows / elapsed:>12,.0f} rows/s")
+
+
+def _legacy_per_row_write(conn, ticker, hist):
+    """The original write path: iterrows() into dicts, then one execute per row and a commit per ticker."""
+    prices = []
+    for index, row in hist.iterrows():
+        prices.append({
+            'date': index.strftime('%Y-%m-%d'),
+            'open_price': row['Open'],
+            'close_price': row['Close'],
+            'volume': int(row['Volume']) if row['Volume'] else 0
+        })
+    cursor = conn.cursor()
+    for price_data in prices:
+        try:
+            cursor.execute(
+                "INSERT OR REPLACE INTO price_history (ticker, date, open_price, close_price, volume) VALUES (?, ?, ?, ?, ?)",
+                (ticker, price_data['date'], price_data['open_price'], price_data['close_price'], price_data['volume'])
+            )
+        except sqlite3.IntegrityError:
+            pass
+    conn.commit()
+    return len(prices)
+
+
+def bench_price_write(args):
+    """Compares the legacy per-row price_history write path with the vectorized bulk path."""
+    import data_fetcher # Imported lazily: pulls in yfinance and the analyzer configuration
+
+    frames = synthetic_history_frames(args.tickers, args.days)
+    print(f"price-write: {args.tickers} tickers x {args.days} days")
+
+    with temp_database():
+        conn = database.get_db_connection()
+        start = time.perf_counter()
+        rows = sum(_legacy_per_row_write(conn, ticker, hist) for ticker, hist in frames.items())
+        _report("per-row (iterrows+execute)", rows, time.perf_counter() - start)
+        conn.close()
+
+    with temp_database():
+        conn = database.get_db_connection()
+        start = time.perf_counter()
+        all_rows = [row for ticker, hist in frames.items() for row in data_fetcher.history_to_rows(ticker, hist)]
+        convert_elapsed = time.perf_counter() - start
+        written = database.bulk_upsert_prices(conn, all_rows)
+        elapsed = time.perf_counter() - start
+        _report("bulk (vectorized+executemany)", written, elapsed)
+        print(f"  {'':<28} (conversion {convert_elapsed:.3f}s, write {elapsed - convert_elapsed:.3f}s)")
+        conn.close()
+
+
+def seed_scoring_data(conn, frames, seed=42):
+    """Writes companies, OHLCV history, a fundamentals snapshot and daily sentiment for synthetic frames."""
+    rng = np.random.default_rng(seed)
+    companies, prices, fundamentals, news = [], [], [], []
+    for ticker, hist in frames.items():
+        companies.append((ticker, f"{ticker} Inc", 'Technology'))
+        dates = hist.index.strftime('%Y-%m-%d').tolist()
+        prices.extend(zip([ticker] * len(hist), dates, hist['Open'].tolist(), hist['High'].tolist(),
+                          hist['Low'].tolist(), hist['Close'].tolist(), hist['Volume'].tolist()))
+        fundamentals.append((ticker, dates[0], *rng.uniform([5, 0, 0, 0.5, 0.5], [40, 0.05, 2, 4, 5]).tolist()))
+        for date in dates[-30:]:
+            news.append((ticker, f"bench_{ticker}_{date}", 'Synthetic', date, date, float(rng.uniform(-1, 1))))
+    conn.executemany("INSERT INTO companies (ticker, name, sector) VALUES (?, ?, ?)", companies)
+    conn.executemany("INSERT INTO price_history (ticker, date, open_price, high_price, low_price, close_price, volume) VALUES (?, ?, ?, ?, ?, ?, ?)", prices)
+    conn.executemany("INSERT INTO fundamentals_snapshot (ticker, as_of_date, pe_ratio, dividend_yield, debt_to_equity, pb_ratio, ps_ratio) VALUES (?, ?, ?, ?, ?, ?, ?)", fundamentals)
+    conn.executemany("INSERT INTO news_articles (ticker, url, title, published_date, fetched_date, sentiment_score) VALUES (?, ?, ?, ?, ?, ?)", news)
+    conn.commit()
+
+SCORE_COLUMNS = ("ticker, date, score, price_change_pct, volume_ratio, avg_sentiment, pe_ratio, dividend_yield, price_vs_ma50, rsi, "
+                 "macd_signal, bbands_signal, debt_to_equity, pb_ratio, ps_ratio, price_vs_ma200, atr_value, next_day_open_price, next_day_perf_pct")
+
+def _read_scores(conn, date):
+    return {row[0]: tuple(row) for row in conn.execute(f"SELECT {SCORE_COLUMNS} FROM daily_scores WHERE date = ?", (date,))}
+
+def _compare_scores(reference, candidate):
+    """Returns the number of tickers whose stored rows differ (floats compared to 1e-9 relative)."""
+    mismatches = 0
+    for ticker, expected in reference.items():
+        actual = candidate.get(ticker)
+        if actual is None:
+            mismatches += 1
+            continue
+        for a, b in zip(expected, actual):
+            if isinstance(a, float) and isinstance(b, float):
+                if not np.isclose(a, b, rtol=1e-9, atol=1e-12):
+                    mismatches += 1
+                    break
+            elif a != b:
+                mismatches += 1
+                break
+    return mismatches
+
+def bench_scoring(args):
+    """Times the per-ticker scoring path against the panel engine and checks that both store identical rows."""
+    import logging
+    import scorer # Imported lazily: loads the scoring configuration and logger
+    import panel_scorer # Imported before silencing, since setting up the shared 'scorer' logger resets its level
+    logging.getLogger('scorer').setLevel(logging.ERROR) # Per-ticker warnings would dominate the timing
+
+    for n_tickers in args.tickers:
+        frames = synthetic_history_frames(n_tickers, args.days)
+        target_date = next(iter(frames.values())).index[-2].strftime('%Y-%m-%d') # Leaves a next-day open to score
+        print(f"scoring: {n_tickers} tickers x {args.days} days, date {target_date}")
+        with temp_database():
+            conn = database.get_db_connection()
+            seed_scoring_data(conn, frames)
+
+            timings = {}
+            results = {}
+            for engine in ('per_ticker', 'panel'):
+                conn.execute("DELETE FROM daily_scores")
+                conn.commit()
+                start = time.perf_counter()
+                scorer.calculate_scores_for_date(target_date, engine=engine)
+                timings[engine] = time.perf_counter() - start
+                results[engine] = _read_scores(conn, target_date)
+                _report(engine, len(results[engine]), timings[engine])
+            conn.close()
+
+        mismatches = _compare_scores(results['per_ticker'], results['panel'])
+        print(f"  speedup {timings['per_ticker'] / timings['panel']:.1f}x, {mismatches} mismatching tickers")
+
+
+def bench_backfill(args):
+    """Times a single-day panel run against a one-pass backfill of --dates trading days."""
+    import logging
+    import panel_scorer
+    logging.getLogger('scorer').setLevel(logging.WARNING)
+
+    frames = synthetic_history_frames(args.tickers, args.dates + 180) # 180 extra trading days of indicator warm-up
+    dates = next(iter(frames.values())).index.strftime('%Y-%m-%d').tolist()
+    from_date, to_date = dates[-args.dates], dates[-1]
+    print(f"backfill: {args.tickers} tickers, {args.dates} trading days ({from_date} to {to_date})")
+    with temp_database():
+        conn = database.get_db_connection()
+        seed_scoring_data(conn, frames)
+        conn.close()
+
+        start = time.perf_counter()
+        panel_scorer.calculate_scores_for_date(to_date)
+        single = time.perf_counter() - start
+        _report("single day", args.tickers, single)
+
+        start = time.perf_counter()
+        panel_scorer.calculate_scores_for_range(from_date, to_date)
+        backfill = time.perf_counter() - start
+        _report(f"backfill ({args.dates} days)", args.tickers * args.dates, backfill)
+    print(f"  backfill costs {backfill / single:.1f} single-day runs ({args.dates} days scored)")
+
+
+def _select(result, *columns):
+    """Picks output lines from a pandas_ta DataFrame result (None if pandas_ta returned None)."""
+    return None if result is None else [result[column] for column in columns]
+
+def _indicator_cases():
+    """
+    name -> (numpy function of OHLC arrays, pandas_ta function of an OHLC DataFrame).
+    Both return a list of outputs so multi-line indicators are compared line by line.
+    """
+    import indicators
+    macd_suffix = f"{config.MACD_FAST}_{config.MACD_SLOW}_{config.MACD_SIGNAL}"
+    bbands_suffix = f"{config.BBANDS_PERIOD}_{float(config.BBANDS_STDDEV)}"
+    return {
+        'sma': (lambda a: [indicators.sma(a['close'], config.MA_PERIOD)],
+                lambda df: [df.ta.sma(length=config.MA_PERIOD)]),
+        'ema': (lambda a: [indicators.ema(a['close'], config.MACD_SLOW)],
+                lambda df: [df.ta.ema(length=config.MACD_SLOW)]),
+        'rsi': (lambda a: [indicators.rsi(a['close'], config.RSI_PERIOD)],
+                lambda df: [df.ta.rsi(length=config.RSI_PERIOD)]),
+        'macd': (lambda a: list(indicators.macd(a['close'], config.MACD_FAST, config.MACD_SLOW, config.MACD_SIGNAL)),
+                 lambda df: _select(df.ta.macd(fast=config.MACD_FAST, slow=config.MACD_SLOW, signal=config.MACD_SIGNAL),
+                                    f'MACD_{macd_suffix}', f'MACDs_{macd_suffix}', f'MACDh_{macd_suffix}')),
+        'bbands': (lambda a: list(indicators.bbands(a['close'], config.BBANDS_PERIOD, config.BBANDS_STDDEV)),
+                   lambda df: _select(df.ta.bbands(length=config.BBANDS_PERIOD, std=config.BBANDS_STDDEV),
+                                      f'BBL_{bbands_suffix}', f'BBM_{bbands_suffix}', f'BBU_{bbands_suffix}')),
+        'true_range': (lambda a: [indicators.true_range(a['high'], a['low'], a['close'])],
+                       lambda df: [df.ta.true_range()]),
+        'atr': (lambda a: [indicators.atr(a['high'], a['low'], a['close'], config.ATR_PERIOD)],
+                lambda df: [df.ta.atr(length=config.ATR_PERIOD)]),
+    }
+
+def parity_series(n_series, seed=7):
+    """
+    OHLC DataFrames for the parity check: random walks of random length (including
+    series shorter than the indicator periods) and real-shaped series rounded to cents
+    with halted days (zero range, unchanged close).
+    """
+    rng = np.random.default_rng(seed)
+    series = []
+    for i in range(n_series):
+        n_days = int(rng.integers(3, 400))
+        close = 20 * np.exp(np.cumsum(rng.normal(0, 0.03, n_days)))
+        open_ = close * (1 + rng.normal(0, 0.01, n_days))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, n_days)))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, n_days)))
+        if i % 2: # Real-shaped: cent prices and trading halts
+            open_, high, low, close = (np.round(v, 2) for v in (open_, high, low, close))
+            halted = rng.random(n_days) < 0.03
+            close[halted] = np.roll(close, 1)[halted]
+            open_[halted] = high[halted] = low[halted] = close[halted]
+        series.append(pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close}))
+    return series
+
+def _max_difference(expected, actual):
+    """Returns (max relative difference over values both sides computed, number of NaN-position mismatches)."""
+    expected = np.asarray(expected, dtype=float)
+    both = ~np.isnan(expected) & ~np.isnan(actual)
+    nan_mismatches = int((np.isnan(expected) != np.isnan(actual)).sum())
+    if not both.any():
+        return 0.0, nan_mismatches
+    diff = np.abs(expected[both] - actual[both]) / np.maximum(np.abs(expected[both]), 1.0)
+    return float(diff.max()), nan_mismatches
+
+def bench_indicators(args):
+    """Checks the NumPy kernels against pandas_ta and measures per-indicator throughput."""
+    try:
+        import pandas_ta # Registers the DataFrame .ta accessor
+    except ImportError:
+        pandas_ta = None
+        print("pandas_ta is not installed: skipping the parity check and the pandas_ta timings.")
+    cases = _indicator_cases()
+
+    if pandas_ta is not None:
+        series = parity_series(args.series)
+        print(f"parity: {len(series)} series (3-400 rows), tolerance {args.tolerance:g} relative")
+        for name, (numpy_func, ta_func) in cases.items():
+            worst, nan_mismatches, compared = 0.0, 0, 0
+            for df in series:
+                try:
+                    expected = ta_func(df)
+                except Exception:
+                    continue # e.g. pandas_ta's MACD raises when the signal EMA gets too few values
+                if expected is None or any(line is None for line in expected):
+                    continue # pandas_ta returns None for series shorter than the indicator period
+                arrays = {column: df[column].to_numpy() for column in df.columns}
+                for expected_line, actual_line in zip(expected, numpy_func(arrays)):
+                    diff, mismatches = _max_difference(expected_line, actual_line)
+                    worst, nan_mismatches = max(worst, diff), nan_mismatches + mismatches
+                compared += 1
+            status = "OK" if worst <= args.tolerance and not nan_mismatches else "FAIL"
+            print(f"  {name:<12} {compared:>5} series  max rel diff {worst:.2e}  NaN mismatches {nan_mismatches}  {status}")
+
+    frames = synthetic_history_frames(args.tickers, args.days)
+    panel = {column.lower(): np.column_stack([hist[column].to_numpy(dtype=float) for hist in frames.values()])
+             for column in ('Open', 'High', 'Low', 'Close')}
+    print(f"throughput: {args.tickers} series x {args.days} days")
+    for name, (numpy_func, ta_func) in cases.items():
+        start = time.perf_counter()
+        numpy_func(panel)
+        numpy_elapsed = time.perf_counter() - start
+        line = f"  {name:<12} numpy (2-D) {args.tickers / numpy_elapsed:>12,.0f} series/s"
+        if pandas_ta is not None:
+            dfs = [hist.rename(columns=str.lower) for hist in frames.values()]
+            start = time.perf_counter()
+            for df in dfs:
+                ta_func(df)
+            ta_elapsed = time.perf_counter() - start
+            line += f"   pandas_ta {args.tickers / ta_elapsed:>10,.0f} series/s   ({ta_elapsed / numpy_elapsed:.0f}x)"
+        print(line)
+
+
+class SimulatedGemini:
+    """
+    Stand-in for the Gemini analysis model with a latency model of
+    base + prompt tokens * input cost + tickers * output time (output tokens are
+    generated one after another, so a batch answers its tickers in sequence). Sleeps are
+    multiplied by time_scale; fail_rate drops that share of tickers from batched replies
+    to exercise the per-ticker retry.
+    """
+
+    def __init__(self, base_seconds, seconds_per_1k_prompt_tokens, seconds_per_ticker_output, time_scale, fail_rate=0.0, seed=3):
+        self.base_seconds = base_seconds
+        self.seconds_per_1k_prompt_tokens = seconds_per_1k_prompt_tokens
+        self.seconds_per_ticker_output = seconds_per_ticker_output
+        self.time_scale = time_scale
+        self.fail_rate = fail_rate
+        self.rng = np.random.default_rng(seed)
+        self.calls = 0
+
+    async def generate_content_async(self, prompt):
+        import asyncio
+        import json
+        import re
+        import types
+        import gemini_analyzer
+        tickers = re.findall(r"^\s*=== (\S+) \(", prompt, flags=re.MULTILINE)
+        n_answers = max(1, len(tickers))
+        latency = (self.base_seconds
+                   + gemini_analyzer.estimate_tokens(prompt) / 1000 * self.seconds_per_1k_prompt_tokens
+                   + n_answers * self.seconds_per_ticker_output)
+        self.calls += 1
+        await asyncio.sleep(latency * self.time_scale)
+        answer = {"summary": "Simulated.", "bullish_points": ["a"], "bearish_points": [], "sentiment_score": 0.1}
+        if not tickers:
+            return types.SimpleNamespace(text=json.dumps(answer))
+        kept = [ticker for ticker in tickers if self.rng.random() >= self.fail_rate]
+        return types.SimpleNamespace(text=json.dumps({ticker: answer for ticker in kept}))
+
+def bench_analysis_batching(args):
+    """Per-ticker vs batched Gemini analysis requests on the async pipeline, with a simulated model."""
+    import asyncio
+    config.GEMINI_API_KEY = config.GEMINI_API_KEY or "benchmark" # gemini_analyzer refuses to import without keys
+    config.BRAVE_API_KEY = config.BRAVE_API_KEY or "benchmark"
+    import gemini_analyzer
+    import async_analyzer
+    import fetch_engine
+    import logging
+    logging.getLogger('data_fetcher').setLevel(logging.ERROR)
+    config.RATE_LIMITS = dict(config.RATE_LIMITS, gemini={'rate': 1e6, 'burst': 1e6}) # Concurrency cap only
+
+    results = [{'title': f"Headline {i}", 'snippet': "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 3,
+                'url': f"https://news.example.com/{i}", 'date': "2024-01-01"} for i in range(gemini_analyzer.MAX_CONTEXT_RESULTS)]
+    tickers = {f"T{i:04d}": f"Company {i}" for i in range(args.tickers)}
+    print(f"{args.tickers} tickers, gemini concurrency {config.ANALYSIS_CONCURRENCY['gemini']}, "
+          f"simulated latency {args.base_latency}s + {args.output_latency}s/ticker, time scale {args.time_scale:g}, fail rate {args.fail_rate:.0%}")
+
+    reference = None
+    for batch_size in [1] + args.batch_sizes:
+        model = SimulatedGemini(args.base_latency, 0.1, args.output_latency, args.time_scale, fail_rate=args.fail_rate)
+        gemini_analyzer.analysis_model = model
+        fetch_engine._rate_limiters.pop('gemini', None) # Fresh limiter and controller for each mode
+        fetch_engine._controllers.pop('gemini', None)
+        analyzer = async_analyzer.AsyncAnalyzer(session=object(), batch_size=batch_size)
+        if analyzer.batcher is not None:
+            analyzer.batcher.max_wait *= args.time_scale # Same time scale as the simulated model
+
+        async def run():
+            await asyncio.gather(*(analyzer.analyze_search_results(ticker, name, results) for ticker, name in tickers.items()))
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(open(os.devnull, 'w')): # gemini_analyzer prints every parsed analysis
+            asyncio.run(run())
+        elapsed = (time.perf_counter() - start) / args.time_scale
+        reference = reference or (elapsed, model.calls)
+        label = "per-ticker" if batch_size == 1 else f"batch {batch_size}"
+        retried = analyzer.batcher.retried if analyzer.batcher else 0
+        print(f"  {label:<11} {model.calls:>5} Gemini calls ({retried} retries)  end-to-end {elapsed:7.1f}s"
+              f"   calls saved {reference[1] - model.calls:>5}   {reference[0] / elapsed:.1f}x")
+
+def _percentiles(samples):
+    ordered = sorted(samples)
+    return ordered[len(ordered) // 2], ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+def bench_sentiment_tiers(args):
+    """Per-ticker latency of the local lexicon tier (real VADER) vs the Gemini tier (simulated model latency)."""
+    import asyncio
+    config.GEMINI_API_KEY = config.GEMINI_API_KEY or "benchmark" # gemini_analyzer refuses to import without keys
+    config.BRAVE_API_KEY = config.BRAVE_API_KEY or "benchmark"
+    import gemini_analyzer
+    import async_analyzer
+    import fetch_engine
+    import local_sentiment
+    import logging
+    logging.getLogger('data_fetcher').setLevel(logging.ERROR)
+    if not local_sentiment.available():
+        print("sentiment-tiers: vaderSentiment is not installed.")
+        return
+    config.RATE_LIMITS = dict(config.RATE_LIMITS, gemini={'rate': 1e6, 'burst': 1e6}) # Concurrency cap only
+
+    rng = np.random.default_rng(11)
+    words = ["beats estimates", "strong growth", "upgrade", "record revenue", "misses estimates", "lawsuit",
+             "downgrade", "weak guidance", "announces", "quarterly results", "shares", "market"]
+    def snippet():
+        return " ".join(rng.choice(words, size=12)) + "."
+    tickers = {f"T{i:04d}": [{'title': snippet(), 'snippet': snippet() * 3, 'url': f"https://news.example.com/{i}/{k}", 'date': "2024-01-01"}
+                             for k in range(gemini_analyzer.MAX_CONTEXT_RESULTS)] for i in range(args.tickers)}
+    print(f"{args.tickers} tickers x {gemini_analyzer.MAX_CONTEXT_RESULTS} snippets; simulated Gemini latency "
+          f"{args.base_latency}s + {args.output_latency}s/ticker, concurrency {config.ANALYSIS_CONCURRENCY['gemini']}, time scale {args.time_scale:g}")
+
+    local_sentiment.score_texts(["warm-up"]) # Lexicon load is a one-time cost
+    latencies = []
+    start = time.perf_counter()
+    for ticker, results in tickers.items():
+        call_start = time.perf_counter()
+        local_sentiment.analyze_results(ticker, results)
+        latencies.append(time.perf_counter() - call_start)
+    local_elapsed = time.perf_counter() - start
+    p50, p95 = _percentiles(latencies)
+    print(f"  local, per ticker   p50 {p50 * 1000:8.2f}ms   p95 {p95 * 1000:8.2f}ms   end-to-end {local_elapsed:7.2f}s")
+    start = time.perf_counter()
+    local_sentiment.analyze_many(tickers, reason="benchmark")
+    batch_elapsed = time.perf_counter() - start
+    print(f"  local, one batch    {batch_elapsed / args.tickers * 1000:8.2f}ms/ticker                end-to-end {batch_elapsed:7.2f}s")
+
+    gemini_analyzer.analysis_model = SimulatedGemini(args.base_latency, 0.1, args.output_latency, args.time_scale)
+    fetch_engine._rate_limiters.pop('gemini', None)
+    fetch_engine._controllers.pop('gemini', None)
+    analyzer = async_analyzer.AsyncAnalyzer(session=object(), batch_size=1)
+    latencies = []
+
+    async def run():
+        slots = asyncio.Semaphore(config.ANALYSIS_CONCURRENCY['gemini']) # Per-ticker latency excludes waiting for a free slot
+
+        async def timed(ticker, results):
+            async with slots:
+                call_start = time.perf_counter()
+                await analyzer.analyze_single(ticker, ticker, results)
+                latencies.append((time.perf_counter() - call_start) / args.time_scale)
+
+        await asyncio.gather(*(timed(ticker, results) for ticker, results in tickers.items()))
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(open(os.devnull, 'w')): # gemini_analyzer prints every parsed analysis
+        asyncio.run(run())
+    gemini_elapsed = (time.perf_counter() - start) / args.time_scale
+    g50, g95 = _percentiles(latencies)
+    print(f"  gemini, per ticker  p50 {g50 * 1000:8.0f}ms   p95 {g95 * 1000:8.0f}ms   end-to-end {gemini_elapsed:7.2f}s")
+    print(f"  local tier is {g50 / p50:,.0f}x faster per ticker (p50)")
+
+
+def _run_offline_pipeline(provider, tickers, tmp_dir, history_days):
+    """Runs fetch -> score -> performance analysis (the scheduler's daily chain) in the current database; returns stage timings."""
+    import logging
+    import providers
+    import gemini_analyzer
+    import data_fetcher
+    import scorer
+    import analysis
+    import fetch_engine
+    for name in ('data_fetcher', 'scorer', 'analysis', ''): # '' = root logger (gemini_analyzer logs there)
+        logging.getLogger(name).setLevel(logging.ERROR)
+    ticker_file = os.path.join(tmp_dir, "tickers.txt")
+    with open(ticker_file, 'w') as f:
+        f.write("\n".join(tickers) + "\n")
+    config.TICKER_LIST_FILE = ticker_file
+    for setting, filename in (('INFO_CACHE_FILE', "info.json"), ('ANALYSIS_CACHE_FILE', "analyses.json"), ('QUERY_PLAN_FILE', "plans.json")):
+        setattr(config, setting, os.path.join(tmp_dir, filename))
+    providers.set_provider(provider)
+    gemini_analyzer.init_models()
+    fetch_engine._rate_limiters.clear() # Fresh limiters and controllers for each run
+    fetch_engine._controllers.clear()
+    timings = {}
+    with contextlib.redirect_stdout(open(os.devnull, 'w')): # gemini_analyzer prints every step
+        start = time.perf_counter()
+        data_fetcher.run_data_fetch_pipeline()
+        timings['fetch'] = time.perf_counter() - start
+        score_date = (pd.Timestamp.today() - pd.Timedelta(days=1)).strftime('%Y-%m-%d') # As scheduled: yesterday
+        start = time.perf_counter()
+        scorer.calculate_scores_for_date(score_date)
+        timings['score'] = time.perf_counter() - start
+        start = time.perf_counter()
+        analysis.analyze_performance(days_history=history_days)
+        timings['analysis'] = time.perf_counter() - start
+    return timings, score_date
+
+def bench_pipeline(args):
+    """End-to-end offline run of the daily chain on a synthetic or replayed provider, repeated to check the results are identical."""
+    import providers
+    config.DATA_PROVIDER_MODE = args.mode
+    config.PROVIDER_LATENCY_SCALE = args.latency_scale
+    config.RATE_LIMITS = {name: {'rate': 1e6, 'burst': 1e6} for name in config.RATE_LIMITS} # Concurrency caps only
+    config.ANALYSIS_BATCH_MAX_WAIT_SECONDS *= args.latency_scale # Same time scale as the injected latency
+    if args.mode == 'replay':
+        fixture_dir = args.fixtures or config.PROVIDER_FIXTURE_DIR
+        tickers = list(providers.FixtureStore(fixture_dir).load('info'))[:args.tickers]
+        tickers = [json.loads(ticker) for ticker in tickers]
+        if not tickers:
+            print(f"pipeline: no recorded fixtures in {fixture_dir} (record them with DATA_PROVIDER_MODE=record).")
+            return
+    else:
+        tickers = [f"SYN{i:04d}" for i in range(args.tickers)]
+    print(f"pipeline: {args.mode} provider, {len(tickers)} tickers, latency scale {args.latency_scale:g}, "
+          f"analysis engine {config.ANALYSIS_ENGINE}, no rate limits")
+
+    reference = None
+    for run in range(1, args.runs + 1):
+        provider = providers.create_provider(args.mode, args.fixtures)
+        with temp_database() as db_path:
+            timings, score_date = _run_offline_pipeline(provider, tickers, os.path.dirname(db_path), args.history_days)
+            conn = database.get_db_connection()
+            scores = _read_scores(conn, score_date)
+            analyses = conn.execute("SELECT COUNT(*) FROM news_articles WHERE published_date = date('now', 'localtime')").fetchone()[0]
+            conn.close()
+        stages = "   ".join(f"{stage} {elapsed:6.2f}s" for stage, elapsed in timings.items())
+        check = "" if reference is None else f"   {_compare_scores(reference, scores)} tickers differ from run 1"
+        print(f"  run {run}: {stages}   total {sum(timings.values()):6.2f}s   {analyses} analyses, {len(scores)} scores ({score_date}){check}")
+        reference = reference or scores
+        if args.mode == 'synthetic':
+            served = [f"{count} {kind}" for kind, count in provider.stats.items()]
+        else:
+            served = [f"{s['replayed'] + s['missed']} {kind} ({s['missed']} not recorded)" for kind, s in provider.stats.items()]
+        print(f"         provider requests: {', '.join(served)}")
+
+
+def _legacy_connection(readonly=False):
+    """get_db_connection before the connection layer: a fresh default-journal connection per call."""
+    conn = sqlite3.connect(database.DATABASE_NAME)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def _api_reader(db_path, legacy, paths, stop_at, think_seconds, results):
+    """Reader process (one Gunicorn worker): requests the API routes through Flask's test client until stop_at."""
+    database.DATABASE_NAME = db_path
+    if legacy:
+        database.get_db_connection = _legacy_connection
+    import app as web_app
+    client = web_app.app.test_client()
+    samples, errors = [], 0
+    while time.time() < stop_at:
+        for path in paths:
+            start = time.perf_counter()
+            response = client.get(path)
+            samples.append(time.perf_counter() - start)
+            errors += response.status_code != 200
+            time.sleep(think_seconds) # Gaps between requests, so readers wait on locks rather than on the CPU
+    results.put((samples, errors))
+
+def bench_concurrent_reads(args):
+    """
+    API latency in reader processes while the main process rewrites recent prices and
+    scores: per-call rollback-journal connections vs the WAL connection layer.
+    """
+    import logging
+    import multiprocessing
+    import generate_synthetic_db
+    import panel_scorer
+    import app # Imported once here so the forked readers share its logger setup (gunicorn --preload)
+    logging.getLogger('scorer').setLevel(logging.WARNING)
+    logging.getLogger('web_app').setLevel(logging.CRITICAL)
+    context = multiprocessing.get_context('fork') # Readers inherit the patched modules, like Gunicorn's forked workers
+    paths = ['/api/highlighted-stocks', '/api/portfolio', '/api/stock-details/SYN0000']
+    tmp_dir = tempfile.mkdtemp(prefix="stock_bench_")
+    db_path = os.path.join(tmp_dir, "load.db")
+    original_path, original_connection = database.DATABASE_NAME, database.get_db_connection
+    try:
+        print(f"concurrent-reads: {args.tickers} tickers x {args.days} days, {args.readers} reader processes, "
+              f"writer re-syncing and rescoring the last {args.rescore_dates} dates, {args.seconds:g}s per mode")
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            generate_synthetic_db.generate(db_path, args.tickers, args.days, news_days=60, score_days=args.rescore_dates)
+        conn = database.connect(db_path)
+        dates = [row[0] for row in conn.execute("SELECT DISTINCT date FROM daily_scores ORDER BY date")]
+        price_rows = [tuple(row) for row in conn.execute(
+            "SELECT ticker, date, open_price, high_price, low_price, close_price, volume FROM price_history WHERE date >= ?", (dates[0],))]
+        conn.close()
+        database.close_connections()
+
+        for mode in ('legacy', 'tuned'):
+            legacy = mode == 'legacy'
+            conn = sqlite3.connect(db_path)
+            conn.execute(f"PRAGMA journal_mode = {'DELETE' if legacy else config.SQLITE_JOURNAL_MODE}")
+            conn.close()
+            database.DATABASE_NAME = db_path
+            database.get_db_connection = _legacy_connection if legacy else original_connection
+
+            results = context.Queue()
+            stop_at = time.time() + args.seconds
+            readers = [context.Process(target=_api_reader, args=(db_path, legacy, paths, stop_at, args.think_ms / 1000, results)) for _ in range(args.readers)]
+            for reader in readers:
+                reader.start()
+            passes, write_time = 0, 0.0
+            while time.time() < stop_at:
+                # One nightly write cycle: re-sync the recent price bars, then rescore those dates
+                start = time.perf_counter()
+                conn = database.get_db_connection()
+                database.bulk_upsert_prices(conn, price_rows)
+                conn.close()
+                panel_scorer.calculate_scores_for_range(dates[0], dates[-1])
+                write_time += time.perf_counter() - start
+                passes += 1
+            samples, errors = [], 0
+            for _ in readers:
+                reader_samples, reader_errors = results.get()
+                samples.extend(reader_samples)
+                errors += reader_errors
+            for reader in readers:
+                reader.join()
+            database.close_connections()
+
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+            label = "per-call connections, rollback journal" if legacy else f"reused connections, {config.SQLITE_JOURNAL_MODE}"
+            print(f"  {label:<40} {len(samples) / args.seconds:7.0f} req/s   p50 {p50:6.1f}ms   p95 {p95:6.1f}ms   "
+                  f"p99 {p99:7.1f}ms   max {max(samples) * 1000:7.1f}ms   {errors} errors   "
+                  f"writer {passes} passes ({write_time / max(passes, 1):.2f}s each)")
+    finally:
+        database.get_db_connection = original_connection
+        database.DATABASE_NAME = original_path
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# The hot API reads before ticker_latest: latest rows found per request in the history tables
+LEGACY_API_QUERIES = {
+    'portfolio': """
+        SELECT p.id, p.ticker, p.quantity, p.purchase_price, p.purchase_date, c.name,
+            (SELECT close_price FROM price_history ph WHERE ph.ticker = p.ticker ORDER BY ph.date DESC LIMIT 1) as latest_price,
+            (SELECT score FROM daily_scores ds WHERE ds.ticker = p.ticker ORDER BY ds.date DESC LIMIT 1) as latest_score
+        FROM portfolio p JOIN companies c ON p.ticker = c.ticker
+        ORDER BY p.purchase_date DESC, p.ticker ASC
+    """,
+    'highlighted': """
+        SELECT ds.*, c.name, c.sector FROM daily_scores ds JOIN companies c ON ds.ticker = c.ticker
+        WHERE ds.date = (SELECT MAX(date) FROM daily_scores) ORDER BY ds.score DESC
+    """,
+}
+LATEST_API_QUERIES = {
+    'portfolio': """
+        SELECT p.id, p.ticker, p.quantity, p.purchase_price, p.purchase_date, c.name,
+            tl.close_price as latest_price, tl.score as latest_score
+        FROM portfolio p JOIN companies c ON p.ticker = c.ticker LEFT JOIN ticker_latest tl ON tl.ticker = p.ticker
+        ORDER BY p.purchase_date DESC, p.ticker ASC
+    """,
+    'highlighted': """
+        SELECT tl.*, c.name, c.sector FROM ticker_latest tl JOIN companies c ON tl.ticker = c.ticker
+        WHERE tl.score_date = (SELECT MAX(score_date) FROM ticker_latest) ORDER BY tl.score DESC
+    """,
+}
+
+def bench_latest_reads(args):
+    """Portfolio and highlighted-stocks queries on the history tables vs ticker_latest, as history grows."""
+    import generate_synthetic_db
+    tmp_dir = tempfile.mkdtemp(prefix="stock_bench_")
+    try:
+        print(f"latest-reads: {args.tickers} tickers, 15 holdings, {args.repeats} queries each")
+        for n_days in args.days:
+            db_path = os.path.join(tmp_dir, f"history_{n_days}.db")
+            with contextlib.redirect_stdout(open(os.devnull, 'w')):
+                generate_synthetic_db.generate(db_path, args.tickers, n_days, news_days=30, score_days=min(n_days, args.score_days))
+            conn = database.connect(db_path, readonly=True)
+            results = {}
+            for label, queries in (('history', LEGACY_API_QUERIES), ('ticker_latest', LATEST_API_QUERIES)):
+                for name, sql in queries.items():
+                    rows = conn.execute(sql).fetchall() # Warm the page cache
+                    start = time.perf_counter()
+                    for _ in range(args.repeats):
+                        conn.execute(sql).fetchall()
+                    results[(label, name)] = ((time.perf_counter() - start) / args.repeats, len(rows))
+            conn.close()
+            print(f"  {n_days} days of history ({args.tickers * n_days:,} price rows):")
+            for name in LEGACY_API_QUERIES:
+                (before, rows), (after, latest_rows) = results[('history', name)], results[('ticker_latest', name)]
+                check = "" if rows == latest_rows else f"   row counts differ ({rows} vs {latest_rows})"
+                print(f"    {name:<12} history {before * 1000:8.2f}ms   ticker_latest {after * 1000:7.2f}ms   "
+                      f"{before / after:6.1f}x   {rows} rows{check}")
+            os.remove(db_path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def bench_archive(args):
+    """Full-history panel loads and a range backfill from SQLite vs the memory-mapped price archive."""
+    import logging
+    import generate_synthetic_db
+    import panel_scorer
+    import price_archive
+    logging.getLogger('scorer').setLevel(logging.WARNING)
+    tmp_dir = tempfile.mkdtemp(prefix="stock_bench_")
+    db_path = os.path.join(tmp_dir, "history.db")
+    original_path, original_dir, original_source = database.DATABASE_NAME, config.PRICE_ARCHIVE_DIR, config.PRICE_PANEL_SOURCE
+    try:
+        print(f"archive: {args.tickers} tickers x {args.days} days ({args.tickers * args.days:,} price rows)")
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            generate_synthetic_db.generate(db_path, args.tickers, args.days, news_days=30, score_days=0)
+        database.DATABASE_NAME = db_path
+        config.PRICE_ARCHIVE_DIR = os.path.join(tmp_dir, "archive")
+
+        start = time.perf_counter()
+        stats = price_archive.sync(full=True)
+        print(f"  full export                {time.perf_counter() - start:7.2f}s   ({stats['rows']:,} bars)")
+        start = time.perf_counter()
+        stats = price_archive.sync()
+        print(f"  incremental sync           {time.perf_counter() - start:7.2f}s   ({stats['rows']:,} bars re-read)")
+
+        # Every close as a dates x tickers DataFrame, then one pass over it
+        start = time.perf_counter()
+        conn = database.get_db_connection()
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute("SELECT ticker, date, close_price FROM price_history")
+        closes = pd.DataFrame(cursor.fetchall(), columns=['ticker', 'date', 'close']).pivot(index='date', columns='ticker', values='close')
+        conn.close()
+        sqlite_sum = np.nansum(closes.to_numpy())
+        sqlite_load = time.perf_counter() - start
+        start = time.perf_counter()
+        panel = price_archive.load_panel(fields=('close',))
+        frame = panel.frame('close')
+        archive_open = time.perf_counter() - start
+        archive_sum = np.nansum(frame.to_numpy())
+        archive_load = time.perf_counter() - start
+        shared = np.shares_memory(frame.to_numpy(), panel.fields['close'])
+        print(f"  close panel via SQLite     {sqlite_load:7.2f}s")
+        print(f"  close panel via archive    {archive_load:7.3f}s   (open {archive_open * 1000:.1f}ms, zero-copy {shared}, "
+              f"{sqlite_load / archive_load:.0f}x, sums {'match' if np.isclose(sqlite_sum, archive_sum) else 'DIFFER'})")
+
+        conn = database.get_db_connection()
+        dates = [row[0] for row in conn.execute("SELECT DISTINCT date FROM price_history ORDER BY date DESC LIMIT ?", (args.dates,))]
+        conn.close()
+        scores = {}
+        for source in ('sqlite', 'archive'):
+            config.PRICE_PANEL_SOURCE = source
+            start = time.perf_counter()
+            panel_scorer.calculate_scores_for_range(dates[-1], dates[0])
+            elapsed = time.perf_counter() - start
+            conn = database.get_db_connection()
+            scores[source] = {(row[0], row[1]): tuple(row) for row in conn.execute(f"SELECT {SCORE_COLUMNS} FROM daily_scores")}
+            conn.execute("DELETE FROM daily_scores")
+            conn.commit()
+            conn.close()
+            print(f"  backfill {args.dates} dates ({source:<7}) {elapsed:7.2f}s   {len(scores[source]):,} scores")
+        differing = _compare_scores(scores['sqlite'], scores['archive'])
+        print(f"  {differing} of {len(scores['sqlite']):,} scores differ between the two sources")
+    finally:
+        database.close_connections()
+        database.DATABASE_NAME, config.PRICE_ARCHIVE_DIR, config.PRICE_PANEL_SOURCE = original_path, original_dir, original_source
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _duckdb_copy_engine(analytics, db_path):
+    """DuckDBAnalytics over in-memory copies of the tables, for hosts where the sqlite extension cannot be installed."""
+    engine = analytics.DuckDBAnalytics.__new__(analytics.DuckDBAnalytics)
+    engine.con = analytics.duckdb.connect()
+    engine.con.execute("CREATE SCHEMA stocks")
+    conn = database.connect(db_path, readonly=True)
+    for table in ('daily_scores', 'price_history'):
+        frame = pd.read_sql(f"SELECT * FROM {table}", conn)
+        engine.con.register('frame', frame)
+        engine.con.execute(f"CREATE TABLE stocks.{table} AS SELECT * FROM frame")
+        engine.con.unregister('frame')
+    conn.close()
+    return engine
+
+def bench_analytics(args):
+    """Performance-analysis and backtest aggregations: DuckDB SQL vs SQLite rows + pandas, with a parity check."""
+    import generate_synthetic_db
+    import analytics
+    tmp_dir = tempfile.mkdtemp(prefix="stock_bench_")
+    db_path = os.path.join(tmp_dir, "history.db")
+    try:
+        print(f"analytics: {args.tickers} tickers x {args.days} days, {args.score_days} days of scores")
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            generate_synthetic_db.generate(db_path, args.tickers, args.days, news_days=30, score_days=args.score_days)
+        conn = database.connect(db_path, readonly=True)
+        first_date, last_date = conn.execute("SELECT MIN(date), MAX(date) FROM daily_scores").fetchone()
+        conn.close()
+        queries = {
+            'score buckets': lambda engine: engine.score_buckets(first_date, last_date),
+            'score deciles': lambda engine: engine.score_quantiles(first_date, last_date, 10),
+            f'{args.window}d trailing returns': lambda engine: engine.trailing_returns(first_date, last_date, args.window),
+        }
+
+        engines = {'pandas': analytics.PandasAnalytics(db_path)}
+        if not analytics.duckdb_available():
+            print("  duckdb is not installed (pip install duckdb): timing the pandas engine only.")
+        else:
+            try:
+                engines['duckdb'] = analytics.DuckDBAnalytics(db_path)
+            except analytics.duckdb.Error as e:
+                start = time.perf_counter()
+                engines['duckdb (in-memory copy)'] = _duckdb_copy_engine(analytics, db_path)
+                print(f"  DuckDB cannot attach the SQLite file here ({str(e).splitlines()[0]}); "
+                      f"timing it on in-memory table copies instead (copy took {time.perf_counter() - start:.2f}s).")
+
+        results = {}
+        for query, run in queries.items():
+            for name, engine in engines.items():
+                run(engine) # Warm-up (page cache, DuckDB catalog)
+                start = time.perf_counter()
+                for _ in range(args.repeats):
+                    result = run(engine)
+                results[(query, name)] = result
+                print(f"  {query:<22} {name:<24} {(time.perf_counter() - start) / args.repeats:7.3f}s   {len(result):,} rows")
+            if len(engines) > 1:
+                reference, *others = [results[(query, name)] for name in engines]
+                for other in others:
+                    numeric = reference.select_dtypes('number').columns
+                    same = (reference.shape == other.shape
+                            and reference.drop(columns=numeric).astype(str).equals(other.drop(columns=numeric).astype(str))
+                            and np.allclose(reference[numeric].to_numpy(float), other[numeric].to_numpy(float), equal_nan=True))
+                    print(f"  {'':<22} results {'match' if same else 'DIFFER'}")
+        for engine in engines.values():
+            engine.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+BENCHMARKS = {
+    'price-write': bench_price_write,
+    'scoring': bench_scoring,
+    'indicators': bench_indicators,
+    'backfill': bench_backfill,
+    'analysis-batching': bench_analysis_batching,
+    'sentiment-tiers': bench_sentiment_tiers,
+    'pipeline': bench_pipeline,
+    'concurrent-reads': bench_concurrent_reads,
+    'latest-reads': bench_latest_reads,
+    'archive': bench_archive,
+    'analytics': bench_analytics,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline performance benchmarks.")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    price_write = subparsers.add_parser('price-write', help="Per-row vs bulk price_history ingestion.")
+    price_write.add_argument('--tickers', type=int, default=600)
+    price_write.add_argument('--days', type=int, default=250)
+
+    scoring = subparsers.add_parser('scoring', help="Per-ticker vs panel scoring engine, with a parity check.")
+    scoring.add_argument('--tickers', type=int, nargs='+', default=[600, 3000])
+    scoring.add_argument('--days', type=int, default=300)
+
+    indicator_bench = subparsers.add_parser('indicators', help="NumPy kernels vs pandas_ta: parity and per-indicator throughput.")
+    indicator_bench.add_argument('--series', type=int, default=200, help="Random series for the parity check.")
+    indicator_bench.add_argument('--tolerance', type=float, default=1e-9)
+    indicator_bench.add_argument('--tickers', type=int, default=600)
+    indicator_bench.add_argument('--days', type=int, default=250)
+
+    backfill = subparsers.add_parser('backfill', help="Single-day panel scoring vs a one-pass date-range backfill.")
+    backfill.add_argument('--tickers', type=int, default=600)
+    backfill.add_argument('--dates', type=int, default=250)
+
+    batching = subparsers.add_parser('analysis-batching', help="Per-ticker vs batched Gemini analysis (simulated model latency).")
+    batching.add_argument('--tickers', type=int, default=600)
+    batching.add_argument('--batch-sizes', type=int, nargs='+', default=[4, 8, 16])
+    batching.add_argument('--base-latency', type=float, default=0.8, help="Simulated per-request overhead in seconds.")
+    batching.add_argument('--output-latency', type=float, default=0.6, help="Simulated seconds to write one ticker's answer.")
+    batching.add_argument('--fail-rate', type=float, default=0.02, help="Share of tickers dropped from batched replies.")
+    batching.add_argument('--time-scale', type=float, default=0.01, help="Multiplier applied to the simulated sleeps.")
+
+    tiers = subparsers.add_parser('sentiment-tiers', help="Local lexicon vs Gemini sentiment tier, per-ticker latency (simulated model latency).")
+    tiers.add_argument('--tickers', type=int, default=600)
+    tiers.add_argument('--base-latency', type=float, default=0.8, help="Simulated per-request overhead in seconds.")
+    tiers.add_argument('--output-latency', type=float, default=0.6, help="Simulated seconds to write one ticker's answer.")
+    tiers.add_argument('--time-scale', type=float, default=0.01, help="Multiplier applied to the simulated sleeps.")
+
+    pipeline = subparsers.add_parser('pipeline', help="Offline fetch -> score -> analysis run on a synthetic or replayed data provider.")
+    pipeline.add_argument('--mode', choices=['synthetic', 'replay'], default='synthetic')
+    pipeline.add_argument('--fixtures', help="Directory of recorded responses (replay mode; default PROVIDER_FIXTURE_DIR).")
+    pipeline.add_argument('--tickers', type=int, default=100, help="Synthetic tickers, or the first N recorded tickers in replay mode.")
+    pipeline.add_argument('--latency-scale', type=float, default=0.01, help="Multiplier applied to the injected provider latency.")
+    pipeline.add_argument('--history-days', type=int, default=30, help="Window of the performance analysis stage.")
+    pipeline.add_argument('--runs', type=int, default=2, help="Repeats on fresh databases; later runs are compared with the first.")
+
+    concurrent = subparsers.add_parser('concurrent-reads', help="API latency while the scorer writes: per-call rollback-journal connections vs the WAL connection layer.")
+    concurrent.add_argument('--tickers', type=int, default=600)
+    concurrent.add_argument('--days', type=int, default=400)
+    concurrent.add_argument('--readers', type=int, default=3, help="Reader processes (Gunicorn workers).")
+    concurrent.add_argument('--rescore-dates', type=int, default=20, help="Recent dates whose prices and scores are rewritten on each pass.")
+    concurrent.add_argument('--think-ms', type=float, default=50.0, help="Pause between a reader's requests.")
+    concurrent.add_argument('--seconds', type=float, default=15.0, help="Measurement window per mode.")
+
+    latest = subparsers.add_parser('latest-reads', help="Portfolio/highlighted-stocks queries on the history tables vs the ticker_latest snapshot.")
+    latest.add_argument('--tickers', type=int, default=600)
+    latest.add_argument('--days', type=int, nargs='+', default=[250, 2520], help="History lengths to compare (trading days).")
+    latest.add_argument('--score-days', type=int, default=250, help="Trading days of daily_scores in each database.")
+    latest.add_argument('--repeats', type=int, default=50)
+
+    archive = subparsers.add_parser('archive', help="Full-history panel loads and a range backfill: SQLite vs the memory-mapped price archive.")
+    archive.add_argument('--tickers', type=int, default=600)
+    archive.add_argument('--days', type=int, default=2520, help="Trading days of history (2520 = 10 years).")
+    archive.add_argument('--dates', type=int, default=250, help="Trading days backfilled from each source.")
+
+    analytics_bench = subparsers.add_parser('analytics', help="Performance-analysis/backtest aggregations: DuckDB vs SQLite + pandas.")
+    analytics_bench.add_argument('--tickers', type=int, default=600)
+    analytics_bench.add_argument('--days', type=int, default=2520, help="Trading days of price history.")
+    analytics_bench.add_argument('--score-days', type=int, default=1000, help="Trading days of daily_scores.")
+    analytics_bench.add_argument('--window', type=int, default=20, help="Trailing-return window (trading days).")
+    analytics_bench.add_argument('--repeats', type=int, default=3)
+
+    args = parser.parse_args(argv)
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
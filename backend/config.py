@@ -27,6 +27,13 @@ GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 BRAVE_API_KEY = os.getenv('BRAVE_API_KEY')
 GEMINI_MODEL_NAME = os.getenv('GEMINI_MODEL_NAME', 'gemini-1.5-flash-latest') # Default if not set
 
+# --- Data Providers (providers.py) ---
+# Read from the environment so the scheduler's subprocesses use the same provider
+DATA_PROVIDER_MODE = os.getenv('DATA_PROVIDER_MODE', 'live') # 'live', 'record' (live + save responses), 'replay' (saved responses), 'synthetic' (generated data)
+PROVIDER_FIXTURE_DIR = os.getenv('PROVIDER_FIXTURE_DIR', os.path.join(PROJECT_ROOT, "fixtures")) # Responses written in 'record' mode and served in 'replay' mode
+PROVIDER_LATENCY_SCALE = float(os.getenv('PROVIDER_LATENCY_SCALE', '1.0')) # Multiplier on the latency injected in 'replay'/'synthetic' mode (0 = none)
+SYNTHETIC_LATENCY_SECONDS = {'yfinance': 0.3, 'brave': 0.35, 'gemini': 0.8, 'gemini_per_ticker': 0.6} # Simulated response times ('synthetic' mode)
+
 # --- Data Fetching ---
 # Use absolute path based on project root
 TICKER_LIST_FILE = os.path.join(PROJECT_ROOT, "backend", "sp600_tickers.txt") # Original
@@ -34,8 +41,82 @@ TICKER_LIST_FILE = os.path.join(PROJECT_ROOT, "backend", "sp600_tickers.txt") #
 MIN_PRICE_FILTER = 1.00 # Exclude stocks below $1.00
 MAX_PRICE_FILTER = 50.00 # Exclude stocks above $50.00
 ALLOWED_SECTORS = ["Technology", "Healthcare", "Industrials"] # Filter for these sectors (Note: Using Industrials instead of Defense as yfinance often uses broader categories)
+PRICE_HISTORY_PERIOD = "6mo" # History window requested from yfinance for each ticker
+PRICE_FETCH_MODE = "batch" # 'batch' = chunked multi-ticker yf.download, 'single' = one request per ticker
+PRICE_BATCH_CHUNK_SIZE = 100 # Tickers per yf.download request in batch mode
+PRICE_SYNC_MODE = "incremental" # 'incremental' = only dates after the last stored bar, 'full' = always PRICE_HISTORY_PERIOD
+PIPELINE_RETRY_PASSES = 1 # Extra passes at the end of a run over tickers whose price fetch or analysis failed (run_state.py)
+PRICE_SYNC_OVERLAP_DAYS = 5 # Calendar days re-fetched before the last stored date to pick up revised bars
+PRICE_ARCHIVE_DIR = os.path.join(PROJECT_ROOT, "archive", "prices") # Columnar price archive (price_archive.py)
+PRICE_ARCHIVE_SYNC = True # Update the archive at the end of each fetch run
+PRICE_PANEL_SOURCE = "sqlite" # Where panel_scorer loads prices: 'sqlite' or 'archive' (falls back to SQLite if the archive is behind)
+INFO_CACHE_FILE = os.path.join(PROJECT_ROOT, "cache", "yf_info_cache.json") # On-disk cache of yfinance .info metadata
+# Hours before each cached field is refetched. Name/sector rarely change; fundamentals are
+# only refreshed for tickers that pass the filters.
+INFO_CACHE_TTL_HOURS = {
+    'name': 24 * 30,
+    'sector': 24 * 30,
+    'price': 12,
+    'fundamentals': 20,
+}
+ANALYSIS_CACHE_FILE = os.path.join(PROJECT_ROOT, "cache", "gemini_analysis_cache.json") # Gemini analyses keyed by a hash of their inputs
+ANALYSIS_CACHE_MAX_AGE_DAYS = 30 # Cache entries not reused for this many days are dropped
+QUERY_PLAN_FILE = os.path.join(PROJECT_ROOT, "cache", "search_query_plans.json") # Search queries stored per ticker
+QUERY_PLAN_TTL_DAYS = 7 # Days a Gemini-generated query plan is reused before it is regenerated
+QUERY_PLAN_MODE = "gemini" # 'gemini' = Gemini-generated plans (templates as fallback), 'templates' = templated queries only (no Gemini query calls)
+# Deterministic search queries used when no Gemini plan is available ({name}, {ticker} are filled in)
+SEARCH_QUERY_TEMPLATES = [
+    "{name} {ticker} earnings results",
+    "{name} {ticker} guidance outlook analyst",
+    "{name} {ticker} risks lawsuit downgrade",
+]
+# Search-result store (search_store.py): Brave results kept in the database, deduplicated by URL
+SEARCH_QUERY_TTL_HOURS = 20 # Brave responses are reused for an identical query within this window (same-day reruns)
+SEARCH_RESULT_RETENTION_DAYS = 60 # Stored results and ticker links not seen for this many days are pruned
+SEARCH_NEW_RESULTS_ONLY = True # Send only results not in a ticker's earlier analyses; keep the latest analysis when nothing is new
+# Local sentiment tier (local_sentiment.py): VADER lexicon scores of search snippets, computed in-process
+LOCAL_SENTIMENT_FALLBACK = True # Score a ticker's search snippets locally when its Gemini analysis fails (errors, throttling, open circuit)
+LOCAL_SENTIMENT_OVER_BUDGET = True # Also score stored snippets of tickers left out by ANALYSIS_DAILY_BUDGET whose analysis expired
+LOCAL_SENTIMENT_LOOKBACK_DAYS = 7 # Stored search results linked to a ticker within this many days are scored for over-budget tickers
+# Event-driven prioritization (prioritizer.py): which tickers get a fresh AI analysis each night
+ANALYSIS_DAILY_BUDGET = 150 # Fresh analyses per night besides portfolio holdings (None = analyze every ticker)
+ANALYSIS_STALENESS_DAYS = 5 # Latest analysis is reused (fetch and scoring) while younger than this many days; 1 = same day only
+# Weights of the cheap local signals that rank tickers for the budget
+PRIORITY_WEIGHTS = {
+    'volume_spike': 1.0, # per 1x of volume above the 20-session average
+    'gap': 0.5, # per % gap between the last open and the previous close
+    'move': 0.3, # per % move of the last close
+    'staleness': 1.0, # per ANALYSIS_STALENESS_DAYS since the last analysis
+}
+
+# --- Concurrency & Rate Limits ---
+FETCH_MAX_WORKERS = 8 # Worker threads used for per-ticker network work in the nightly fetch
+# Token-bucket limits per upstream: 'rate' = sustained requests/second, 'burst' = requests allowed back-to-back
+RATE_LIMITS = {
+    'yfinance': {'rate': 5.0, 'burst': 5},
+    'brave': {'rate': 1.0, 'burst': 1}, # Brave free tier allows 1 query/second
+    'gemini': {'rate': 0.25, 'burst': 2}, # ~15 requests/minute
+}
+ANALYSIS_ENGINE = "async" # 'async' = asyncio pipeline (async_analyzer.py), 'threads' = worker pool running the sequential analyzer
+ANALYSIS_MAX_TICKERS_IN_FLIGHT = 16 # Tickers the async pipeline analyzes at the same time
+ANALYSIS_CONCURRENCY = {'brave': 4, 'gemini': 8} # Max simultaneous requests per API (the adaptive limit never exceeds this; RATE_LIMITS still apply)
+# Retry / backoff / circuit breaker for Brave and Gemini calls (fetch_engine.UpstreamController)
+RETRY_MAX_ATTEMPTS = 5 # Attempts per call before giving up (throttles and transient errors only; other errors are not retried)
+RETRY_BASE_DELAY_SECONDS = 1.0 # Backoff before retry n is uniform in [0, base * 2**n] (full jitter), at least any Retry-After
+RETRY_MAX_DELAY_SECONDS = 60.0 # Cap on a single backoff
+AIMD_INCREASE_AFTER = 10 # Consecutive successes before an upstream's concurrency limit grows by one
+AIMD_DECREASE_FACTOR = 0.5 # Concurrency limit multiplier when an upstream throttles (429/503)
+CIRCUIT_FAILURE_THRESHOLD = 5 # Consecutive failed attempts that open an upstream's circuit breaker
+CIRCUIT_COOLDOWN_SECONDS = 30 # Seconds an open circuit waits before letting one probe call through
+ANALYSIS_BATCH_SIZE = 8 # Tickers packed into one Gemini analysis request by the async pipeline (1 = one request per ticker)
+ANALYSIS_BATCH_TOKEN_BUDGET = 12000 # Estimated prompt tokens allowed per batched analysis request
+ANALYSIS_BATCH_MAX_WAIT_SECONDS = 2.0 # Longest a partly filled batch waits for more tickers before it is sent
 
 # --- Scoring Parameters (Tunable) ---
+SCORING_ENGINE = "panel" # 'panel' = vectorized across all tickers (panel_scorer.py), 'per_ticker' = original per-ticker loop
+INDICATOR_BACKEND = "numpy" # Per-ticker path only: 'numpy' (indicators.py) or 'pandas_ta' (optional dependency)
+SCORING_LOOKBACK_DAYS = 250 # Calendar days of price history loaded before the scored date
+NEXT_DAY_LOOKAHEAD_DAYS = 4 # Calendar days after the scored date searched for the next open
 # NEWS_SENTIMENT_DAYS = 3     # Look at news from the last X days (Currently using Gemini daily analysis)
 PRICE_MOMENTUM_DAYS = 5     # Look at price change over the last X trading days
 VOLUME_AVG_DAYS = 20        # Calculate average volume over the last X trading days
@@ -117,6 +198,7 @@ PS_RATIO_LOW_PTS = 1
 PS_RATIO_HIGH_PTS = -1
 
 # 200-day Moving Average (Price vs. MA200)
+MA200_PERIOD = 200
 MA200_PRICE_ABOVE_PTS = 1
 MA200_PRICE_BELOW_PTS = -1
 
@@ -145,6 +227,12 @@ WEIGHT_PB_RATIO = 1.0
 WEIGHT_PS_RATIO = 1.0
 WEIGHT_MA200 = 1.0
 WEIGHT_ATR = 1.0 # Add weight for ATR
+# Multiplier on WEIGHT_SENTIMENT by the tier that produced the score (news_articles.sentiment_source; NULL = 'gemini')
+SENTIMENT_SOURCE_WEIGHTS = {
+    'gemini': 1.0, # Gemini analysis of the search results
+    'vader': 0.5, # Local lexicon fallback (local_sentiment.py)
+    'none': 0.0, # Failed analysis stored with a neutral placeholder score
+}
 
 # --- Portfolio ---
 PORTFOLIO_SELL_SCORE_THRESHOLD = -1 # Suggest selling if score drops below this
@@ -153,6 +241,18 @@ PORTFOLIO_SELL_SCORE_THRESHOLD = -1 # Suggest selling if score drops below this
 SCHEDULE_TIME = "19:00" # Time to run daily (e.g., 7:00 PM)
 ANALYSIS_HISTORY_DAYS = 90 # Default days for performance analysis
 
+# --- SQLite (database.py) ---
+# Applied to every connection; WAL lets the web workers keep reading while the nightly run writes
+SQLITE_JOURNAL_MODE = "WAL" # Persistent in the file; set by the first writable connection
+SQLITE_SYNCHRONOUS = "NORMAL" # NORMAL is durable across app crashes in WAL mode (a power loss can drop the last commits)
+SQLITE_CACHE_SIZE_KIB = 64 * 1024 # Page cache per connection
+SQLITE_MMAP_SIZE_BYTES = 256 * 1024 * 1024 # Memory-mapped reads (0 = off)
+SQLITE_TEMP_STORE = "MEMORY" # Sorts and temp indexes for large reads stay off disk
+SQLITE_BUSY_TIMEOUT_MS = 15000 # Wait this long for a lock before raising "database is locked"
+
+# --- Analytics (analytics.py) ---
+ANALYTICS_ENGINE = "auto" # 'duckdb' (in-process DuckDB over stocks.db, read-only), 'pandas' (SQLite rows + pandas) or 'auto' (DuckDB if installed)
+
 # --- API Endpoints ---
 BRAVE_SEARCH_ENDPOINT = 'https://api.search.brave.com/res/v1/web/search' # Using WEB Search endpoint
 
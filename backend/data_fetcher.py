@@ -1,8 +1,17 @@
-import yfinance as yf
 import requests
 import sqlite3
 import database # To use get_db_connection
 import gemini_analyzer # Import the new module
+import fetch_engine # Worker pool, rate limiters and single DB writer
+import info_cache # TTL cache for yfinance .info metadata
+import analysis_cache # Content-hash cache of Gemini analyses
+import query_plans # Stored search-query plans
+import prioritizer # Picks the tickers that get a fresh analysis
+import search_store # Stored Brave results, deduplicated by URL
+import local_sentiment # Lexicon sentiment tier
+import run_state # Checkpoints of the nightly pipeline (--resume)
+import providers # Live / recorded / synthetic yfinance, Brave and Gemini data
+import price_archive # Columnar price panels synced after each run
 from datetime import datetime, timedelta, date # Add date import
 import time
 import os
@@ -18,8 +27,9 @@ logger = setup_logger('data_fetcher', config.LOG_FILE_FETCHER)
 
 # sentiment_analyzer = SentimentIntensityAnalyzer() # No longer needed
 
-def load_tickers_from_file(filename=config.TICKER_LIST_FILE): # Use config
-    """Loads tickers from a file, one per line."""
+def load_tickers_from_file(filename=None):
+    """Loads tickers from a file, one per line (config.TICKER_LIST_FILE by default)."""
+    filename = filename or config.TICKER_LIST_FILE # Use config
     logger.debug(f"Attempting to load tickers from: {filename}")
     try:
         with open(filename, 'r') as f:
@@ -43,19 +53,108 @@ def get_etf_holdings(etf_ticker):
     # Example: return ['AAPL', 'MSFT', ...]
     return []
 
+def extract_fundamentals(ticker, stock_info):
+    """
+    Pulls the scoring fundamentals (P/E, dividend yield, D/E, P/B, P/S) out of a yfinance .info dict.
+
+    Values that are missing or not numeric are stored as None.
+    """
+    def to_float(key, label):
+        value = stock_info.get(key)
+        try:
+            return float(value) if value is not None else None
+        except (ValueError, TypeError):
+            logger.warning(f"Could not convert {label} '{value}' to float for {ticker}.")
+            return None
+
+    debt_to_equity = to_float('debtToEquity', 'Debt-to-Equity')
+    if debt_to_equity is not None and debt_to_equity > 5:
+        # Normalize D/E (sometimes reported as %, sometimes as ratio)
+        debt_to_equity = debt_to_equity / 100.0
+
+    return {
+        'pe_ratio': to_float('trailingPE', 'P/E ratio'),
+        'dividend_yield': to_float('dividendYield', 'Dividend Yield'),
+        'debt_to_equity': debt_to_equity,
+        'pb_ratio': to_float('priceToBook', 'Price-to-Book'),
+        'ps_ratio': to_float('priceToSalesTrailing12Months', 'Price-to-Sales'),
+    }
+
+def _fetch_company_info(ticker):
+    """
+    Fetches yfinance .info for one ticker (through the data provider).
+
+    Runs on a worker thread; makes network calls only (no DB access).
+
+    Returns:
+        dict: 'name', 'sector', 'price' (None if unavailable) and 'fundamentals'.
+    """
+    yf_limiter = fetch_engine.get_rate_limiter('yfinance')
+    yf_limiter.acquire()
+    provider = providers.get_provider()
+    stock_info = provider.company_info(ticker)
+
+    current_price = stock_info.get('currentPrice') or stock_info.get('previousClose')
+    if current_price is None:
+         # Try fetching last close price if currentPrice is missing
+         yf_limiter.acquire()
+         hist = provider.price_history(ticker, period="1d")
+         if not hist.empty:
+             current_price = float(hist['Close'].iloc[-1])
+
+    return {
+        'name': stock_info.get('longName', f"{ticker} Name Not Found"),
+        # Determine sector - yfinance info might have 'sector', 'industry', etc.
+        # Using 'industry' as a fallback if 'sector' is missing. Could be refined.
+        'sector': stock_info.get('sector', stock_info.get('industry', 'Unknown')),
+        'price': current_price,
+        'fundamentals': extract_fundamentals(ticker, stock_info),
+    }
+
+def _refresh_company_info(cache, ticker):
+    """Fetches .info for a ticker and stores every field in the info cache."""
+    company_info = _fetch_company_info(ticker)
+    fetched_at = time.time()
+    for field, value in company_info.items():
+        cache.put(ticker, field, value, fetched_at)
+    return company_info
+
+def _passes_universe_filters(ticker, name, sector, current_price):
+    """Applies the price and sector filters from config, logging why a ticker is skipped."""
+    # Apply Price Filter
+    if current_price is None or not (config.MIN_PRICE_FILTER <= current_price < config.MAX_PRICE_FILTER):
+        price_reason = f"below ${config.MIN_PRICE_FILTER:.2f}" if (current_price is not None and current_price < config.MIN_PRICE_FILTER) else f"above ${config.MAX_PRICE_FILTER:.2f}"
+        unavailable_reason = "unavailable" if current_price is None else ""
+        reason = unavailable_reason or price_reason
+        logger.info(f"Skipping {ticker} due to price filter: Price=({current_price}), Reason='{reason}'.")
+        return False
+
+    # Apply Sector Filter
+    if sector not in config.ALLOWED_SECTORS:
+        logger.info(f"Skipping {ticker} due to sector filter: Sector='{sector}'.")
+        return False
+
+    logger.info(f"Adding/Updating company in DB: {ticker} - {name} (Sector: {sector}, Price: {current_price:.2f})")
+    return True
+
 def update_company_list():
     """
     Fetches company list from file, gets info/price, applies filter,
     and updates the database.
+
+    Metadata comes from the on-disk info cache (see info_cache.InfoCache), so only
+    stale entries hit the network:
+      1. Full .info lookups (concurrent, rate limited) for tickers whose name/sector expired.
+      2. One batched price download for tickers where only the price expired.
+      3. Filters are applied to the cached values.
+      4. Full .info lookups for filtered tickers whose fundamentals expired.
+    The filtered companies and any refreshed fundamentals are written in one transaction.
     """
-    conn = database.get_db_connection()
-    cursor = conn.cursor()
     logger.info("Starting company list update and filtering...")
 
     source_tickers = load_tickers_from_file()
     if not source_tickers:
         logger.error("No source tickers loaded from file.")
-        conn.close()
         return []
 
     # --- Debugging ---
@@ -64,59 +163,60 @@ def update_company_list():
         logger.debug(f"First 5 source tickers: {source_tickers[:5]}")
     # --- End Debugging ---
 
-    valid_tickers = set()
-    processed_count = 0
-    skipped_count = 0
-
-    for ticker in source_tickers:
-        processed_count += 1
-        logger.debug(f"Processing ticker {processed_count}/{len(source_tickers)}: {ticker}")
-        try:
-            stock = yf.Ticker(ticker)
-            stock_info = stock.info
-
-            # Apply Price Filter
-            current_price = stock_info.get('currentPrice') or stock_info.get('previousClose')
-            if current_price is None:
-                 # Try fetching last close price if currentPrice is missing
-                 hist = stock.history(period="1d")
-                 if not hist.empty:
-                     current_price = hist['Close'].iloc[-1]
-
-            # Use filters from config
-            if current_price is None or not (config.MIN_PRICE_FILTER <= current_price < config.MAX_PRICE_FILTER):
-                price_reason = f"below ${config.MIN_PRICE_FILTER:.2f}" if (current_price is not None and current_price < config.MIN_PRICE_FILTER) else f"above ${config.MAX_PRICE_FILTER:.2f}"
-                unavailable_reason = "unavailable" if current_price is None else ""
-                reason = unavailable_reason or price_reason
-                logger.info(f"Skipping {ticker} due to price filter: Price=({current_price}), Reason='{reason}'.")
-                skipped_count += 1
-                # Optional: Remove from DB if it exists but no longer qualifies
-                # cursor.execute("DELETE FROM companies WHERE ticker = ?", (ticker,))
-                continue
-
-            # Get required info
-            name = stock_info.get('longName', f"{ticker} Name Not Found")
-            # Determine sector - yfinance info might have 'sector', 'industry', etc.
-            # Using 'industry' as a fallback if 'sector' is missing. Could be refined.
-            sector = stock_info.get('sector', stock_info.get('industry', 'Unknown'))
-
-            # Apply Sector Filter
-            if sector not in config.ALLOWED_SECTORS:
-                logger.info(f"Skipping {ticker} due to sector filter: Sector='{sector}'.")
-                skipped_count += 1
-                continue
-
-            logger.info(f"Adding/Updating company in DB: {ticker} - {name} (Sector: {sector}, Price: {current_price:.2f})")
-            cursor.execute(
-                "INSERT OR REPLACE INTO companies (ticker, name, sector) VALUES (?, ?, ?)",
-                (ticker, name, sector)
-            )
-            valid_tickers.add(ticker)
-            time.sleep(0.2) # Shorter delay as we filter more
+    cache = info_cache.InfoCache().load()
+    stale_by_ticker = {ticker: cache.stale_fields(ticker, ('name', 'sector', 'price')) for ticker in source_tickers}
+
+    # 1. Full .info refresh where name/sector expired (also refreshes price and fundamentals)
+    info_tickers = [ticker for ticker, stale in stale_by_ticker.items() if stale & {'name', 'sector'}]
+    refreshed = fetch_engine.run_concurrently(lambda ticker: _refresh_company_info(cache, ticker), info_tickers, label="company-info")
+
+    # 2. Cheap batched price refresh where only the price expired
+    price_tickers = [ticker for ticker, stale in stale_by_ticker.items() if 'price' in stale and not refreshed.get(ticker)]
+    if price_tickers:
+        logger.info(f"Refreshing cached prices for {len(price_tickers)} tickers with one batched download...")
+        for ticker, prices in fetch_price_history_batch(price_tickers, period="5d").items():
+            if prices:
+                _, _, _, _, _, close_price, _ = prices[-1] # Latest history_to_rows row
+                cache.put(ticker, 'price', close_price)
+
+    # 3. Apply filters to cached values (stale values are still used if a refresh failed)
+    valid_tickers = [
+        ticker for ticker in source_tickers
+        if _passes_universe_filters(ticker, cache.get(ticker, 'name'), cache.get(ticker, 'sector'), cache.get(ticker, 'price'))
+    ]
+
+    # 4. Fundamentals are only needed for the filtered universe
+    fundamentals_tickers = [
+        ticker for ticker in valid_tickers
+        if not refreshed.get(ticker) and cache.stale_fields(ticker, ('fundamentals',))
+    ]
+    refreshed.update(fetch_engine.run_concurrently(lambda ticker: _refresh_company_info(cache, ticker), fundamentals_tickers, label="fundamentals"))
+
+    companies = [(ticker, cache.get(ticker, 'name'), cache.get(ticker, 'sector')) for ticker in valid_tickers]
+    fundamentals_rows = [(ticker, refreshed[ticker]['fundamentals']) for ticker in valid_tickers if refreshed.get(ticker)]
+    processed_count = len(source_tickers)
+    skipped_count = processed_count - len(valid_tickers)
+
+    cache.save()
+    cache.log_stats(logger)
 
-        except Exception as e:
-            logger.exception(f"Error processing ticker {ticker} during company update: {e}") # Log traceback
-            skipped_count += 1
+    conn = database.get_db_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        "INSERT OR REPLACE INTO companies (ticker, name, sector) VALUES (?, ?, ?)",
+        companies
+    )
+    # Persist freshly fetched fundamentals so scoring can run offline from the database
+    as_of_date = date.today().strftime('%Y-%m-%d')
+    cursor.executemany(
+        """
+        INSERT OR REPLACE INTO fundamentals_snapshot
+        (ticker, as_of_date, pe_ratio, dividend_yield, debt_to_equity, pb_ratio, ps_ratio)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        [(ticker, as_of_date, f['pe_ratio'], f['dividend_yield'], f['debt_to_equity'], f['pb_ratio'], f['ps_ratio'])
+         for ticker, f in fundamentals_rows]
+    )
 
     # Optional: Remove companies from DB that are no longer in the filtered list
     # This requires getting the current list from DB and comparing
@@ -129,31 +229,167 @@ def update_company_list():
 
     conn.commit()
     conn.close()
-    logger.info(f"Company list update complete. Processed: {processed_count}, Added/Updated: {len(valid_tickers)}, Skipped (filter/error): {skipped_count}")
+    logger.info(f"Company list update complete. Processed: {processed_count}, Added/Updated: {len(valid_tickers)} ({len(fundamentals_rows)} fundamentals snapshots), Skipped (filter/error): {skipped_count}")
     return sorted(list(valid_tickers))
 
-def fetch_price_history(ticker, period="6mo"): # Fetch 6 months history
-    """Fetches historical price data for a ticker."""
+def history_to_rows(ticker, hist):
+    """
+    Converts a yfinance OHLCV DataFrame into price_history rows without a Python-level row loop.
+
+    Returns:
+        list: (ticker, date, open_price, high_price, low_price, close_price, volume) tuples,
+        ready for executemany. High/Low are stored as NULL when the frame lacks them.
+    """
+    dates = hist.index.strftime('%Y-%m-%d')
+    volumes = hist['Volume'].fillna(0).astype('int64')
+    missing = [None] * len(hist)
+    # .tolist() yields native Python floats/ints, which sqlite3 binds directly (NaN is stored as NULL)
+    return list(zip(
+        [ticker] * len(hist),
+        dates.tolist(),
+        hist['Open'].astype(float).tolist(),
+        hist['High'].astype(float).tolist() if 'High' in hist.columns else missing,
+        hist['Low'].astype(float).tolist() if 'Low' in hist.columns else missing,
+        hist['Close'].astype(float).tolist(),
+        volumes.tolist()
+    ))
+
+def fetch_price_history(ticker, period=config.PRICE_HISTORY_PERIOD, start=None): # Fetch 6 months history
+    """
+    Fetches historical price data for a ticker (through the data provider).
+
+    If start (YYYY-MM-DD) is given, only bars from that date onwards are requested
+    and period is ignored.
+    """
     try:
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period=period)
+        fetch_engine.get_rate_limiter('yfinance').acquire()
+        hist = providers.get_provider().price_history(ticker, period=period, start=start)
         # Ensure columns exist (also fetch Open for next-day perf calc)
         if not all(col in hist.columns for col in ['Open', 'Close', 'Volume']):
              logger.warning(f"Missing required columns ('Open', 'Close', 'Volume') in history for {ticker}. Columns found: {list(hist.columns)}")
              return []
-        prices = []
-        for index, row in hist.iterrows():
-            prices.append({
-                'date': index.strftime('%Y-%m-%d'),
-                'open_price': row['Open'], # Add Open price
-                'close_price': row['Close'],
-                'volume': int(row['Volume']) if row['Volume'] else 0
-            })
-        return prices
+        return history_to_rows(ticker, hist)
     except Exception as e:
         logger.exception(f"Error fetching price history for {ticker}: {e}") # Log traceback
         return []
 
+def _download_price_chunks(tickers, chunk_size, label, **range_kwargs):
+    """
+    Runs chunked multi-ticker yf.download requests for one date range.
+
+    Returns:
+        tuple: (dict of ticker -> list of price rows, list of tickers that failed)
+    """
+    prices_by_ticker = {}
+    failed_tickers = []
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+    logger.info(f"Batch downloading price history ({label}) for {len(tickers)} tickers in {len(chunks)} chunk(s) of up to {chunk_size}...")
+
+    for chunk_num, chunk in enumerate(chunks, start=1):
+        chunk_start = time.perf_counter()
+        try:
+            fetch_engine.get_rate_limiter('yfinance').acquire()
+            data = providers.get_provider().price_download(chunk, **range_kwargs) # yf.download(group_by='ticker') shape
+        except Exception as e:
+            logger.exception(f"Batch download failed for chunk {chunk_num}/{len(chunks)} ({label}): {e}")
+            failed_tickers.extend(chunk)
+            continue
+
+        chunk_ok = 0
+        for ticker in chunk:
+            try:
+                hist = data[ticker]
+            except KeyError:
+                failed_tickers.append(ticker)
+                continue
+            # Failed symbols come back as all-NaN columns; drop rows without a close
+            hist = hist.dropna(subset=['Close'])
+            if hist.empty or not all(col in hist.columns for col in ['Open', 'Close', 'Volume']):
+                failed_tickers.append(ticker)
+                continue
+            prices_by_ticker[ticker] = history_to_rows(ticker, hist)
+            chunk_ok += 1
+
+        elapsed = time.perf_counter() - chunk_start
+        logger.info(f"Chunk {chunk_num}/{len(chunks)} ({label}): {chunk_ok}/{len(chunk)} tickers downloaded in {elapsed:.2f}s.")
+
+    return prices_by_ticker, failed_tickers
+
+def fetch_price_history_batch(tickers, period=config.PRICE_HISTORY_PERIOD, chunk_size=config.PRICE_BATCH_CHUNK_SIZE, start_dates=None):
+    """
+    Fetches historical price data for many tickers using chunked multi-ticker yf.download requests.
+
+    Tickers missing from a chunk's result (or whose chunk request failed outright) are
+    retried one at a time with fetch_price_history.
+
+    Args:
+        tickers (list): Tickers to download.
+        period (str): yfinance period used for tickers without a start date.
+        chunk_size (int): Tickers per yf.download request.
+        start_dates (dict, optional): ticker -> YYYY-MM-DD start date (incremental sync).
+            Tickers sharing a start date are downloaded together.
+
+    Returns:
+        dict: ticker -> list of price rows (same shape as fetch_price_history).
+    """
+    start_dates = start_dates or {}
+    groups = {}
+    for ticker in tickers:
+        groups.setdefault(start_dates.get(ticker), []).append(ticker)
+
+    prices_by_ticker = {}
+    failed_tickers = []
+    for start, group in sorted(groups.items(), key=lambda item: item[0] or ''):
+        if start:
+            group_prices, group_failed = _download_price_chunks(group, chunk_size, f"from {start}", start=start)
+        else:
+            group_prices, group_failed = _download_price_chunks(group, chunk_size, f"period {period}", period=period)
+        prices_by_ticker.update(group_prices)
+        failed_tickers.extend(group_failed)
+
+    if failed_tickers:
+        logger.warning(f"Retrying {len(failed_tickers)} ticker(s) individually after batch download: {failed_tickers}")
+        for ticker in failed_tickers:
+            prices = fetch_price_history(ticker, period=period, start=start_dates.get(ticker))
+            if prices:
+                prices_by_ticker[ticker] = prices
+            else:
+                logger.warning(f"Single-ticker retry returned no price history for {ticker}.")
+
+    logger.info(f"Batch price download complete: {len(prices_by_ticker)}/{len(tickers)} tickers have price history.")
+    return prices_by_ticker
+
+def get_price_sync_start_dates(tickers, full_resync=False):
+    """
+    Works out where each ticker's price download should start.
+
+    In incremental mode the last stored date per ticker is read with a single query and
+    the download restarts PRICE_SYNC_OVERLAP_DAYS before it, so revised bars are
+    re-upserted. Tickers without stored history (or every ticker on a full resync) get
+    no start date and fall back to the full PRICE_HISTORY_PERIOD.
+
+    Returns:
+        dict: ticker -> YYYY-MM-DD start date (only for tickers synced incrementally).
+    """
+    if full_resync or config.PRICE_SYNC_MODE != 'incremental':
+        logger.info("Price sync mode: full resync.")
+        return {}
+
+    conn = database.get_db_connection()
+    try:
+        last_dates = database.get_last_price_dates(conn)
+    finally:
+        conn.close()
+
+    start_dates = {}
+    for ticker in tickers:
+        last_date = last_dates.get(ticker)
+        if last_date:
+            start = datetime.strptime(last_date, '%Y-%m-%d') - timedelta(days=config.PRICE_SYNC_OVERLAP_DAYS)
+            start_dates[ticker] = start.strftime('%Y-%m-%d')
+    logger.info(f"Price sync mode: incremental. {len(start_dates)}/{len(tickers)} tickers have stored history; the rest get a full {config.PRICE_HISTORY_PERIOD} download.")
+    return start_dates
+
 def fetch_news(ticker, company_name, days=3):
     """Fetches news articles for a ticker using Brave Search API. DEPRECATED."""
     # This function is now effectively handled within gemini_analyzer.py
@@ -163,50 +399,32 @@ def fetch_news(ticker, company_name, days=3):
 
 
 def analyze_sentiment(text):
-    """Analyzes sentiment of a text snippet using VADER. DEPRECATED."""
-    # This function is no longer used as sentiment comes from Gemini
-    logger.warning("Deprecated function analyze_sentiment called.")
-    return 0.0
-
-
-def update_data_for_ticker(ticker):
-    """Fetches and updates all data for a single ticker."""
-    logger.info(f"--- Starting data update for {ticker} ---")
-    conn = database.get_db_connection()
-    cursor = conn.cursor()
-    now_iso = datetime.now().isoformat()
-
-    # 1. Fetch and store price history
-    logger.debug(f"Fetching price history for {ticker}...")
-    prices = fetch_price_history(ticker, period="6mo") # Fetch 6 months for charting/SMA
-    if prices:
-        # Also add 'open_price' to the INSERT statement
-        for price_data in prices:
-            try:
-                cursor.execute(
-                    "INSERT OR REPLACE INTO price_history (ticker, date, open_price, close_price, volume) VALUES (?, ?, ?, ?, ?)",
-                    (ticker, price_data['date'], price_data['open_price'], price_data['close_price'], price_data['volume'])
-                )
-            except sqlite3.IntegrityError:
-                 logger.warning(f"Duplicate price data for {ticker} on {price_data['date']}. Skipping insert.")
-            except Exception as e:
-                 logger.exception(f"Error inserting price data for {ticker} on {price_data['date']}: {e}") # Log traceback
-        conn.commit()
-        logger.info(f"Stored/Updated {len(prices)} price points for {ticker}.")
-    else:
-        logger.warning(f"No price history found or error fetching for {ticker}.")
+    """Analyzes sentiment of a text snippet using VADER (compound score; 0.0 without vaderSentiment)."""
+    # Single-text wrapper around the local tier; the pipeline scores snippets in batches via local_sentiment
+    if not local_sentiment.available():
+        return 0.0
+    return local_sentiment.score_texts([text])[0]
 
 
-    # Get company name from DB for Gemini analysis
-    cursor.execute("SELECT name FROM companies WHERE ticker = ?", (ticker,))
-    company_row = cursor.fetchone()
-    company_name = company_row['name'] if company_row else ticker # Fallback to ticker if name not found
-
-    # 2. Perform Gemini Analysis (Generates query, searches Brave, analyzes results)
-    analysis_result = gemini_analyzer.get_analysis_for_stock(ticker, company_name)
-    analysis_date_str = date.today().strftime('%Y-%m-%d') # Use today as the date for the analysis entry
+def store_price_rows(conn, rows):
+    """
+    Bulk-upserts price_history rows (any mix of tickers) and logs the write throughput.
 
-    # 3. Store Gemini Analysis Result
+    Returns:
+        int: Number of rows written.
+    """
+    if not rows:
+        return 0
+    start = time.perf_counter()
+    written = database.bulk_upsert_prices(conn, rows)
+    elapsed = time.perf_counter() - start
+    rate = written / elapsed if elapsed > 0 else float('inf')
+    logger.info(f"Stored/Updated {written} price rows in {elapsed:.3f}s ({rate:,.0f} rows/s).")
+    return written
+
+def store_analysis(conn, ticker, analysis_result, analysis_date_str, fetched_at):
+    """Stores one Gemini analysis entry for a ticker/date and commits (rolls back and re-raises on error)."""
+    cursor = conn.cursor()
     # We store one entry per ticker per day representing the Gemini analysis
     # Use a placeholder URL/Title as they are less relevant now
     placeholder_url = f"gemini_analysis_{ticker}_{analysis_date_str}"
@@ -221,8 +439,8 @@ def update_data_for_ticker(ticker):
         cursor.execute(
             """
             INSERT OR REPLACE INTO news_articles
-            (ticker, url, title, snippet, published_date, fetched_date, sentiment_score, gemini_summary, bullish_points, bearish_points)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            (ticker, url, title, snippet, published_date, fetched_date, sentiment_score, gemini_summary, bullish_points, bearish_points, sentiment_source)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 ticker,
@@ -230,44 +448,372 @@ def update_data_for_ticker(ticker):
                 placeholder_title,
                 None, # Snippet no longer directly stored
                 analysis_date_str, # Use analysis date
-                now_iso, # Fetched/Analysis timestamp
+                fetched_at, # Fetched/Analysis timestamp
                 analysis_result.get('sentiment_score', 0.0),
                 analysis_result.get('summary', 'Analysis failed.'),
                 bullish_json,
-                bearish_json
+                bearish_json,
+                analysis_result.get('source', 'gemini') # Tier that produced the score
             )
         )
+        database.refresh_latest_analysis(cursor, [ticker])
         conn.commit()
         logger.info(f"Stored Gemini analysis for {ticker} for date {analysis_date_str}.")
     except Exception as e:
-        logger.exception(f"Error inserting Gemini analysis for {ticker} for date {analysis_date_str}: {e}") # Log full traceback
+        logger.error(f"Error inserting Gemini analysis for {ticker} for date {analysis_date_str}: {e}")
         conn.rollback() # Rollback on error
+        raise # The caller (or DB writer) records the failure and logs the traceback
+
+def store_unchanged_analysis(conn, ticker, source_date_str, analysis_date_str, fetched_at):
+    """
+    Copies the ticker's analysis stored for source_date_str to analysis_date_str, for
+    tickers whose searches found nothing new since that analysis. Rolls back and
+    re-raises on error.
+    """
+    if source_date_str == analysis_date_str:
+        return
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO news_articles
+            (ticker, url, title, snippet, published_date, fetched_date, sentiment_score, gemini_summary, bullish_points, bearish_points, sentiment_source)
+            SELECT ticker, ?, ?, snippet, ?, ?, sentiment_score, gemini_summary, bullish_points, bearish_points, sentiment_source
+            FROM news_articles
+            WHERE ticker = ? AND published_date = ?
+            ORDER BY fetched_date DESC LIMIT 1
+            """,
+            (f"gemini_analysis_{ticker}_{analysis_date_str}", f"Gemini Analysis for {ticker} on {analysis_date_str}",
+             analysis_date_str, fetched_at, ticker, source_date_str)
+        )
+        database.refresh_latest_analysis(cursor, [ticker])
+        conn.commit()
+        if cursor.rowcount:
+            logger.info(f"No new search results for {ticker}; carried its {source_date_str} analysis forward to {analysis_date_str}.")
+        else:
+            logger.warning(f"No new search results for {ticker}, but no stored analysis for {source_date_str} to carry forward.")
+    except Exception as e:
+        logger.error(f"Error carrying forward the analysis for {ticker} to {analysis_date_str}: {e}")
+        conn.rollback()
+        raise
+
+def analysis_write(ticker, analysis_result, analysis_date_str, fetched_at, store=None):
+    """
+    Returns (func, args) for the DB write of an analysis result: store_analysis, or
+    store_unchanged_analysis when the result is None (no new search results).
+    """
+    if analysis_result is None:
+        return store_unchanged_analysis, (ticker, store.last_analyzed_date(ticker), analysis_date_str, fetched_at)
+    return store_analysis, (ticker, analysis_result, analysis_date_str, fetched_at)
+
+def _get_company_names(conn):
+    """Returns a dict of ticker -> company name for all tracked companies."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT ticker, name FROM companies")
+    return {row['ticker']: row['name'] for row in cursor.fetchall()}
+
+def update_analysis_for_ticker(ticker, writer=None, company_name=None, cache=None, plans=None, store=None, run=None):
+    """
+    Runs the Gemini analysis for a single ticker and stores the result.
+
+    Args:
+        ticker (str): The ticker to analyze.
+        writer (fetch_engine.DBWriter, optional): Writer that performs the DB write.
+            When None (standalone use), the write goes through a connection opened here.
+        company_name (str, optional): Company name for the analysis prompt; looked up
+            in the companies table when not given.
+        cache (analysis_cache.AnalysisCache, optional): Reuses earlier analyses of unchanged search results.
+        plans (query_plans.QueryPlanStore, optional): Reuses stored search-query plans.
+        store (search_store.SearchResultStore, optional): Reuses recent Brave responses and
+            sends only new results; keeps the latest analysis when nothing is new.
+        run (run_state.PipelineRun, optional): Records the ticker's 'analysis' checkpoint
+            together with the write.
+
+    Returns:
+        dict or None: The stored analysis, or None when the latest analysis was carried forward.
+    """
+    now_iso = datetime.now().isoformat()
+
+    # Get company name from DB for Gemini analysis
+    if company_name is None:
+        conn = database.get_db_connection()
+        company_name = _get_company_names(conn).get(ticker, ticker) # Fallback to ticker if name not found
+        conn.close()
+
+    # Perform Gemini Analysis (Generates query, searches Brave, analyzes results)
+    analysis_result = gemini_analyzer.get_analysis_for_stock(ticker, company_name, cache=cache, plans=plans, store=store)
+    analysis_date_str = date.today().strftime('%Y-%m-%d') # Use today as the date for the analysis entry
 
+    # Store Gemini Analysis Result
+    write, args = analysis_write(ticker, analysis_result, analysis_date_str, now_iso, store=store)
+    if run is not None:
+        run.store_and_mark('analysis', [ticker], run_state.analysis_status(analysis_result), write, *args, writer=writer)
+    elif writer is not None:
+        writer.submit(write, *args)
+    else:
+        conn = database.get_db_connection()
+        try:
+            write(conn, *args)
+        finally:
+            conn.close()
+    return analysis_result
+
+def update_prices_for_ticker(ticker, start=None, writer=None, run=None):
+    """
+    Fetches and stores the price history of a single ticker (see update_data_for_ticker).
+    With a run_state.PipelineRun, the 'prices' checkpoint is recorded together with the write.
+
+    Returns:
+        bool: True if price rows were fetched.
+    """
+    logger.debug(f"Fetching price history for {ticker}...")
+    rows = fetch_price_history(ticker, start=start) # Fetch 6 months (or the missing range) for charting/SMA
+    if rows:
+        if run is not None:
+            run.store_and_mark('prices', [ticker], run_state.DONE, store_price_rows, rows, writer=writer)
+        elif writer is not None:
+            writer.submit(store_price_rows, rows)
+        else:
+            conn = database.get_db_connection()
+            store_price_rows(conn, rows)
+            conn.close()
+        return True
+    logger.warning(f"No price history found or error fetching for {ticker}.")
+    return False
+
+def run_async_analysis(tickers, company_names, writer, cache=None, plans=None, store=None, run=None):
+    """
+    Analyzes all tickers on the asyncio pipeline (async_analyzer.py) and queues each
+    result on the writer as soon as it is ready (together with its checkpoint when a
+    run_state.PipelineRun is given).
+    """
+    import async_analyzer # Imported lazily: only needed when ANALYSIS_ENGINE is 'async'
+    analysis_date_str = date.today().strftime('%Y-%m-%d')
+
+    def on_result(ticker, analysis_result):
+        write, args = analysis_write(ticker, analysis_result, analysis_date_str, datetime.now().isoformat(), store=store)
+        if run is not None:
+            run.store_and_mark('analysis', [ticker], run_state.analysis_status(analysis_result), write, *args, writer=writer)
+        else:
+            writer.submit(write, *args)
+
+    logger.info(f"Beginning async analysis for {len(tickers)} tickers with up to {config.ANALYSIS_MAX_TICKERS_IN_FLIGHT} in flight...")
+    analyzer = async_analyzer.AsyncAnalyzer(cache=cache, plans=plans, store=store)
+    analyzer.run({ticker: company_names.get(ticker, ticker) for ticker in tickers}, on_result)
+
+def run_local_sentiment(tickers, writer, run=None):
+    """
+    Scores the stored search snippets of tickers with the local lexicon tier in one batch
+    and queues the analyses (source 'vader') on the writer, each with its 'local'
+    checkpoint when a run_state.PipelineRun is given. Used for tickers whose analysis
+    expired but did not fit in ANALYSIS_DAILY_BUDGET.
+
+    Returns:
+        list: Tickers that got a local analysis.
+    """
+    if not local_sentiment.available():
+        logger.warning(f"vaderSentiment is not installed; {len(tickers)} over-budget tickers keep neutral sentiment.")
+        return []
+    start = time.perf_counter()
+    conn = database.get_db_connection()
+    snippets = local_sentiment.load_recent_snippets(conn, tickers)
     conn.close()
+    analyses = local_sentiment.analyze_many(snippets, reason="over the nightly AI budget")
+    analysis_date_str = date.today().strftime('%Y-%m-%d')
+    now_iso = datetime.now().isoformat()
+    for ticker, analysis in analyses.items():
+        if run is not None:
+            run.store_and_mark('local', [ticker], run_state.DONE, store_analysis, ticker, analysis, analysis_date_str, now_iso, writer=writer)
+        else:
+            writer.submit(store_analysis, ticker, analysis, analysis_date_str, now_iso)
+    elapsed = time.perf_counter() - start
+    logger.info(f"Local sentiment: scored {len(analyses)}/{len(tickers)} over-budget tickers from stored snippets in {elapsed:.3f}s "
+                f"({len(tickers) - len(analyses)} had no snippets within {config.LOCAL_SENTIMENT_LOOKBACK_DAYS} days).")
+    return list(analyses)
+
+def update_data_for_ticker(ticker, start=None, writer=None, company_name=None, cache=None, plans=None, store=None):
+    """
+    Fetches and updates all data (prices, then analysis) for a single ticker.
+
+    Args:
+        ticker (str): The ticker to update.
+        start (str, optional): YYYY-MM-DD start date for an incremental price fetch.
+        writer (fetch_engine.DBWriter, optional): Writer that performs the DB writes.
+        company_name (str, optional): Company name for the analysis prompt.
+        cache (analysis_cache.AnalysisCache, optional): Cache of earlier Gemini analyses.
+        plans (query_plans.QueryPlanStore, optional): Stored search-query plans.
+        store (search_store.SearchResultStore, optional): Stored Brave search results.
+    """
+    logger.info(f"--- Starting data update for {ticker} ---")
+
+    # 1. Fetch and store price history
+    update_prices_for_ticker(ticker, start=start, writer=writer)
+
+    # 2./3. Gemini analysis and storage
+    update_analysis_for_ticker(ticker, writer=writer, company_name=company_name, cache=cache, plans=plans, store=store)
     logger.info(f"--- Finished data update for {ticker} ---")
-    time.sleep(1) # Add delay between processing tickers
 
-def run_data_fetch_pipeline():
-    """Runs the full data fetching and processing pipeline."""
+def run_price_updates(tickers, start_dates, run):
+    """
+    Fetches and stores the price history of tickers (PRICE_FETCH_MODE) and records
+    each ticker's 'prices' checkpoint; tickers without rows are marked failed.
+    """
+    if not tickers:
+        return
+    with fetch_engine.DBWriter(name="price-writer") as writer: # Closed (all rows written) before prioritization reads them
+        if config.PRICE_FETCH_MODE == 'batch':
+            prices_by_ticker = fetch_price_history_batch(tickers, start_dates=start_dates)
+            fetched = [ticker for ticker in tickers if ticker in prices_by_ticker]
+            if fetched:
+                run.store_and_mark('prices', fetched, run_state.DONE, store_price_rows,
+                                   [row for rows in prices_by_ticker.values() for row in rows], writer=writer)
+            run.mark_many('prices', [ticker for ticker in tickers if ticker not in prices_by_ticker], run_state.FAILED, writer=writer)
+            return
+
+        logger.info(f"Beginning concurrent price update for {len(tickers)} tickers with {config.FETCH_MAX_WORKERS} workers...")
+        def update_one(ticker):
+            try:
+                ok = update_prices_for_ticker(ticker, start=start_dates.get(ticker), writer=writer, run=run)
+            except Exception as e:
+                run.mark('prices', ticker, run_state.FAILED, error=str(e), writer=writer)
+                raise
+            if not ok:
+                run.mark('prices', ticker, run_state.FAILED, writer=writer)
+        fetch_engine.run_concurrently(update_one, tickers, label="price-update")
+
+def run_analysis(tickers, company_names, writer, run, cache=None, plans=None, store=None):
+    """Analyzes tickers with ANALYSIS_ENGINE and records each ticker's 'analysis' checkpoint."""
+    if not tickers:
+        return
+    if config.ANALYSIS_ENGINE == 'async':
+        run_async_analysis(tickers, company_names, writer, cache=cache, plans=plans, store=store, run=run)
+        return
+
+    def analyze_one(ticker):
+        try:
+            update_analysis_for_ticker(ticker, writer=writer, company_name=company_names.get(ticker, ticker), cache=cache, plans=plans, store=store, run=run)
+        except Exception as e:
+            run.mark('analysis', ticker, run_state.FAILED, error=str(e), writer=writer)
+            raise
+
+    logger.info(f"Beginning concurrent analysis for {len(tickers)} tickers with {config.FETCH_MAX_WORKERS} workers...")
+    fetch_engine.run_concurrently(analyze_one, tickers, label="analysis")
+
+def run_data_fetch_pipeline(full_resync=False, resume=False):
+    """
+    Runs the full data fetching and processing pipeline.
+
+    Progress is checkpointed per stage and ticker (run_state.py). Tickers whose price
+    fetch or analysis fails are retried after the main passes (PIPELINE_RETRY_PASSES)
+    instead of aborting the run.
+
+    Args:
+        full_resync (bool): Re-download the full PRICE_HISTORY_PERIOD for every ticker
+            instead of only the range missing since the last stored date.
+        resume (bool): Continue the latest run for today's trading date, skipping the
+            ticker universe, analysis selection and tickers already done.
+    """
     logger.info("=== Starting Full Data Fetch Pipeline ===")
     logger.info("Ensuring database schema is up-to-date...")
     database.init_db() # Explicitly ensure DB schema exists before loading tickers
     logger.info("Database schema check complete.")
 
-    tickers_to_process = update_company_list()
+    trading_date_str = date.today().strftime('%Y-%m-%d')
+    run = run_state.PipelineRun.start(trading_date_str, resume=resume)
+    if run.resumed:
+        logger.info(f"Resuming pipeline run {run.run_id} for {trading_date_str}.")
+    else:
+        logger.info(f"Starting pipeline run {run.run_id} for {trading_date_str}.")
 
-    if not tickers_to_process:
-        logger.warning("No tickers found to process after filtering. Exiting pipeline.")
-        return
+    try:
+        if run.tickers is None:
+            run.store_tickers(update_company_list())
+        else:
+            logger.info(f"Reusing the {len(run.tickers)} tickers checkpointed by run {run.run_id}.")
+        tickers_to_process = run.tickers
+
+        if not tickers_to_process:
+            logger.warning("No tickers found to process after filtering. Exiting pipeline.")
+            run.finish()
+            return
+
+        # 1. Prices for every ticker not done yet
+        run.set_stage('prices')
+        price_tickers = run.pending('prices', tickers_to_process)
+        if len(price_tickers) < len(tickers_to_process):
+            logger.info(f"Skipping {len(tickers_to_process) - len(price_tickers)} tickers whose prices are already up to date in this run.")
+        start_dates = get_price_sync_start_dates(price_tickers, full_resync=full_resync)
+        run_price_updates(price_tickers, start_dates, run)
+
+        # 2. Choose which tickers get a fresh analysis tonight (the rest reuse their latest one)
+        run.set_stage('analysis')
+        conn = database.get_db_connection()
+        company_names = _get_company_names(conn)
+        if run.selection is None:
+            run.store_selection(*prioritizer.select_tickers_for_analysis(conn, tickers_to_process, trading_date_str))
+        conn.close()
+        analysis_tickers = run.pending('analysis', run.selection['selected'])
+        over_budget = run.pending('local', run.selection['over_budget'])
+
+        # 3. Gemini analysis for the selected tickers, then failed tickers are retried
+        cache = analysis_cache.AnalysisCache().load()
+        plans = query_plans.QueryPlanStore().load()
+        store = search_store.SearchResultStore().load()
+        with fetch_engine.DBWriter() as writer:
+            run_analysis(analysis_tickers, company_names, writer, run, cache=cache, plans=plans, store=store)
+            if over_budget and config.LOCAL_SENTIMENT_OVER_BUDGET:
+                run_local_sentiment(over_budget, writer, run=run)
+
+            run.set_stage('retry')
+            for retry_pass in range(1, config.PIPELINE_RETRY_PASSES + 1):
+                writer.flush() # Checkpoints are set when their writes run, so let the queued ones finish first
+                failed_prices = run.failed('prices')
+                failed_analysis = run.failed('analysis')
+                if not failed_prices and not failed_analysis:
+                    break
+                logger.info(f"Retry pass {retry_pass}: {len(failed_prices)} price fetches and {len(failed_analysis)} analyses failed earlier.")
+                for ticker in failed_prices: # One request per ticker; a batch already failed them
+                    if not update_prices_for_ticker(ticker, start=get_price_sync_start_dates([ticker], full_resync=full_resync).get(ticker), writer=writer, run=run):
+                        run.mark('prices', ticker, run_state.FAILED, writer=writer)
+                run_analysis(failed_analysis, company_names, writer, run, cache=cache, plans=plans, store=store)
+
+        cache.save()
+        cache.log_stats(logger)
+        plans.save()
+        plans.log_stats(logger)
+        store.save()
+        store.log_stats(logger)
+
+        # 4. Columnar copy of the price history for analytics and backfills (derived data, never fails the run)
+        if config.PRICE_ARCHIVE_SYNC:
+            try:
+                start = time.perf_counter()
+                stats = price_archive.sync()
+                logger.info(f"Price archive synced: {stats['tickers']} tickers x {stats['dates']} dates ({stats['rows']} bars re-read) in {time.perf_counter() - start:.2f}s.")
+            except Exception as e:
+                logger.exception(f"Price archive sync failed: {e}")
+    except BaseException:
+        run.finish('failed') # `--resume` continues from the checkpoints written so far
+        raise
 
-    logger.info(f"Beginning data update loop for {len(tickers_to_process)} tickers...")
-    for i, ticker in enumerate(tickers_to_process):
-        logger.info(f"--- Processing ticker {i+1}/{len(tickers_to_process)}: {ticker} ---")
-        update_data_for_ticker(ticker)
+    run.finish()
+    run.log_summary(logger)
+    fetch_engine.log_rate_limiter_stats()
+    fetch_engine.log_controller_stats()
+    providers.get_provider().log_stats(logger)
 
     logger.info("=== Full Data Fetch Pipeline Finished ===")
 
 if __name__ == '__main__':
-    run_data_fetch_pipeline()
+    import argparse
+    parser = argparse.ArgumentParser(description="Fetch company, price and AI analysis data.")
+    parser.add_argument('--full-resync', action='store_true',
+                        help=f"Re-download the full {config.PRICE_HISTORY_PERIOD} price history for every ticker instead of only missing dates.")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue today's latest run from its checkpoints instead of starting over.")
+    args = parser.parse_args()
+    if providers.missing_api_keys(): # Printed by gemini_analyzer at import
+        sys.exit(1) # Exit if a key the live / record provider needs is missing
+    run_data_fetch_pipeline(full_resync=args.full_resync, resume=args.resume)
     # TODO: Implement scoring logic calculation after data fetching
     # TODO: Implement scheduling using the 'schedule' library
@@ -1,284 +1,284 @@
 import sqlite3
 import os
+import json
+import threading
+import config # SQLite pragmas
+import migrations # Versioned schema steps used by init_db
 
 # Define database path relative to the project root (one level up from backend)
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATABASE_NAME = os.path.join(PROJECT_ROOT, 'stocks.db')
 
-def get_db_connection():
-    """Establishes a connection to the SQLite database."""
-    conn = sqlite3.connect(DATABASE_NAME)
+_idle = threading.local() # Per thread: (pid, path, readonly) -> idle connection ready for reuse
+_journal_checked = set() # (pid, path) pairs whose journal mode has been set this process
+
+
+class ReusableConnection(sqlite3.Connection):
+    """
+    Connection handed out by get_db_connection. close() returns it to its thread's idle
+    slot (rolling back anything left uncommitted) instead of closing it, so callers keep
+    the usual open/close pattern while the connection, its pragmas and page cache are reused.
+    """
+    _pool_key = None # Set for pooled connections; None means close() really closes
+
+    def close(self):
+        key = self._pool_key
+        slots = getattr(_idle, 'slots', None)
+        if slots is not None and slots.get(key) is self:
+            return # Already idle (closed twice)
+        if key is None or key[0] != os.getpid() or slots is None or key in slots:
+            super().close() # Not pooled, inherited across a fork, or the slot is taken by a nested borrow
+            return
+        try:
+            if self.in_transaction:
+                self.rollback()
+            self.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            super().close()
+            return
+        slots[key] = self
+
+    def discard(self):
+        """Closes the underlying connection for good."""
+        self._pool_key = None
+        super().close()
+
+
+def _apply_pragmas(conn, path, readonly):
+    conn.execute(f"PRAGMA busy_timeout = {int(config.SQLITE_BUSY_TIMEOUT_MS)}")
+    if not readonly and (os.getpid(), path) not in _journal_checked:
+        conn.execute(f"PRAGMA journal_mode = {config.SQLITE_JOURNAL_MODE}")
+        _journal_checked.add((os.getpid(), path))
+    conn.execute(f"PRAGMA synchronous = {config.SQLITE_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size = -{int(config.SQLITE_CACHE_SIZE_KIB)}") # Negative = KiB rather than pages
+    conn.execute(f"PRAGMA mmap_size = {int(config.SQLITE_MMAP_SIZE_BYTES)}")
+    conn.execute(f"PRAGMA temp_store = {config.SQLITE_TEMP_STORE}")
+    if readonly:
+        conn.execute("PRAGMA query_only = ON")
+
+def connect(path=None, readonly=False):
+    """
+    Opens a new tuned connection that is not pooled (close() really closes it).
+
+    Args:
+        path (str): Database file, defaults to DATABASE_NAME.
+        readonly (bool): Open with mode=ro; writes raise sqlite3.OperationalError.
+    """
+    path = path or DATABASE_NAME
+    timeout = config.SQLITE_BUSY_TIMEOUT_MS / 1000
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=timeout, factory=ReusableConnection)
+    else:
+        conn = sqlite3.connect(path, timeout=timeout, factory=ReusableConnection)
     conn.row_factory = sqlite3.Row # Return rows as dictionary-like objects
+    _apply_pragmas(conn, path, readonly)
     return conn
 
-def init_db():
-    """Initializes the database schema if tables don't exist."""
-    conn = get_db_connection()
+def get_db_connection(readonly=False):
+    """
+    Returns this thread's connection to DATABASE_NAME, opening a tuned one on first use.
+
+    Callers close() it as before; that hands it back for the next call on the same thread.
+    A nested call while the thread's connection is in use gets a connection of its own.
+
+    Args:
+        readonly (bool): Read-only connection (the web tier), never takes the write lock.
+    """
+    key = (os.getpid(), DATABASE_NAME, bool(readonly))
+    slots = getattr(_idle, 'slots', None)
+    if slots is None:
+        slots = _idle.slots = {}
+    conn = slots.pop(key, None)
+    if conn is None:
+        conn = connect(DATABASE_NAME, readonly=readonly)
+        conn._pool_key = key
+    return conn
+
+def close_connections():
+    """Closes this thread's idle connections (e.g. before deleting a temporary database)."""
+    slots = getattr(_idle, 'slots', None) or {}
+    for conn in list(slots.values()):
+        conn.discard()
+    slots.clear()
+
+# daily_scores columns mirrored in ticker_latest
+LATEST_SCORE_COLUMNS = ['score', 'price_change_pct', 'volume_ratio', 'avg_sentiment', 'pe_ratio', 'dividend_yield',
+                        'price_vs_ma50', 'rsi', 'macd_signal', 'bbands_signal', 'debt_to_equity', 'pb_ratio',
+                        'ps_ratio', 'price_vs_ma200', 'atr_value']
+
+PRICE_WRITE_BATCH_ROWS = 50000 # Rows per executemany/transaction in bulk_upsert_prices
+
+def bulk_upsert_prices(conn, rows, batch_size=PRICE_WRITE_BATCH_ROWS):
+    """
+    Upserts price_history rows with executemany, committing one transaction per batch.
+
+    Args:
+        conn: Open database connection.
+        rows (list): (ticker, date, open_price, high_price, low_price, close_price, volume) tuples.
+        batch_size (int): Rows per transaction.
+
+    Returns:
+        int: Number of rows written.
+    """
     cursor = conn.cursor()
+    for i in range(0, len(rows), batch_size):
+        try:
+            batch = rows[i:i + batch_size]
+            cursor.executemany(
+                "INSERT OR REPLACE INTO price_history (ticker, date, open_price, high_price, low_price, close_price, volume) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                batch
+            )
+            refresh_latest_prices(cursor, {row[0] for row in batch})
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return len(rows)
 
-    # --- Create Tables ---
+def upsert_daily_scores(conn, rows):
+    """
+    Writes score rows to daily_scores in one transaction.
 
-    # Companies Table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS companies (
-            ticker TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            sector TEXT NOT NULL
-        )
-    ''')
-
-    # News Articles Table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS news_articles (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ticker TEXT NOT NULL,
-            url TEXT UNIQUE NOT NULL, -- URL might become less relevant if using Gemini summary
-            title TEXT NOT NULL, -- Title might become less relevant
-            snippet TEXT, -- Snippet might become less relevant
-            published_date TEXT NOT NULL, -- Date of original article if found, otherwise analysis date
-            fetched_date TEXT NOT NULL, -- Store as ISO 8601 string (Date of analysis)
-            sentiment_score REAL, -- Store Gemini sentiment score
-            gemini_summary TEXT, -- Store the summary generated by Gemini
-            bullish_points TEXT, -- Store JSON list of bullish points
-            bearish_points TEXT, -- Store JSON list of bearish points
-            FOREIGN KEY (ticker) REFERENCES companies (ticker)
-        )
-    ''')
-    # Index for faster lookups by ticker and date
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_news_ticker_date ON news_articles (ticker, published_date DESC);
-    ''')
-
-
-    # Price History Table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS price_history (
-            ticker TEXT NOT NULL,
-            date TEXT NOT NULL, -- Store as YYYY-MM-DD
-            open_price REAL, -- Added Open Price
-            close_price REAL NOT NULL,
-            volume INTEGER,
-            PRIMARY KEY (ticker, date),
-            FOREIGN KEY (ticker) REFERENCES companies (ticker)
-        )
-    ''')
-
-    # Daily Scores Table (to store the calculated score for highlighting)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS daily_scores (
-            ticker TEXT NOT NULL,
-            date TEXT NOT NULL, -- Store as YYYY-MM-DD
-            score REAL NOT NULL,
-            price_change_pct REAL,
-            volume_ratio REAL,
-            avg_sentiment REAL, -- Holds Gemini sentiment score
-            pe_ratio REAL, -- Add P/E ratio
-            dividend_yield REAL, -- Add Dividend Yield
-            price_vs_ma50 TEXT, -- Add MA comparison ('above', 'below', 'N/A')
-            rsi REAL, -- Add RSI value
-            macd_signal TEXT, -- Add MACD signal ('bullish_cross', 'bearish_cross', 'neutral')
-            bbands_signal TEXT, -- Add Bollinger Bands signal ('cross_lower', 'cross_upper', 'neutral')
-            debt_to_equity REAL, -- Add Debt-to-Equity ratio
-            next_day_open_price REAL, -- Store next day's open price for comparison
-            next_day_perf_pct REAL, -- Store performance (Close[D] -> Open[D+1]) %
-            pb_ratio REAL, -- Add Price-to-Book ratio
-            ps_ratio REAL, -- Add Price-to-Sales ratio
-            price_vs_ma200 TEXT, -- Add MA200 comparison ('above', 'below', 'N/A')
-            atr_value REAL, -- Add ATR value
-            PRIMARY KEY (ticker, date),
-            FOREIGN KEY (ticker) REFERENCES companies (ticker)
-        )
-    ''')
-    # Index for faster lookups by date and score
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_scores_date_score ON daily_scores (date DESC, score DESC);
-    ''')
-
-    # Portfolio Table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS portfolio (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ticker TEXT NOT NULL,
-            quantity INTEGER NOT NULL,
-            purchase_price REAL NOT NULL,
-            purchase_date TEXT NOT NULL, -- Store as YYYY-MM-DD
-            FOREIGN KEY (ticker) REFERENCES companies (ticker)
+    Each row is (ticker, date, score, price_change_pct, volume_ratio, avg_sentiment,
+    pe_ratio, dividend_yield, price_vs_ma50, rsi, macd_signal, bbands_signal,
+    debt_to_equity, pb_ratio, ps_ratio, price_vs_ma200, atr_value,
+    next_day_open_price, next_day_perf_pct).
+    """
+    cursor = conn.cursor()
+    cursor.executemany("""
+        INSERT OR REPLACE INTO daily_scores
+        (ticker, date, score, price_change_pct, volume_ratio, avg_sentiment, pe_ratio, dividend_yield, price_vs_ma50, rsi, macd_signal, bbands_signal, debt_to_equity, pb_ratio, ps_ratio, price_vs_ma200, atr_value, next_day_open_price, next_day_perf_pct)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    refresh_latest_scores(cursor, {row[0] for row in rows})
+    conn.commit()
+
+# --- ticker_latest: each ticker's newest price bar, score and analysis ---
+# Refreshed from the history tables inside the transaction that writes them, so the hot
+# API reads never have to find the latest row per ticker themselves.
+
+def _ticker_filter(column, tickers):
+    """SQL condition and parameters restricting column to tickers (None = all tickers)."""
+    if tickers is None:
+        return "1", ()
+    return f"{column} IN (SELECT value FROM json_each(?))", (json.dumps(sorted(tickers)),)
+
+def refresh_latest_prices(cursor, tickers=None):
+    """Copies each ticker's newest price_history bar into ticker_latest (no commit)."""
+    condition, params = _ticker_filter('ticker', tickers)
+    cursor.execute(f"""
+        INSERT INTO ticker_latest (ticker, price_date, open_price, high_price, low_price, close_price, volume)
+        SELECT ph.ticker, ph.date, ph.open_price, ph.high_price, ph.low_price, ph.close_price, ph.volume
+        FROM (SELECT ticker, MAX(date) AS date FROM price_history WHERE {condition} GROUP BY ticker) AS latest
+        JOIN price_history ph ON ph.ticker = latest.ticker AND ph.date = latest.date
+        WHERE 1 -- Needed before ON CONFLICT when upserting from a join
+        ON CONFLICT(ticker) DO UPDATE SET
+            price_date = excluded.price_date, open_price = excluded.open_price, high_price = excluded.high_price,
+            low_price = excluded.low_price, close_price = excluded.close_price, volume = excluded.volume
+    """, params)
+
+def refresh_latest_scores(cursor, tickers=None):
+    """Copies each ticker's newest daily_scores row (score and factor values) into ticker_latest (no commit)."""
+    condition, params = _ticker_filter('ticker', tickers)
+    cursor.execute(f"""
+        INSERT INTO ticker_latest (ticker, score_date, {', '.join(LATEST_SCORE_COLUMNS)})
+        SELECT ds.ticker, ds.date, {', '.join('ds.' + column for column in LATEST_SCORE_COLUMNS)}
+        FROM (SELECT ticker, MAX(date) AS date FROM daily_scores WHERE {condition} GROUP BY ticker) AS latest
+        JOIN daily_scores ds ON ds.ticker = latest.ticker AND ds.date = latest.date
+        WHERE 1
+        ON CONFLICT(ticker) DO UPDATE SET
+            score_date = excluded.score_date, {', '.join(f'{column} = excluded.{column}' for column in LATEST_SCORE_COLUMNS)}
+    """, params)
+
+def refresh_latest_analysis(cursor, tickers=None):
+    """Points ticker_latest at each ticker's newest news_articles entry (no commit)."""
+    condition, params = _ticker_filter('ticker', tickers)
+    cursor.execute(f"""
+        INSERT INTO ticker_latest (ticker, analysis_id, analysis_date)
+        SELECT ticker, id, published_date
+        FROM (
+            SELECT ticker, id, published_date, ROW_NUMBER() OVER (
+                PARTITION BY ticker ORDER BY published_date DESC, fetched_date DESC, id DESC
+            ) AS rn
+            FROM news_articles
+            WHERE {condition}
         )
-    ''')
+        WHERE rn = 1
+        ON CONFLICT(ticker) DO UPDATE SET analysis_id = excluded.analysis_id, analysis_date = excluded.analysis_date
+    """, params)
 
-    # --- Add open_price column to price_history if it doesn't exist ---
-    try:
-        cursor.execute("ALTER TABLE price_history ADD COLUMN open_price REAL")
-        print("Added open_price column to price_history table.")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e):
-            print("open_price column already exists in price_history.")
-        else: raise e
-
-    # Performance Analysis Table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS performance_analysis (
-            analysis_date TEXT NOT NULL, -- Date the analysis was run (YYYY-MM-DD)
-            score_bucket TEXT NOT NULL, -- e.g., "Score >= 4"
-            avg_next_day_perf REAL, -- Average next_day_perf_pct for this bucket
-            count INTEGER NOT NULL, -- Number of data points in this bucket for the analyzed period
-            PRIMARY KEY (analysis_date, score_bucket)
+def rebuild_ticker_latest(conn):
+    """Recomputes ticker_latest for every ticker and commits (after writes that bypass the helpers above)."""
+    cursor = conn.cursor()
+    refresh_latest_prices(cursor)
+    refresh_latest_scores(cursor)
+    refresh_latest_analysis(cursor)
+    conn.commit()
+
+def get_last_price_dates(conn):
+    """Returns a dict of ticker -> latest stored price_history date (YYYY-MM-DD), in one query."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT ticker, MAX(date) AS last_date FROM price_history GROUP BY ticker")
+    return {row['ticker']: row['last_date'] for row in cursor.fetchall()}
+
+def get_fundamentals_as_of(conn, as_of_date):
+    """
+    Returns a dict of ticker -> fundamentals snapshot row for scoring as_of_date, in one query.
+
+    Uses each ticker's latest snapshot on or before as_of_date. Tickers whose first
+    snapshot is after as_of_date (backfills older than the stored history) fall back to
+    their earliest snapshot.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT ticker, as_of_date, pe_ratio, dividend_yield, debt_to_equity, pb_ratio, ps_ratio
+        FROM (
+            SELECT *, ROW_NUMBER() OVER (
+                PARTITION BY ticker
+                ORDER BY CASE WHEN as_of_date <= :as_of THEN 0 ELSE 1 END,
+                         CASE WHEN as_of_date <= :as_of THEN as_of_date END DESC,
+                         as_of_date ASC
+            ) AS rn
+            FROM fundamentals_snapshot
         )
-    ''')
+        WHERE rn = 1
+    """, {'as_of': as_of_date})
+    return {row['ticker']: row for row in cursor.fetchall()}
 
+def get_fundamentals_history(conn, until_date):
+    """
+    Returns every fundamentals snapshot on or before until_date, plus each ticker's
+    earliest snapshot, ordered by ticker and as_of_date. Lets range backfills apply the
+    get_fundamentals_as_of() rule for many dates with one query.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT ticker, as_of_date, pe_ratio, dividend_yield, debt_to_equity, pb_ratio, ps_ratio
+        FROM fundamentals_snapshot AS f
+        WHERE as_of_date <= ?
+           OR as_of_date = (SELECT MIN(as_of_date) FROM fundamentals_snapshot WHERE ticker = f.ticker)
+        ORDER BY ticker, as_of_date
+    """, (until_date,))
+    return cursor.fetchall()
 
-    # --- Add gemini_summary column if it doesn't exist ---
-    try:
-        cursor.execute("ALTER TABLE news_articles ADD COLUMN gemini_summary TEXT")
-        print("Added gemini_summary column to news_articles table.")
-    except sqlite3.OperationalError as e:
-        # Ignore error if column already exists
-        if "duplicate column name" in str(e):
-            print("gemini_summary column already exists.")
-        else:
-            raise e # Reraise other operational errors
-
-    # --- Add pe_ratio column if it doesn't exist ---
-    try:
-        cursor.execute("ALTER TABLE daily_scores ADD COLUMN pe_ratio REAL")
-        print("Added pe_ratio column to daily_scores table.")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e):
-            print("pe_ratio column already exists.")
-        else: raise e
-
-    # --- Add dividend_yield column if it doesn't exist ---
-    try:
-        cursor.execute("ALTER TABLE daily_scores ADD COLUMN dividend_yield REAL")
-        print("Added dividend_yield column to daily_scores table.")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e):
-            print("dividend_yield column already exists.")
-        else: raise e
-
-    # --- Add price_vs_ma50 column if it doesn't exist ---
-    try:
-        cursor.execute("ALTER TABLE daily_scores ADD COLUMN price_vs_ma50 TEXT")
-        print("Added price_vs_ma50 column to daily_scores table.")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e):
-            print("price_vs_ma50 column already exists.")
-        else: raise e
-
-    # --- Add rsi column if it doesn't exist ---
-    try:
-        cursor.execute("ALTER TABLE daily_scores ADD COLUMN rsi REAL")
-        print("Added rsi column to daily_scores table.")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e):
-            print("rsi column already exists.")
-        else: raise e
-
-    # --- Add bullish_points column if it doesn't exist ---
-    try:
-        cursor.execute("ALTER TABLE news_articles ADD COLUMN bullish_points TEXT")
-        print("Added bullish_points column to news_articles table.")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e):
-            print("bullish_points column already exists.")
-        else: raise e
-
-    # --- Add bearish_points column if it doesn't exist ---
-    try:
-        cursor.execute("ALTER TABLE news_articles ADD COLUMN bearish_points TEXT")
-        print("Added bearish_points column to news_articles table.")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e):
-            print("bearish_points column already exists.")
-        else: raise e
-
-    # --- Add macd_signal column if it doesn't exist ---
-    try:
-        cursor.execute("ALTER TABLE daily_scores ADD COLUMN macd_signal TEXT")
-        print("Added macd_signal column to daily_scores table.")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e):
-            print("macd_signal column already exists.")
-        else: raise e
-
-    # --- Add bbands_signal column if it doesn't exist ---
-    try:
-        cursor.execute("ALTER TABLE daily_scores ADD COLUMN bbands_signal TEXT")
-        print("Added bbands_signal column to daily_scores table.")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e):
-            print("bbands_signal column already exists.")
-        else: raise e
-
-    # --- Add debt_to_equity column if it doesn't exist ---
-    try:
-        cursor.execute("ALTER TABLE daily_scores ADD COLUMN debt_to_equity REAL")
-        print("Added debt_to_equity column to daily_scores table.")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e):
-            print("debt_to_equity column already exists.")
-        else: raise e
-
-    # --- Add next_day_open_price column if it doesn't exist ---
-    try:
-        cursor.execute("ALTER TABLE daily_scores ADD COLUMN next_day_open_price REAL")
-        print("Added next_day_open_price column to daily_scores table.")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e):
-            print("next_day_open_price column already exists.")
-        else: raise e
-
-    # --- Add next_day_perf_pct column if it doesn't exist ---
-    try:
-        cursor.execute("ALTER TABLE daily_scores ADD COLUMN next_day_perf_pct REAL")
-        print("Added next_day_perf_pct column to daily_scores table.")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e):
-            print("next_day_perf_pct column already exists.")
-        else: raise e
-
-    # --- Add pb_ratio column if it doesn't exist ---
-    try:
-        cursor.execute("ALTER TABLE daily_scores ADD COLUMN pb_ratio REAL")
-        print("Added pb_ratio column to daily_scores table.")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e):
-            print("pb_ratio column already exists.")
-        else: raise e
-
-    # --- Add ps_ratio column if it doesn't exist ---
-    try:
-        cursor.execute("ALTER TABLE daily_scores ADD COLUMN ps_ratio REAL")
-        print("Added ps_ratio column to daily_scores table.")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e):
-            print("ps_ratio column already exists.")
-        else: raise e
-
-    # --- Add price_vs_ma200 column if it doesn't exist ---
-    try:
-        cursor.execute("ALTER TABLE daily_scores ADD COLUMN price_vs_ma200 TEXT")
-        print("Added price_vs_ma200 column to daily_scores table.")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e):
-            # Check if it already exists from MA50 addition (unlikely but safe)
-            print("price_vs_ma200 column already exists.")
-        else: raise e
-
-    # --- Add atr_value column if it doesn't exist ---
-    try:
-        cursor.execute("ALTER TABLE daily_scores ADD COLUMN atr_value REAL")
-        print("Added atr_value column to daily_scores table.")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e):
-            print("atr_value column already exists.")
-        else: raise e
+def init_db():
+    """
+    Brings the schema up to date (see migrations.py); a single version check when it
+    already is.
 
-    conn.commit()
-    conn.close()
-    print("Database schema initialization/update complete.")
+    Returns:
+        int: Schema version.
+    """
+    conn = get_db_connection()
+    try:
+        version, applied = migrations.migrate(conn)
+    finally:
+        conn.close()
+    for step_version, description in applied:
+        print(f"Applied schema migration {step_version}: {description}.")
+    return version
 
 if __name__ == '__main__':
     # Allow running this script directly to initialize the DB
     print(f"Initializing database '{DATABASE_NAME}'...")
-    init_db()
+    print(f"Database schema is at version {init_db()}.")
@@ -0,0 +1,475 @@
+import asyncio
+import email.utils
+import random
+import threading
+import queue
+import time
+from datetime import datetime, timezone
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import database # To use get_db_connection
+import config # Import the config file
+from log_setup import pipeline_logger # Import logger setup
+
+# --- Logger ---
+logger = pipeline_logger(__name__)
+# -------------
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `capacity`; acquire() blocks
+    until enough tokens are available, so callers are spread out at the configured rate
+    instead of sleeping a fixed amount after every call.
+    """
+
+    def __init__(self, rate, capacity, name="bucket"):
+        if rate <= 0:
+            raise ValueError(f"Rate for '{name}' must be positive, got {rate}.")
+        self.name = name
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+        self.total_acquired = 0
+        self.total_wait_seconds = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _try_take(self, tokens):
+        """Takes tokens if available; otherwise returns the seconds to wait before retrying."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self.total_acquired += tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        """Blocks until `tokens` tokens have been taken from the bucket."""
+        waited = 0.0
+        while True:
+            wait = self._try_take(tokens)
+            if wait <= 0:
+                break
+            time.sleep(wait)
+            waited += wait
+        if waited:
+            with self._lock:
+                self.total_wait_seconds += waited
+
+    async def acquire_async(self, tokens=1):
+        """Like acquire(), but awaits instead of blocking the thread (shares the same budget)."""
+        waited = 0.0
+        while True:
+            wait = self._try_take(tokens)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+            waited += wait
+        if waited:
+            with self._lock:
+                self.total_wait_seconds += waited
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(upstream):
+    """Returns the shared TokenBucket for an upstream ('yfinance', 'brave', 'gemini') from config.RATE_LIMITS."""
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(upstream)
+        if limiter is None:
+            limits = config.RATE_LIMITS[upstream]
+            limiter = TokenBucket(limits['rate'], limits['burst'], name=upstream)
+            _rate_limiters[upstream] = limiter
+        return limiter
+
+def log_rate_limiter_stats():
+    """Logs how many calls each upstream made and how long callers waited on its limiter."""
+    with _rate_limiters_lock:
+        limiters = list(_rate_limiters.values())
+    for limiter in limiters:
+        logger.info(f"Rate limiter '{limiter.name}': {limiter.total_acquired} calls at {limiter.rate:g}/s (burst {limiter.capacity:g}), total wait {limiter.total_wait_seconds:.1f}s.")
+
+
+class CircuitOpenError(Exception):
+    """Raised when an upstream's circuit breaker is open and calls are not being sent."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"Circuit breaker for '{name}' is open (retry in {retry_after:.1f}s).")
+        self.retry_after = retry_after
+
+
+def _retry_after_seconds(response):
+    """Parses a Retry-After header (seconds or HTTP date); returns None if absent or invalid."""
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (email.utils.parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def classify_error(error):
+    """
+    Classifies an upstream call failure.
+
+    Returns:
+        tuple: (kind, retry_after_seconds) where kind is 'throttle' (429 / 503: back off
+        and reduce concurrency), 'transient' (timeouts, connection errors, other 5xx:
+        retry), 'circuit_open' (not sent: retry after the cooldown) or 'fatal'
+        (anything else: do not retry).
+    """
+    if isinstance(error, CircuitOpenError):
+        return 'circuit_open', error.retry_after
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is None:
+        code = getattr(error, 'code', None) # google.api_core exceptions carry the HTTP status here
+        status = int(code) if isinstance(code, int) else None
+    if status in (429, 503):
+        return 'throttle', _retry_after_seconds(response)
+    if status is not None and status >= 500:
+        return 'transient', None
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                          ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return 'transient', None
+    return 'fatal', None
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class UpstreamController:
+    """
+    Client-side flow control for one API (Brave, Gemini), shared by every caller.
+
+    Each call goes through:
+      - an AIMD concurrency limit: +1 after `increase_after` consecutive successes up to
+        `max_concurrency`, multiplied by `decrease_factor` (min 1) when throttled;
+      - the upstream's token bucket (RATE_LIMITS), taken again on every attempt;
+      - retries with exponential backoff and full jitter for throttles and transient
+        errors. A Retry-After header pauses the whole upstream, not only the caller;
+      - a circuit breaker that stops sending for `cooldown_seconds` after
+        `failure_threshold` consecutive failed attempts, then lets one probe through.
+    call() is for threads and call_async() for asyncio; both share the same state.
+    """
+
+    def __init__(self, name, max_concurrency, limiter=None, max_attempts=None, base_delay=None, max_delay=None,
+                 increase_after=None, decrease_factor=None, failure_threshold=None, cooldown_seconds=None):
+        self.name = name
+        self.limiter = limiter
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.limit = float(self.max_concurrency)
+        self.max_attempts = max_attempts or config.RETRY_MAX_ATTEMPTS
+        self.base_delay = config.RETRY_BASE_DELAY_SECONDS if base_delay is None else base_delay
+        self.max_delay = config.RETRY_MAX_DELAY_SECONDS if max_delay is None else max_delay
+        self.increase_after = increase_after or config.AIMD_INCREASE_AFTER
+        self.decrease_factor = decrease_factor or config.AIMD_DECREASE_FACTOR
+        self.failure_threshold = failure_threshold or config.CIRCUIT_FAILURE_THRESHOLD
+        self.cooldown_seconds = config.CIRCUIT_COOLDOWN_SECONDS if cooldown_seconds is None else cooldown_seconds
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._success_streak = 0
+        self._failure_streak = 0
+        self._paused_until = 0.0 # Retry-After pause for the whole upstream
+        self._open_until = 0.0 # Circuit breaker
+        self._probing = False
+        self._last_decrease = float('-inf')
+        self._async_waiters = [] # (event loop, future) pairs waiting for a slot
+        self.stats = {'calls': 0, 'attempts': 0, 'retries': 0, 'throttled': 0, 'transient_errors': 0,
+                      'failed': 0, 'circuit_trips': 0, 'circuit_rejected': 0, 'limit_min': self.limit}
+
+    # --- Concurrency slots ---
+    def _try_enter(self):
+        """
+        Takes a slot if the limit, pause and breaker allow it.
+
+        Returns:
+            tuple: (wait, probe). wait is 0.0 when a slot was taken, the seconds to wait,
+            or None to wait for a slot to be released; probe is True for the single
+            call let through a half-open breaker.
+
+        Raises:
+            CircuitOpenError: While the breaker is open or its probe call is running.
+        """
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now, False
+        if now < self._open_until:
+            raise CircuitOpenError(self.name, self._open_until - now)
+        if self._open_until and self._probing:
+            raise CircuitOpenError(self.name, self.base_delay) # Half-open: the probe decides
+        if self._in_flight >= int(self.limit):
+            return None, False
+        probe = bool(self._open_until)
+        self._probing = self._probing or probe
+        self._in_flight += 1
+        return 0.0, probe
+
+    def _enter(self):
+        with self._lock:
+            while True:
+                wait, probe = self._try_enter()
+                if wait == 0.0:
+                    return probe
+                self._slot_freed.wait(timeout=wait)
+
+    async def _enter_async(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                wait, probe = self._try_enter()
+                if wait is None: # At the limit: be woken by _exit() when a slot is released
+                    slot_freed = loop.create_future()
+                    self._async_waiters.append((loop, slot_freed))
+            if wait == 0.0:
+                return probe
+            if wait is None:
+                await asyncio.wait({slot_freed}, timeout=1.0)
+            else:
+                await asyncio.sleep(wait)
+
+    def _exit(self, probe, outcome, retry_after=None):
+        """Releases a slot and updates the AIMD limit and the breaker for the attempt's outcome."""
+        with self._lock:
+            self._in_flight -= 1
+            if probe:
+                self._probing = False
+            if outcome == 'fatal':
+                pass # Not retried; says nothing about the upstream's health or capacity
+            elif outcome == 'success':
+                self._failure_streak = 0
+                self._open_until = 0.0
+                self._success_streak += 1
+                if self._success_streak >= self.increase_after and self.limit < self.max_concurrency:
+                    self.limit = min(self.max_concurrency, self.limit + 1)
+                    self._success_streak = 0
+            else:
+                self._success_streak = 0
+                self._failure_streak += 1
+                # Decrease at most once per base_delay so one burst of 429s counts as one congestion event
+                if outcome == 'throttle' and time.monotonic() - self._last_decrease >= self.base_delay:
+                    self.limit = max(1.0, self.limit * self.decrease_factor)
+                    self.stats['limit_min'] = min(self.stats['limit_min'], self.limit)
+                    self._last_decrease = time.monotonic()
+                if outcome == 'throttle' and retry_after:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                if probe or (self._failure_streak >= self.failure_threshold and not self._open_until):
+                    self.stats['circuit_trips'] += 1
+                    logger.warning(f"Circuit breaker for '{self.name}' opened for {self.cooldown_seconds:g}s after {self._failure_streak} consecutive failures.")
+                    self._open_until = time.monotonic() + self.cooldown_seconds
+            self._slot_freed.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, slot_freed in waiters:
+            loop.call_soon_threadsafe(_resolve, slot_freed)
+
+    # --- Retry policy ---
+    def _backoff(self, attempt, retry_after):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    def _record_failure(self, error, attempt):
+        """Returns the seconds to sleep before the next attempt, or raises if the call should give up."""
+        kind, retry_after = classify_error(error)
+        give_up = kind == 'fatal' or attempt + 1 >= self.max_attempts
+        with self._lock:
+            if kind == 'throttle':
+                self.stats['throttled'] += 1
+            elif kind == 'transient':
+                self.stats['transient_errors'] += 1
+            elif kind == 'circuit_open':
+                self.stats['circuit_rejected'] += 1
+            self.stats['failed' if give_up else 'retries'] += 1
+        if give_up:
+            raise error
+        delay = self._backoff(attempt, retry_after)
+        logger.debug(f"'{self.name}' {kind} error (attempt {attempt + 1}/{self.max_attempts}), retrying in {delay:.1f}s: {error}")
+        return delay
+
+    def _start(self):
+        with self._lock:
+            self.stats['calls'] += 1
+
+    def _attempted(self):
+        with self._lock:
+            self.stats['attempts'] += 1
+
+    def call(self, func, *args, **kwargs):
+        """Runs func(*args, **kwargs) under the controller, blocking the thread while waiting."""
+        self._start()
+        for attempt in range(self.max_attempts):
+            try:
+                probe = self._enter()
+            except CircuitOpenError as e:
+                time.sleep(self._record_failure(e, attempt))
+                continue
+            try:
+                if self.limiter is not None:
+                    self.limiter.acquire()
+                self._attempted()
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self._exit(probe, *classify_error(e))
+                time.sleep(self._record_failure(e, attempt))
+                continue
+            self._exit(probe, 'success')
+            return result
+
+    async def call_async(self, make_call):
+        """Awaits make_call() (a function returning an awaitable) under the controller."""
+        self._start()
+        for attempt in range(self.max_attempts):
+            try:
+                probe = await self._enter_async()
+            except CircuitOpenError as e:
+                await asyncio.sleep(self._record_failure(e, attempt))
+                continue
+            try:
+                if self.limiter is not None:
+                    await self.limiter.acquire_async()
+                self._attempted()
+                result = await make_call()
+            except Exception as e:
+                self._exit(probe, *classify_error(e))
+                await asyncio.sleep(self._record_failure(e, attempt))
+                continue
+            self._exit(probe, 'success')
+            return result
+
+    def log_stats(self, log=logger):
+        s = self.stats
+        if not s['calls']:
+            return
+        log.info(f"Upstream '{self.name}': {s['calls']} calls, {s['attempts']} attempts, {s['retries']} retries, "
+                 f"{s['throttled']} throttled, {s['transient_errors']} transient errors, {s['failed']} gave up, "
+                 f"{s['circuit_trips']} circuit trips ({s['circuit_rejected']} calls held back); concurrency limit {self.limit:.1f}/{self.max_concurrency} "
+                 f"(min {s['limit_min']:.1f}).")
+
+
+_controllers = {}
+
+def get_controller(upstream):
+    """Returns the shared UpstreamController for 'brave' or 'gemini' (max concurrency from ANALYSIS_CONCURRENCY)."""
+    limiter = get_rate_limiter(upstream)
+    with _rate_limiters_lock:
+        controller = _controllers.get(upstream)
+        if controller is None:
+            controller = UpstreamController(upstream, config.ANALYSIS_CONCURRENCY[upstream], limiter=limiter)
+            _controllers[upstream] = controller
+        return controller
+
+def log_controller_stats():
+    """Logs retry / throttle / circuit-breaker counters for every upstream controller used."""
+    with _rate_limiters_lock:
+        controllers = list(_controllers.values())
+    for controller in controllers:
+        controller.log_stats()
+
+
+class DBWriter:
+    """
+    Serializes database writes from worker threads onto a single connection.
+
+    Workers call submit(func, *args); func(conn, *args) runs on the writer thread, which
+    owns the only write connection, so concurrent fetch workers never contend for the
+    SQLite write lock. Use as a context manager so pending writes are flushed on exit.
+    """
+
+    def __init__(self, name="db-writer"):
+        self._queue = queue.Queue()
+        self.completed = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args):
+        """Queues func(conn, *args) to run on the writer thread."""
+        self._queue.put((func, args))
+
+    def _run(self):
+        conn = database.get_db_connection()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    self._queue.task_done()
+                    break
+                func, args = item
+                try:
+                    func(conn, *args)
+                    self.completed += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.exception(f"DB writer task {getattr(func, '__name__', func)} failed: {e}")
+                    conn.rollback()
+                finally:
+                    self._queue.task_done()
+        finally:
+            conn.close()
+
+    def flush(self):
+        """Waits until every write queued so far has run (the writer keeps accepting tasks)."""
+        self._queue.join()
+
+    def close(self):
+        """Waits for all queued writes to finish and stops the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+        logger.info(f"DB writer finished: {self.completed} write tasks completed, {self.failed} failed.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def run_concurrently(func, items, max_workers=None, label="tasks"):
+    """
+    Runs func(item) for every item on a thread pool.
+
+    Exceptions are logged and recorded as a None result so one bad ticker never
+    aborts the batch.
+
+    Returns:
+        dict: item -> func(item) result (None if it raised).
+    """
+    max_workers = max_workers or config.FETCH_MAX_WORKERS
+    items = list(items)
+    results = {}
+    if not items:
+        return results
+
+    start = time.perf_counter()
+    progress_every = max(1, len(items) // 10)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=label) as pool:
+        futures = {pool.submit(func, item): item for item in items}
+        for done_count, future in enumerate(as_completed(futures), start=1):
+            item = futures[future]
+            try:
+                results[item] = future.result()
+            except Exception as e:
+                logger.exception(f"Error in {label} for {item}: {e}")
+                results[item] = None
+            if done_count % progress_every == 0 or done_count == len(items):
+                logger.info(f"{label}: {done_count}/{len(items)} done ({time.perf_counter() - start:.1f}s elapsed).")
+
+    logger.info(f"{label}: finished {len(items)} items with {max_workers} workers in {time.perf_counter() - start:.1f}s.")
+    return results
@@ -1,32 +1,71 @@
-import google.generativeai as genai
 import requests
 import os
 import json
+import logging
 import time
 import config # Import the config file
-import sys # Import sys for exiting
-
-# --- API Key Validation ---
-if not config.GEMINI_API_KEY:
-    print("ERROR: GEMINI_API_KEY environment variable not set or found in config.", file=sys.stderr)
-    sys.exit(1) # Exit if key is missing
-if not config.BRAVE_API_KEY:
-    print("ERROR: BRAVE_API_KEY environment variable not set or found in config.", file=sys.stderr)
-    sys.exit(1) # Exit if key is missing
-# --------------------------
-
-# Configure Gemini
-try:
-    genai.configure(api_key=config.GEMINI_API_KEY)
-    # Use the model name specified in the config (read from environment)
-    model_name = config.GEMINI_MODEL_NAME
-    query_generation_model = genai.GenerativeModel(model_name)
-    analysis_model = genai.GenerativeModel(model_name)
-    print(f"Gemini models initialized with: {model_name}")
-except Exception as e:
-    print(f"Error configuring Gemini: {e}")
-    query_generation_model = None
-    analysis_model = None
+import sys # Import sys for error output
+import fetch_engine # Shared per-upstream rate limiters
+import analysis_cache # Reuse analyses whose inputs did not change
+import query_plans # Stored / templated search queries
+import local_sentiment # Lexicon fallback when Gemini is unavailable
+import providers # Live / recorded / synthetic data sources
+
+query_generation_model = None
+analysis_model = None
+
+def init_models():
+    """
+    Creates the Gemini models from the current data provider (providers.py). Without the
+    API keys the live and record providers need, the models stay unset and analyses
+    return placeholders (data_fetcher.py refuses to start in that case).
+    """
+    global query_generation_model, analysis_model
+    # --- API Key Validation ---
+    for name in providers.missing_api_keys():
+        print(f"ERROR: {name} environment variable not set or found in config.", file=sys.stderr)
+    if providers.missing_api_keys():
+        query_generation_model = None
+        analysis_model = None
+        return
+    # Configure Gemini
+    try:
+        provider = providers.get_provider()
+        # Use the model name specified in the config (read from environment)
+        model_name = config.GEMINI_MODEL_NAME
+        query_generation_model = provider.model(model_name)
+        analysis_model = provider.model(model_name)
+        print(f"Gemini models initialized with: {model_name} ({provider.name} provider)")
+    except Exception as e:
+        print(f"Error configuring Gemini: {e}")
+        query_generation_model = None
+        analysis_model = None
+
+init_models()
+
+MAX_RESULTS_PER_QUERY = 2 # Limit results from each query to keep context manageable
+MAX_CONTEXT_RESULTS = 6 # Limit total results fed to analysis model
+ANALYSIS_PROMPT_VERSION = 1 # Bump when build_analysis_prompt changes so cached analyses are not reused
+
+def _clean_json_text(text):
+    """Strips markdown code fences Gemini sometimes wraps around JSON."""
+    return text.strip().replace('```json', '').replace('```', '').strip()
+
+def build_query_prompt(ticker, company_name):
+    return f"""
+    Generate 3 diverse search queries to find recent news and analysis about factors affecting the stock performance of {company_name} (ticker: {ticker}).
+    Focus on potential catalysts, risks, financial health, and recent developments.
+    Output the queries as a JSON list of strings. Example: ["query 1", "query 2", "query 3"]
+    """
+
+def parse_search_queries(ticker, response_text):
+    """Parses Gemini's query list; returns [] (after printing why) on an unexpected format. Raises on invalid JSON."""
+    queries = json.loads(_clean_json_text(response_text))
+    if isinstance(queries, list) and all(isinstance(q, str) for q in queries):
+        print(f"  Gemini generated queries for {ticker}: {queries}")
+        return queries
+    print(f"  Error: Gemini query generation returned unexpected format for {ticker}: {response_text}")
+    return []
 
 def generate_search_queries(ticker, company_name):
     """Uses Gemini to generate relevant search queries for a stock."""
@@ -34,58 +73,103 @@ def generate_search_queries(ticker, company_name):
         print("Error: Gemini query generation model not initialized.")
         return []
 
-    prompt = f"""
-    Generate 3 diverse search queries to find recent news and analysis about factors affecting the stock performance of {company_name} (ticker: {ticker}).
-    Focus on potential catalysts, risks, financial health, and recent developments.
-    Output the queries as a JSON list of strings. Example: ["query 1", "query 2", "query 3"]
-    """
+    prompt = build_query_prompt(ticker, company_name)
     try:
-        response = query_generation_model.generate_content(prompt)
-        # Attempt to parse the JSON response, handling potential markdown/formatting
-        cleaned_response = response.text.strip().replace('```json', '').replace('```', '').strip()
-        queries = json.loads(cleaned_response)
-        if isinstance(queries, list) and all(isinstance(q, str) for q in queries):
-            print(f"  Gemini generated queries for {ticker}: {queries}")
-            return queries
-        else:
-            print(f"  Error: Gemini query generation returned unexpected format for {ticker}: {response.text}")
-            return []
+        # Rate limit, adaptive concurrency and retries on throttling / transient errors
+        response = fetch_engine.get_controller('gemini').call(query_generation_model.generate_content, prompt)
+        return parse_search_queries(ticker, response.text)
     except Exception as e:
         print(f"  Error generating search queries for {ticker} with Gemini: {e}")
         print(f"  Gemini Raw Response: {response.text if 'response' in locals() else 'N/A'}")
         return []
 
-def search_with_brave(query):
-    """Performs a search using the Brave Search API."""
-    headers = {
-        'Accept': 'application/json',
-        'Accept-Encoding': 'gzip',
-        'X-Subscription-Token': config.BRAVE_API_KEY # Use key from config
-    }
-    params = {
-        'q': query,
-        'country': 'us',
-        'search_lang': 'en',
-        'spellcheck': 'false',
-        'count': 5 # Limit to 5 results for analysis
-    }
+def lookup_query_plan(ticker, company_name, plans=None):
+    """
+    Returns the queries to run without calling Gemini, or None if a new plan must be generated.
+
+    In 'templates' mode (config.QUERY_PLAN_MODE) the templated queries are always used;
+    otherwise a stored, unexpired plan for the same company name is reused.
+    """
+    if config.QUERY_PLAN_MODE == 'templates':
+        if plans is not None:
+            plans.record_template_fallback()
+        return query_plans.template_queries(ticker, company_name)
+    if plans is not None:
+        return plans.get(ticker, company_name)
+    return None
+
+def finish_query_plan(ticker, company_name, generated_queries, plans=None):
+    """Stores freshly generated queries, or falls back to the templated queries if generation failed."""
+    if generated_queries:
+        if plans is not None:
+            plans.put(ticker, company_name, generated_queries)
+        return generated_queries
+    print(f"  Using templated search queries for {ticker}.")
+    if plans is not None:
+        plans.record_template_fallback()
+    return query_plans.template_queries(ticker, company_name)
+
+def get_search_queries(ticker, company_name, plans=None):
+    """
+    Returns the search queries for a ticker: a stored plan when one is valid, otherwise
+    new Gemini-generated queries (templated queries if that fails).
+
+    Args:
+        plans (query_plans.QueryPlanStore, optional): Store of earlier query plans.
+    """
+    queries = lookup_query_plan(ticker, company_name, plans)
+    if queries is None:
+        queries = finish_query_plan(ticker, company_name, generate_search_queries(ticker, company_name), plans)
+    return queries
+
+BRAVE_HEADERS = providers.BRAVE_HEADERS
+brave_params = providers.brave_params
+
+def parse_brave_results(data):
+    """Extracts title/snippet/url/date from a Brave web search response."""
+    results = []
+    # Parse Web Search results (adjust keys as needed based on actual API response)
+    if 'web' in data and 'results' in data['web'] and data['web']['results']:
+        for item in data['web']['results']:
+             # Extract relevant fields - names might differ slightly (e.g., description vs snippet)
+             results.append({
+                 'title': item.get('title'),
+                 'snippet': item.get('description'), # Web results often use 'description'
+                 'url': item.get('url'),
+                 'date': item.get('page_age') # Web results might use 'page_age'
+             })
+    return results
+
+def brave_get(session, query):
+    """
+    One Brave Search request through the data provider; the live provider raises
+    requests.HTTPError for error statuses (e.g. 429) so they can be retried.
+    """
+    return providers.get_provider().search(session, query)
+
+def search_with_brave(query, session=None, store=None):
+    """
+    Performs a search using the Brave Search API.
+
+    Args:
+        query (str): Search query.
+        session (requests.Session, optional): Pooled session to reuse connections.
+        store (search_store.SearchResultStore, optional): Serves queries answered within
+            SEARCH_QUERY_TTL_HOURS without a Brave call and stores new responses.
+    """
+    if store is not None:
+        stored = store.get_query(query)
+        if stored is not None:
+            print(f"    Reusing stored Brave results for: {query}")
+            return stored
     try:
         print(f"    Executing Brave search: {query}")
-        response = requests.get(config.BRAVE_SEARCH_ENDPOINT, headers=headers, params=params, timeout=10) # Use endpoint from config
-        response.raise_for_status()
-        data = response.json()
-        results = []
-        # Parse Web Search results (adjust keys as needed based on actual API response)
-        if 'web' in data and 'results' in data['web'] and data['web']['results']:
-            for item in data['web']['results']:
-                 # Extract relevant fields - names might differ slightly (e.g., description vs snippet)
-                 results.append({
-                     'title': item.get('title'),
-                     'snippet': item.get('description'), # Web results often use 'description'
-                     'url': item.get('url'),
-                     'date': item.get('page_age') # Web results might use 'page_age'
-                 })
+        # Throttled to the Brave plan's query rate; 429s and transient errors are retried with backoff
+        data = fetch_engine.get_controller('brave').call(brave_get, session, query)
+        results = parse_brave_results(data)
         print(f"    Brave Web search returned {len(results)} results.")
+        if store is not None:
+            store.put_query(query, results)
         return results
     except requests.exceptions.RequestException as e:
         print(f"    Error during Brave search for query '{query}': {e}")
@@ -94,125 +178,253 @@ def search_with_brave(query):
         print(f"    Unexpected error during Brave search processing for query '{query}': {e}")
         return []
 
-def analyze_search_results(ticker, company_name, search_results):
-    """Uses Gemini to analyze search results and provide summary/sentiment."""
-    if not analysis_model:
-        print("Error: Gemini analysis model not initialized.")
-        return {"summary": "Error: Analysis model not available.", "sentiment_score": 0.0}
-    if not search_results:
-        return {"summary": "No search results found to analyze.", "sentiment_score": 0.0, "bullish_points": [], "bearish_points": []}
-
-    # Prepare context from search results, limiting total results to avoid excessive context
+def build_results_context(search_results):
+    """Formats the search results fed to the analysis model, limiting total results to avoid excessive context."""
     context = ""
-    max_context_results = 6 # Limit total results fed to analysis model
-    for i, result in enumerate(search_results[:max_context_results]):
+    for i, result in enumerate(search_results[:MAX_CONTEXT_RESULTS]):
         context += f"Result {i+1}:\nTitle: {result.get('title', 'N/A')}\nSnippet: {result.get('snippet', 'N/A')}\nDate: {result.get('date', 'N/A')}\nURL: {result.get('url', 'N/A')}\n\n"
+    return context
 
-    prompt = f"""
-    Analyze the following recent web search results regarding {company_name} ({ticker}).
-    Based *only* on the provided search results context:
+ANALYSIS_INSTRUCTIONS = """
     1. Provide a brief, neutral summary (2-3 sentences) of the key factors or news currently impacting the stock.
     2. List the top 1-2 bullish points mentioned in the results (as a JSON list of strings). If none, use an empty list [].
     3. List the top 1-2 bearish points mentioned in the results (as a JSON list of strings). If none, use an empty list [].
     4. Provide an overall sentiment score based *only* on these results, ranging from -1.0 (very negative) to +1.0 (very positive), with 0.0 being neutral.
+"""
+ANALYSIS_EXAMPLE = '{"summary": "Recent news highlights concerns about X but also potential growth in Y.", "bullish_points": ["Potential growth in Y mentioned in Result 3."], "bearish_points": ["Concerns about X noted in Result 1.", "Result 5 mentions market headwinds."], "sentiment_score": -0.2}'
+
+def build_analysis_prompt(ticker, company_name, search_results):
+    context = build_results_context(search_results)
 
+    return f"""
+    Analyze the following recent web search results regarding {company_name} ({ticker}).
+    Based *only* on the provided search results context:{ANALYSIS_INSTRUCTIONS}
     Search Results Context:
     {context}
 
     Output the result STRICTLY as a JSON object with keys "summary" (string), "bullish_points" (list of strings), "bearish_points" (list of strings), and "sentiment_score" (float).
-    Example: {{"summary": "Recent news highlights concerns about X but also potential growth in Y.", "bullish_points": ["Potential growth in Y mentioned in Result 3."], "bearish_points": ["Concerns about X noted in Result 1.", "Result 5 mentions market headwinds."], "sentiment_score": -0.2}}
+    Example: {ANALYSIS_EXAMPLE}
+    """
+
+def build_batch_section(ticker, company_name, search_results):
+    """One company's block in a batched analysis prompt."""
+    return f"=== {ticker} ({company_name}) ===\n{build_results_context(search_results)}"
+
+def build_batch_analysis_prompt(items):
+    """
+    Prompt analyzing several companies in one request.
+
+    Args:
+        items (list): (ticker, company_name, search_results) tuples.
     """
+    tickers = [ticker for ticker, _, _ in items]
+    sections = "\n".join(build_batch_section(ticker, company_name, results) for ticker, company_name, results in items)
+    return f"""
+    Analyze the recent web search results below for each of these {len(items)} companies separately: {", ".join(tickers)}.
+    Each company's results follow a "=== TICKER (Company) ===" header. For each company, based *only* on its own results:{ANALYSIS_INSTRUCTIONS}
+    Search Results Context:
+    {sections}
+
+    Output the result STRICTLY as one JSON object whose keys are exactly the tickers ({", ".join(tickers)}). Each value is an object with keys "summary" (string), "bullish_points" (list of strings), "bearish_points" (list of strings), and "sentiment_score" (float).
+    Example: {{"{tickers[0]}": {ANALYSIS_EXAMPLE}}}
+    """
+
+def estimate_tokens(text):
+    """Rough prompt token count (~4 characters per token) used for batch budgets."""
+    return len(text) // 4 + 1
 
+def default_analysis(summary):
+    """Placeholder for a failed analysis (source 'none'; successful Gemini analyses carry no source key)."""
+    return {"summary": summary, "sentiment_score": 0.0, "bullish_points": [], "bearish_points": [], "source": "none"}
+
+def local_fallback(ticker, analysis, search_results):
+    """
+    Replaces a failed Gemini analysis with the local lexicon tier (local_sentiment.py)
+    scored on the same search results, when LOCAL_SENTIMENT_FALLBACK is on.
+    """
+    if analysis.get('source') != 'none' or not search_results or not config.LOCAL_SENTIMENT_FALLBACK or not local_sentiment.available():
+        return analysis
+    print(f"  Gemini analysis failed for {ticker} ({analysis['summary']}); using local lexicon sentiment.")
+    return local_sentiment.analyze_results(ticker, search_results, reason=f"Gemini unavailable: {analysis['summary']}") or analysis
+
+def validate_analysis(ticker, analysis):
+    """Validates and normalizes one analysis object; returns None if its structure is wrong."""
+    if isinstance(analysis, dict) and \
+       "summary" in analysis and \
+       "bullish_points" in analysis and isinstance(analysis["bullish_points"], list) and \
+       "bearish_points" in analysis and isinstance(analysis["bearish_points"], list) and \
+       "sentiment_score" in analysis:
+         # Ensure score is a float
+         try:
+             analysis["sentiment_score"] = float(analysis["sentiment_score"])
+         except (ValueError, TypeError):
+             print(f"  Warning: Could not convert sentiment score '{analysis['sentiment_score']}' to float for {ticker}. Defaulting to 0.0.")
+             analysis["sentiment_score"] = 0.0
+
+         print(f"  Gemini analysis for {ticker}: Score={analysis['sentiment_score']:.2f}, Summary='{str(analysis['summary'])[:50]}...'")
+         # Ensure points are lists of strings (handle potential non-string items)
+         analysis["bullish_points"] = [str(item) for item in analysis["bullish_points"]]
+         analysis["bearish_points"] = [str(item) for item in analysis["bearish_points"]]
+         return analysis
+    return None
+
+def parse_analysis(ticker, response_text):
+    """
+    Parses and validates Gemini's analysis JSON.
+
+    Returns:
+        tuple: (analysis, ok). On malformed output ok is False and analysis is a default structure.
+    """
+    # Attempt to parse the JSON response, handling potential markdown/formatting
+    cleaned_response = _clean_json_text(response_text)
     try:
-        response = analysis_model.generate_content(prompt)
-        # Attempt to parse the JSON response, handling potential markdown/formatting
-        cleaned_response = response.text.strip().replace('```json', '').replace('```', '').strip()
         analysis = json.loads(cleaned_response)
+    except json.JSONDecodeError as e:
+        print(f"  Error decoding Gemini JSON response for {ticker}: {e}")
+        print(f"  Gemini Raw Response: {cleaned_response}")
+        return default_analysis("Analysis JSON error."), False
 
-        # Validate structure
-        if isinstance(analysis, dict) and \
-           "summary" in analysis and \
-           "bullish_points" in analysis and isinstance(analysis["bullish_points"], list) and \
-           "bearish_points" in analysis and isinstance(analysis["bearish_points"], list) and \
-           "sentiment_score" in analysis:
-             # Ensure score is a float
-             try:
-                 analysis["sentiment_score"] = float(analysis["sentiment_score"])
-             except (ValueError, TypeError):
-                 print(f"  Warning: Could not convert sentiment score '{analysis['sentiment_score']}' to float for {ticker}. Defaulting to 0.0.")
-                 analysis["sentiment_score"] = 0.0
-
-             print(f"  Gemini analysis for {ticker}: Score={analysis['sentiment_score']:.2f}, Summary='{analysis['summary'][:50]}...'")
-             # Ensure points are lists of strings (handle potential non-string items)
-             analysis["bullish_points"] = [str(item) for item in analysis["bullish_points"]]
-             analysis["bearish_points"] = [str(item) for item in analysis["bearish_points"]]
-             return analysis
-        else:
-             print(f"  Error: Gemini analysis returned unexpected JSON structure for {ticker}: {cleaned_response}")
-             # Return default structure on format error
-             return {"summary": "Analysis format error.", "sentiment_score": 0.0, "bullish_points": [], "bearish_points": []}
+    validated = validate_analysis(ticker, analysis)
+    if validated is None:
+         print(f"  Error: Gemini analysis returned unexpected JSON structure for {ticker}: {cleaned_response}")
+         # Return default structure on format error
+         return default_analysis("Analysis format error."), False
+    return validated, True
 
+def parse_batch_analysis(tickers, response_text):
+    """
+    Parses a batched analysis response and validates each ticker's section on its own.
+
+    Returns:
+        dict: ticker -> analysis for the sections that passed validation. Tickers that are
+        missing or malformed are left out so the caller can retry them individually.
+    """
+    try:
+        batch = json.loads(_clean_json_text(response_text))
     except json.JSONDecodeError as e:
-        print(f"  Error decoding Gemini JSON response for {ticker}: {e}")
-        print(f"  Gemini Raw Response: {cleaned_response if 'cleaned_response' in locals() else 'N/A'}")
-        return {"summary": "Analysis JSON error.", "sentiment_score": 0.0, "bullish_points": [], "bearish_points": []}
+        print(f"  Error decoding batched Gemini JSON response for {', '.join(tickers)}: {e}")
+        return {}
+    if not isinstance(batch, dict):
+        print(f"  Error: Batched Gemini analysis is not a JSON object for {', '.join(tickers)}.")
+        return {}
+    sections = {str(key).strip().upper(): value for key, value in batch.items()}
+    analyses = {}
+    for ticker in tickers:
+        validated = validate_analysis(ticker, sections.get(ticker.upper()))
+        if validated is None:
+            print(f"  Error: Batched Gemini analysis section missing or malformed for {ticker}.")
+        else:
+            analyses[ticker] = validated
+    return analyses
+
+def cache_key(ticker, company_name, search_results):
+    """Analysis cache key for the results actually sent to Gemini."""
+    return analysis_cache.analysis_key(ticker, company_name, search_results[:MAX_CONTEXT_RESULTS], config.GEMINI_MODEL_NAME, ANALYSIS_PROMPT_VERSION)
+
+def analyze_search_results(ticker, company_name, search_results, cache=None, store=None):
+    """
+    Uses Gemini to analyze search results and provide summary/sentiment.
+
+    Args:
+        cache (analysis_cache.AnalysisCache, optional): When given, an analysis of identical
+            inputs is reused without calling Gemini, and new successful analyses are stored.
+        store (search_store.SearchResultStore, optional): Records the results sent once the
+            analysis succeeds, so they are not sent again for this ticker.
+    """
+    if not analysis_model:
+        print("Error: Gemini analysis model not initialized.")
+        return default_analysis("Error: Analysis model not available.")
+    if not search_results:
+        return default_analysis("No search results found to analyze.")
+
+    key = cache_key(ticker, company_name, search_results) if cache is not None else None
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            print(f"  Reusing cached Gemini analysis for {ticker} (search results unchanged).")
+            if store is not None:
+                store.mark_analyzed(ticker, search_results[:MAX_CONTEXT_RESULTS])
+            return cached
+
+    prompt = build_analysis_prompt(ticker, company_name, search_results)
+    try:
+        start = time.perf_counter()
+        response = fetch_engine.get_controller('gemini').call(analysis_model.generate_content, prompt)
+        analysis, ok = parse_analysis(ticker, response.text)
+        if ok and key is not None:
+            cache.put(key, ticker, analysis, call_seconds=time.perf_counter() - start)
+        if ok and store is not None:
+            store.mark_analyzed(ticker, search_results[:MAX_CONTEXT_RESULTS])
+        return analysis
     except Exception as e:
         print(f"  Error analyzing search results for {ticker} with Gemini: {e}")
         print(f"  Gemini Raw Response: {response.text if 'response' in locals() else 'N/A'}")
-        return {"summary": "Analysis error.", "sentiment_score": 0.0, "bullish_points": [], "bearish_points": []}
+        return default_analysis("Analysis error.")
 
 
-def get_analysis_for_stock(ticker, company_name):
-    """Orchestrates the process: generate query, search, analyze."""
-    print(f"--- Starting Gemini analysis for {ticker} ---")
-    search_queries = generate_search_queries(ticker, company_name)
+def collect_unique_results(ticker, search_queries, results_per_query):
+    """Keeps the top MAX_RESULTS_PER_QUERY results of each query and drops duplicate URLs."""
+    seen_urls = set()
+    unique_results = []
+    for results in results_per_query:
+        for result in (results or [])[:MAX_RESULTS_PER_QUERY]:
+            url = result.get('url')
+            if url and url not in seen_urls:
+                unique_results.append(result)
+                seen_urls.add(url)
+    logging.info(f"Collected {len(unique_results)} unique search results from {len(search_queries)} queries for {ticker}.")
+    return unique_results
+
+def new_results_only(ticker, unique_results, store=None):
+    """
+    Narrows the collected results to those not yet analyzed for the ticker (when the store
+    is given and SEARCH_NEW_RESULTS_ONLY is on). Returns None when there is nothing new.
+    """
+    if store is None:
+        return unique_results
+    new = store.new_results(ticker, unique_results)
+    if not config.SEARCH_NEW_RESULTS_ONLY:
+        return unique_results
+    if not new:
+        print(f"  No new search results for {ticker} since its last analysis; keeping the stored analysis.")
+        return None
+    print(f"  {len(new)}/{len(unique_results)} search results for {ticker} are new since its last analysis.")
+    return new
 
-    # Default result structure
-    default_result = {"summary": "Analysis failed.", "sentiment_score": 0.0, "bullish_points": [], "bearish_points": []}
+def get_analysis_for_stock(ticker, company_name, session=None, cache=None, plans=None, store=None):
+    """
+    Orchestrates the process: generate query, search, analyze.
 
-    if not search_queries:
-        default_result["summary"] = "Failed to generate search queries."
-        return default_result
+    Args:
+        session (requests.Session, optional): Pooled session reused for the Brave searches.
+        cache (analysis_cache.AnalysisCache, optional): Cache of earlier analyses (see analyze_search_results).
+        plans (query_plans.QueryPlanStore, optional): Stored search-query plans (see get_search_queries).
+        store (search_store.SearchResultStore, optional): Stored search results; only results
+            not analyzed before are sent to Gemini (see new_results_only).
 
-    # Search for each query and collect results
-    all_search_results = []
-    max_results_per_query = 2 # Limit results from each query to keep context manageable
-    for i, query in enumerate(search_queries):
-        # Add delay between Brave API calls, especially after the first one
-        if i > 0:
-            time.sleep(1)
-        results = search_with_brave(query)
-        if results:
-            all_search_results.extend(results[:max_results_per_query])
-
-    # Remove potential duplicate URLs before analysis
-    seen_urls = set()
-    unique_results = []
-    for result in all_search_results:
-        url = result.get('url')
-        if url and url not in seen_urls:
-            unique_results.append(result)
-            seen_urls.add(url)
+    Returns:
+        dict: The analysis, or None when the store has an earlier analysis and no new
+        results came in (that analysis stays current).
+    """
+    print(f"--- Starting Gemini analysis for {ticker} ---")
+    search_queries = get_search_queries(ticker, company_name, plans=plans)
 
-    # Use logging module if available, otherwise print
-    try:
-        import logging
-        logging.info(f"Collected {len(unique_results)} unique search results from {len(search_queries)} queries for {ticker}.")
-    except ImportError:
-        # Use logging module if available, otherwise print
-        try:
-            import logging
-            logging.info(f"Collected {len(unique_results)} unique search results from {len(search_queries)} queries for {ticker}.")
-        except ImportError:
-             # Fallback print if logging fails to import (less likely now but safe)
-             print(f"INFO: Collected {len(unique_results)} unique search results from {len(search_queries)} queries for {ticker}.")
+    if not search_queries:
+        return default_analysis("Failed to generate search queries.")
 
+    # Search for each query and collect results
+    # Brave calls are throttled by the shared 'brave' rate limiter inside search_with_brave
+    results_per_query = [search_with_brave(query, session=session, store=store) for query in search_queries]
+    unique_results = collect_unique_results(ticker, search_queries, results_per_query)
 
     if not unique_results:
-        default_result["summary"] = "No unique search results found after querying."
-        return default_result
+        return default_analysis("No unique search results found after querying.")
+    unique_results = new_results_only(ticker, unique_results, store)
+    if unique_results is None:
+        return None
 
-    analysis = analyze_search_results(ticker, company_name, unique_results) # Pass unique results
+    analysis = analyze_search_results(ticker, company_name, unique_results, cache=cache, store=store) # Pass unique results
+    analysis = local_fallback(ticker, analysis, unique_results)
     print(f"--- Finished Gemini analysis for {ticker} ---")
     return analysis
 
@@ -0,0 +1,260 @@
+"""
+Synthetic large-universe dataset for load tests of the scorer, analysis and web API.
+
+Builds a database with the same schema as stocks.db and fills companies,
+fundamentals_snapshot, price_history (OHLCV), news_articles, portfolio and,
+through the panel scorer's backfill, daily_scores:
+
+- Prices follow a (slowly mean-reverting) geometric random walk whose volatility and volume switch between
+  calm, normal and active regimes (a Markov chain), with occasional news-day jumps.
+- Analyses arrive every few trading days per ticker. Their sentiment leans towards the
+  sign of the latest move, and news days always get one.
+- Rows are written with executemany in large transactions on a fresh file, with
+  journaling off, so tens of millions of price rows build in minutes.
+
+Usage (from the backend directory):
+
+    python3 generate_synthetic_db.py [--db ../synthetic_stocks.db] [--tickers 3000] [--years 10]
+        [--news-days 365] [--score-days 250] [--holdings 15] [--seed 42] [--overwrite]
+
+Point the app at the result by setting database.DATABASE_NAME (benchmarks do this) or
+by copying it over stocks.db.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from datetime import date
+import numpy as np
+import pandas as pd
+import config # Import the config file
+import database # Import database functions
+
+DEFAULT_DB = os.path.join(database.PROJECT_ROOT, 'synthetic_stocks.db')
+INSERT_CHUNK_TICKERS = 50 # Tickers generated and written per transaction
+
+# Regimes: (daily volatility, volume multiplier); the chain stays put with REGIME_STAY
+REGIMES = [(0.012, 0.6), (0.022, 1.0), (0.045, 2.2)] # calm, normal, active
+REGIME_STAY = 0.97
+MEAN_REVERSION = 0.998 # Daily persistence of the log-price deviation from the base level
+NEWS_JUMP_PROBABILITY = 0.01 # Share of days with a news-driven jump
+SOURCE_WEIGHTS = {'gemini': 0.85, 'vader': 0.15} # Tier of generated analyses
+
+
+def synthetic_tickers(n):
+    """n distinct 4-letter tickers (AAAA, AAAB, ...)."""
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    return ["".join(letters[(i // 26 ** k) % 26] for k in (3, 2, 1, 0)) for i in range(n)]
+
+def regime_path(rng, n_days):
+    """Regime index per day from a 3-state Markov chain."""
+    switches = rng.random(n_days) > REGIME_STAY
+    targets = rng.integers(0, len(REGIMES), n_days)
+    regimes = np.empty(n_days, dtype=np.int64)
+    current = 1
+    for day in range(n_days): # Short Python loop per ticker; dominated by the inserts
+        if switches[day]:
+            current = targets[day]
+        regimes[day] = current
+    return regimes
+
+def generate_prices(rng, n_days):
+    """
+    One ticker's OHLCV arrays plus the day's news jump.
+
+    Returns:
+        dict: 'open', 'high', 'low', 'close', 'volume' arrays and 'jump' (0 on quiet days).
+    """
+    regimes = regime_path(rng, n_days)
+    vol, volume_level = np.array(REGIMES)[regimes].T
+    jump = np.where(rng.random(n_days) < NEWS_JUMP_PROBABILITY, rng.normal(0, 0.08, n_days), 0.0)
+    log_returns = rng.normal(0.0002, vol) + jump
+    # Log price drifts back towards the ticker's base level (AR(1), vectorized) so a
+    # decade of history stays in a plausible price band
+    powers = MEAN_REVERSION ** np.arange(n_days)
+    close = rng.uniform(3, 40) * np.exp(powers * np.cumsum(log_returns / powers))
+    gap = rng.normal(0, vol / 3) + jump / 2 # Part of a move happens overnight
+    open_ = np.concatenate([[close[0]], close[:-1]]) * np.exp(gap)
+    wick = np.abs(rng.normal(0, vol / 2, (2, n_days)))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    base_volume = rng.lognormal(np.log(400_000), 0.8)
+    volume = np.round(base_volume * volume_level * rng.lognormal(0, 0.3, n_days) * (1 + 4 * (jump != 0)))
+    return {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume.astype(np.int64), 'jump': jump}
+
+def generate_fundamentals(rng, ticker, quarter_dates):
+    """Quarterly fundamentals_snapshot rows drifting slowly around per-ticker levels."""
+    n = len(quarter_dates)
+    drift = lambda level, spread: level * np.exp(np.cumsum(rng.normal(0, spread, n)))
+    pe = drift(rng.uniform(8, 40), 0.1)
+    pe[rng.random(n) < 0.1] = np.nan # Loss-making quarters have no P/E
+    has_dividend = rng.random() < 0.45
+    dividend = drift(rng.uniform(0.005, 0.05), 0.05) if has_dividend else np.full(n, np.nan)
+    de, pb, ps = drift(rng.uniform(0.1, 2.0), 0.08), drift(rng.uniform(0.6, 6), 0.08), drift(rng.uniform(0.4, 8), 0.08)
+    return [(ticker, as_of, _opt(pe[i]), _opt(dividend[i]), _opt(de[i]), _opt(pb[i]), _opt(ps[i])) for i, as_of in enumerate(quarter_dates)]
+
+def _opt(value):
+    return None if np.isnan(value) else round(float(value), 4)
+
+BULLISH_POINTS = json.dumps(["Revenue growth ahead of peers."])
+BEARISH_POINTS = json.dumps(["Margins under pressure."])
+NO_POINTS = json.dumps([])
+
+def generate_news(rng, ticker, dates, prices, first_news_index):
+    """news_articles rows: an analysis every 1-5 trading days and on every news day."""
+    n_days = len(dates)
+    scheduled = first_news_index + np.cumsum(rng.integers(1, 6, max(1, n_days - first_news_index))) - 1
+    news_days = np.flatnonzero(prices['jump'][first_news_index:]) + first_news_index
+    days = np.union1d(scheduled[scheduled < n_days], news_days)
+    close = prices['close']
+    moves = np.log(close[days] / close[np.maximum(0, days - 3)])
+    sentiments = np.round(np.clip(np.tanh(moves * 12) * 0.6 + rng.normal(0, 0.25, len(days)), -1, 1), 3)
+    sources = np.where(rng.random(len(days)) < SOURCE_WEIGHTS['gemini'], 'gemini', 'vader')
+    is_news_day = np.isin(days, news_days)
+    rows = []
+    for i, move, sentiment, source, heavy in zip(days.tolist(), moves.tolist(), sentiments.tolist(), sources.tolist(), is_news_day.tolist()):
+        tone = "rallied" if move > 0 else "slipped"
+        rows.append((
+            ticker, f"https://synthetic.example/{ticker}/{dates[i]}", f"Analysis {ticker} {dates[i]}",
+            f"{ticker} shares {tone} {abs(move) * 100:.1f}% over three sessions.",
+            dates[i], f"{dates[i]}T22:00:00", sentiment,
+            f"Synthetic summary: {ticker} {tone} on {'heavy' if heavy else 'ordinary'} news flow.",
+            BULLISH_POINTS if sentiment > -0.2 else NO_POINTS,
+            BEARISH_POINTS if sentiment < 0.2 else NO_POINTS,
+            source,
+        ))
+    return rows
+
+def _bulk_pragmas(conn):
+    # Fresh file: nothing to protect until the build finishes, so skip journaling and fsyncs
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144") # 256 MiB page cache
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+def generate(db_path, n_tickers, n_days, news_days=365, score_days=250, holdings=15, seed=42, end=None):
+    """
+    Builds the synthetic database at db_path (which must not exist yet).
+
+    Returns:
+        dict: Row counts per table and seconds per phase.
+    """
+    rng = np.random.default_rng(seed)
+    dates_index = pd.bdate_range(end=pd.Timestamp(end or date.today()).normalize(), periods=n_days)
+    dates = dates_index.strftime('%Y-%m-%d').tolist()
+    quarter_dates = sorted({d.strftime('%Y-%m-%d') for d in dates_index[::63]}) # One snapshot per ~quarter
+    first_news_index = max(0, n_days - news_days)
+    tickers = synthetic_tickers(n_tickers)
+    sectors = config.ALLOWED_SECTORS
+    counts = {'companies': n_tickers, 'price_history': 0, 'fundamentals_snapshot': 0, 'news_articles': 0, 'portfolio': 0, 'daily_scores': 0}
+    timings = {}
+
+    original_path = database.DATABASE_NAME
+    database.DATABASE_NAME = db_path
+    try:
+        init_start = time.perf_counter()
+        with contextlib.redirect_stdout(open(os.devnull, 'w')): # init_db reports each migration it applies
+            database.init_db()
+        database.close_connections() # Leaving WAL needs the only open connection
+        conn = database.connect(db_path) # Own connection: the bulk pragmas must not leak into the pooled one
+        _bulk_pragmas(conn)
+        conn.executemany("INSERT INTO companies (ticker, name, sector) VALUES (?, ?, ?)",
+                         [(ticker, f"{ticker.title()} Synthetic Holdings", sectors[i % len(sectors)]) for i, ticker in enumerate(tickers)])
+        conn.commit()
+
+        start = time.perf_counter()
+        last_close = {}
+        for chunk_start in range(0, n_tickers, INSERT_CHUNK_TICKERS):
+            price_rows, fundamentals_rows, news_rows = [], [], []
+            for ticker in tickers[chunk_start:chunk_start + INSERT_CHUNK_TICKERS]:
+                prices = generate_prices(rng, n_days)
+                last_close[ticker] = prices['close']
+                # .tolist() yields native Python floats/ints, which sqlite3 binds directly
+                price_rows.extend(zip([ticker] * n_days, dates, prices['open'].tolist(), prices['high'].tolist(),
+                                      prices['low'].tolist(), prices['close'].tolist(), prices['volume'].tolist()))
+                fundamentals_rows.extend(generate_fundamentals(rng, ticker, quarter_dates))
+                news_rows.extend(generate_news(rng, ticker, dates, prices, first_news_index))
+            conn.executemany("INSERT INTO price_history (ticker, date, open_price, high_price, low_price, close_price, volume) VALUES (?, ?, ?, ?, ?, ?, ?)", price_rows)
+            conn.executemany("""
+                INSERT INTO fundamentals_snapshot (ticker, as_of_date, pe_ratio, dividend_yield, debt_to_equity, pb_ratio, ps_ratio)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, fundamentals_rows)
+            conn.executemany("""
+                INSERT INTO news_articles (ticker, url, title, snippet, published_date, fetched_date, sentiment_score,
+                                           gemini_summary, bullish_points, bearish_points, sentiment_source)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, news_rows)
+            conn.commit()
+            counts['price_history'] += len(price_rows)
+            counts['fundamentals_snapshot'] += len(fundamentals_rows)
+            counts['news_articles'] += len(news_rows)
+            done = min(chunk_start + INSERT_CHUNK_TICKERS, n_tickers)
+            if done % (INSERT_CHUNK_TICKERS * 10) == 0 or done == n_tickers:
+                elapsed = time.perf_counter() - start
+                print(f"  {done}/{n_tickers} tickers, {counts['price_history']:,} price rows in {elapsed:.1f}s "
+                      f"({counts['price_history'] / elapsed:,.0f} rows/s)")
+
+        # Holdings bought at the close of a random day within the last year
+        held = rng.choice(tickers, size=min(holdings, n_tickers), replace=False)
+        portfolio_rows = []
+        for ticker in held:
+            day = int(rng.integers(max(0, n_days - 250), n_days))
+            portfolio_rows.append((str(ticker), int(rng.integers(1, 20)) * 10, round(float(last_close[ticker][day]), 2), dates[day]))
+        conn.executemany("INSERT INTO portfolio (ticker, quantity, purchase_price, purchase_date) VALUES (?, ?, ?, ?)", portfolio_rows)
+        conn.commit()
+        counts['portfolio'] = len(portfolio_rows)
+        database.rebuild_ticker_latest(conn) # Rows above bypass the write helpers that keep it current
+        conn.execute(f"PRAGMA journal_mode = {config.SQLITE_JOURNAL_MODE}") # Back from OFF for the app's connections
+        conn.close()
+        timings['rows'] = time.perf_counter() - init_start
+
+        if score_days:
+            import panel_scorer # Real scores for the last score_days dates from the generated history
+            start = time.perf_counter()
+            score_from = dates[max(0, n_days - score_days)]
+            panel_scorer.calculate_scores_for_range(score_from, dates[-1])
+            timings['daily_scores'] = time.perf_counter() - start
+            conn = database.get_db_connection()
+            counts['daily_scores'] = conn.execute("SELECT COUNT(*) FROM daily_scores").fetchone()[0]
+            conn.close()
+    finally:
+        database.close_connections()
+        database.DATABASE_NAME = original_path
+    return {'counts': counts, 'timings': timings}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic stocks database for load tests.")
+    parser.add_argument('--db', default=DEFAULT_DB, help=f"Output database file (default {DEFAULT_DB}).")
+    parser.add_argument('--tickers', type=int, default=3000)
+    parser.add_argument('--years', type=float, default=10, help="Trading history length (252 trading days per year).")
+    parser.add_argument('--days', type=int, help="Trading days of history (overrides --years).")
+    parser.add_argument('--news-days', type=int, default=365, help="Trading days at the end of the history that get analyses.")
+    parser.add_argument('--score-days', type=int, default=250, help="Trading days scored by the panel backfill (0 = no daily_scores).")
+    parser.add_argument('--holdings', type=int, default=15, help="Portfolio positions.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--overwrite', action='store_true', help="Replace the output file if it exists.")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.db):
+        if not args.overwrite:
+            print(f"Error: {args.db} already exists (pass --overwrite to replace it).", file=sys.stderr)
+            return 1
+        os.remove(args.db)
+    n_days = args.days or int(round(args.years * 252))
+    print(f"Generating {args.tickers} tickers x {n_days} trading days into {args.db} "
+          f"({args.tickers * n_days:,} price rows, analyses over the last {args.news_days} days, scores over the last {args.score_days})...")
+    start = time.perf_counter()
+    result = generate(args.db, args.tickers, n_days, news_days=args.news_days, score_days=args.score_days, holdings=args.holdings, seed=args.seed)
+    for table, count in result['counts'].items():
+        print(f"  {table:<22} {count:>12,} rows")
+    for phase, elapsed in result['timings'].items():
+        print(f"  {phase:<22} {elapsed:>11.1f}s")
+    print(f"Done in {time.perf_counter() - start:.1f}s ({os.path.getsize(args.db) / 1e6:,.0f} MB).")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+NumPy technical indicator kernels.
+
+Drop-in replacements for the pandas_ta (0.3.14b0) indicators used by the scorer: they
+reproduce the same pandas ewm/rolling recursions, so values agree with pandas_ta to
+floating-point precision (see `benchmarks.py indicators`).
+
+Every function accepts a 1-D array (one series) or a 2-D array of shape
+(observations, series) and returns arrays of the same shape. Columns may have leading
+NaN padding (shorter histories in a panel); each column is computed over its own values
+exactly as pandas_ta would compute that series on its own.
+"""
+import sys
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _as_columns(x):
+    """Returns (2-D float array, was_1d)."""
+    x = np.asarray(x, dtype=float)
+    if x.ndim == 1:
+        return x[:, None], True
+    return x, False
+
+def _restore(out, was_1d):
+    return out[:, 0] if was_1d else out
+
+def _nanmean(x, axis=0):
+    """np.nanmean without the all-NaN RuntimeWarning (all-NaN columns give NaN)."""
+    count = (~np.isnan(x)).sum(axis=axis)
+    total = np.nansum(x, axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, total / count, np.nan)
+
+def _first_valid_rows(x):
+    """Row index of the first non-NaN value per column (x.shape[0] if none)."""
+    valid = ~np.isnan(x)
+    if not x.shape[0]:
+        return np.zeros(x.shape[1], dtype=np.int64)
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), x.shape[0])
+
+
+def ewm_mean(x, com, adjust, min_periods=0):
+    """
+    Exponentially weighted mean following pandas' ewm(com=..., adjust=...).mean()
+    recursion (ignore_na=False), applied to every column at once.
+    """
+    x, was_1d = _as_columns(x)
+    alpha = 1.0 / (1.0 + com)
+    old_wt_factor = 1.0 - alpha
+    new_wt = 1.0 if adjust else alpha
+    out = np.full(x.shape, np.nan)
+    if not x.shape[0]:
+        return _restore(out, was_1d)
+    weighted = x[0].copy()
+    nobs = (~np.isnan(weighted)).astype(np.int64)
+    old_wt = np.ones(x.shape[1])
+    out[0] = np.where(nobs >= min_periods, weighted, np.nan)
+    for i in range(1, x.shape[0]):
+        cur = x[i]
+        is_obs = ~np.isnan(cur)
+        nobs += is_obs
+        has_weighted = ~np.isnan(weighted)
+        old_wt = np.where(has_weighted, old_wt * old_wt_factor, old_wt)
+        update = has_weighted & is_obs & (weighted != cur)
+        with np.errstate(invalid='ignore'):
+            blended = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+        weighted = np.where(update, blended, weighted)
+        if adjust:
+            old_wt = np.where(has_weighted & is_obs, old_wt + new_wt, old_wt)
+        else:
+            old_wt = np.where(has_weighted & is_obs, 1.0, old_wt)
+        weighted = np.where(~has_weighted & is_obs, cur, weighted)
+        out[i] = np.where(nobs >= min_periods, weighted, np.nan)
+    return _restore(out, was_1d)
+
+
+def sma(x, length):
+    """Simple moving average, as rolling(length).mean() (constant windows return the value exactly, as pandas does)."""
+    x, was_1d = _as_columns(x)
+    out = np.full(x.shape, np.nan)
+    if x.shape[0] >= length:
+        windows = sliding_window_view(x, length, axis=0) # (rows - length + 1, columns, length)
+        with np.errstate(invalid='ignore'):
+            mean = windows.mean(axis=-1)
+        constant = windows.min(axis=-1) == windows.max(axis=-1)
+        out[length - 1:] = np.where(constant, windows[..., -1], mean)
+    return _restore(out, was_1d)
+
+def stdev(x, length, ddof=0):
+    """Rolling standard deviation, as pandas_ta.stdev (rolling(length).var(ddof) ** 0.5)."""
+    x, was_1d = _as_columns(x)
+    out = np.full(x.shape, np.nan)
+    if x.shape[0] >= length:
+        windows = sliding_window_view(x, length, axis=0)
+        with np.errstate(invalid='ignore'):
+            var = windows.var(axis=-1, ddof=ddof)
+        constant = windows.min(axis=-1) == windows.max(axis=-1)
+        out[length - 1:] = np.sqrt(np.where(constant, 0.0, np.maximum(var, 0.0)))
+    return _restore(out, was_1d)
+
+def rma(x, length):
+    """Wilder's moving average, as pandas_ta.rma: ewm(alpha=1/length, min_periods=length)."""
+    alpha = 1.0 / length
+    return ewm_mean(x, com=(1 - alpha) / alpha, adjust=True, min_periods=length)
+
+def ema(x, length):
+    """
+    Exponential moving average, as pandas_ta.ema (sma=True): each series is seeded with
+    the mean of its first `length` values, then ewm(span=length, adjust=False).
+    """
+    x, was_1d = _as_columns(x)
+    x = x.copy()
+    rows = np.arange(x.shape[0])[:, None]
+    first = _first_valid_rows(x)
+    seed_row = first + length - 1
+    in_seed = (rows >= first) & (rows < first + length)
+    seed = _nanmean(np.where(in_seed, x, np.nan))
+    x[rows < seed_row] = np.nan
+    cols = np.nonzero(seed_row < x.shape[0])[0]
+    x[seed_row[cols], cols] = seed[cols]
+    return _restore(ewm_mean(x, com=(length - 1) / 2, adjust=False), was_1d)
+
+
+def rsi(close, length=14):
+    """Relative Strength Index with Wilder smoothing, as pandas_ta.rsi."""
+    close, was_1d = _as_columns(close)
+    diff = np.diff(close, axis=0, prepend=np.nan)
+    positive = np.where(diff < 0, 0.0, diff)
+    negative = np.where(diff > 0, 0.0, diff)
+    positive_avg = rma(positive, length)
+    negative_avg = rma(negative, length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = 100 * positive_avg / (positive_avg + np.abs(negative_avg))
+    return _restore(out, was_1d)
+
+def macd(close, fast=12, slow=26, signal=9):
+    """
+    MACD, as pandas_ta.macd.
+
+    Returns:
+        tuple: (macd line, signal line, histogram). The signal EMA is seeded from the
+        first valid MACD value of each series.
+    """
+    close, was_1d = _as_columns(close)
+    macd_line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(macd_line, signal)
+    return tuple(_restore(out, was_1d) for out in (macd_line, signal_line, macd_line - signal_line))
+
+def bbands(close, length=20, std=2.0, ddof=0):
+    """
+    Bollinger Bands, as pandas_ta.bbands.
+
+    Returns:
+        tuple: (lower, mid, upper).
+    """
+    mid = sma(close, length)
+    deviation = std * stdev(close, length, ddof)
+    return mid - deviation, mid, mid + deviation
+
+def true_range(high, low, close):
+    """True range, as pandas_ta.true_range (the first value of each series is NaN)."""
+    high, was_1d = _as_columns(high)
+    low, _ = _as_columns(low)
+    close, _ = _as_columns(close)
+    high_low = high - low
+    # pandas_ta.non_zero_range: shift the whole series by epsilon if any range is exactly 0
+    high_low = np.where((high_low == 0).any(axis=0), high_low + sys.float_info.epsilon, high_low)
+    prev_close = np.full(close.shape, np.nan)
+    prev_close[1:] = close[:-1]
+    out = np.fmax(np.fmax(np.abs(high_low), np.abs(high - prev_close)), np.abs(prev_close - low))
+    first = _first_valid_rows(close)
+    cols = np.nonzero(first < close.shape[0])[0]
+    out[first[cols], cols] = np.nan
+    return _restore(out, was_1d)
+
+def atr(high, low, close, length=14):
+    """Average True Range (Wilder smoothing), as pandas_ta.atr."""
+    return rma(true_range(high, low, close), length)
@@ -0,0 +1,80 @@
+import time
+import config # Import the config file
+from json_store import JsonFileStore
+
+# Fields tracked per ticker; each one has its own TTL in config.INFO_CACHE_TTL_HOURS
+CACHE_FIELDS = ('name', 'sector', 'price', 'fundamentals')
+
+
+class InfoCache(JsonFileStore):
+    """
+    On-disk cache of yfinance .info metadata with a separate TTL per field.
+
+    Each entry stores a value and the time it was fetched, so slow-changing fields
+    (name, sector) can be reused for weeks while the price is refreshed nightly. The
+    cache is loaded once per run, updated in memory (thread-safe) and written back
+    with save(). Lookups are counted so hit/miss/age statistics can be logged.
+
+    File layout: {ticker: {field: {"value": ..., "fetched_at": unix_seconds}}}
+    """
+
+    label = "info cache"
+
+    def __init__(self, path=None, ttl_hours=None):
+        super().__init__(path or config.INFO_CACHE_FILE)
+        self.ttl_seconds = {field: hours * 3600 for field, hours in (ttl_hours or config.INFO_CACHE_TTL_HOURS).items()}
+        self.hits = {field: 0 for field in CACHE_FIELDS}
+        self.misses = {field: 0 for field in CACHE_FIELDS}
+        self._hit_ages = {field: [] for field in CACHE_FIELDS}
+
+    def _age(self, entry, now):
+        return now - entry['fetched_at']
+
+    def is_fresh(self, ticker, field, now=None):
+        """Returns True if the field is cached and younger than its TTL (no stats recorded)."""
+        now = now or time.time()
+        with self._lock:
+            entry = self._entries.get(ticker, {}).get(field)
+        return entry is not None and self._age(entry, now) < self.ttl_seconds[field]
+
+    def stale_fields(self, ticker, fields=CACHE_FIELDS):
+        """
+        Returns the set of fields that must be refetched for a ticker and records a
+        hit or miss for each field checked.
+        """
+        now = time.time()
+        stale = set()
+        with self._lock:
+            cached = self._entries.get(ticker, {})
+            for field in fields:
+                entry = cached.get(field)
+                if entry is not None and self._age(entry, now) < self.ttl_seconds[field]:
+                    self.hits[field] += 1
+                    self._hit_ages[field].append(self._age(entry, now))
+                else:
+                    self.misses[field] += 1
+                    stale.add(field)
+        return stale
+
+    def get(self, ticker, field, default=None):
+        """Returns the cached value for a field regardless of age."""
+        with self._lock:
+            entry = self._entries.get(ticker, {}).get(field)
+        return entry['value'] if entry is not None else default
+
+    def put(self, ticker, field, value, fetched_at=None):
+        """Stores a freshly fetched value."""
+        with self._lock:
+            self._entries.setdefault(ticker, {})[field] = {'value': value, 'fetched_at': fetched_at or time.time()}
+
+    def log_stats(self, logger):
+        """Logs per-field hit/miss counts and the age of the entries that were served from cache."""
+        for field in CACHE_FIELDS:
+            hits, misses = self.hits[field], self.misses[field]
+            total = hits + misses
+            if not total:
+                continue
+            ages = self._hit_ages[field]
+            age_text = f", hit age avg {sum(ages) / len(ages) / 3600:.1f}h / max {max(ages) / 3600:.1f}h" if ages else ""
+            logger.info(f"Info cache '{field}' (TTL {self.ttl_seconds[field] / 3600:g}h): {hits} hits, {misses} misses ({hits / total:.0%} hit rate){age_text}.")
+        logger.info(f"Info cache holds {len(self._entries)} tickers ({self.path}).")
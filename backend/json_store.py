@@ -0,0 +1,46 @@
+import json
+import os
+import threading
+
+
+class JsonFileStore:
+    """
+    Base of the on-disk JSON caches (InfoCache, AnalysisCache, QueryPlanStore).
+
+    The whole file is loaded once per run into self._entries, updated in memory under
+    self._lock and written back with save(). Subclasses keep their own key and TTL logic
+    and can drop entries before each save by overriding _prune().
+    """
+    label = "JSON store" # Named in the warning for an unreadable file
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Loads the file if it exists. A missing or corrupt file starts an empty store."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except FileNotFoundError:
+            self._entries = {}
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Warning: Could not read {self.label} {self.path}, starting empty: {e}")
+            self._entries = {}
+        return self
+
+    def save(self):
+        """Writes the store atomically (temp file + rename) so a crash never leaves a truncated file."""
+        store_dir = os.path.dirname(self.path)
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            self._prune()
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+
+    def _prune(self):
+        """Called under the lock before each save; drops nothing by default."""
@@ -0,0 +1,105 @@
+"""
+Local fast-path sentiment tier: VADER lexicon scores of search snippets, computed
+in-process in milliseconds.
+
+Used when a ticker's Gemini analysis fails (API errors, throttling, open circuit) and
+for tickers left out by ANALYSIS_DAILY_BUDGET whose analysis expired. Analyses built
+here are tagged with source 'vader' (news_articles.sentiment_source) so the scorer can
+weight them with SENTIMENT_SOURCE_WEIGHTS.
+"""
+from datetime import datetime, timedelta
+try:
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+except ImportError: # Optional: without vaderSentiment the local tier is disabled
+    SentimentIntensityAnalyzer = None
+import config # Import the config file
+
+SOURCE = 'vader' # news_articles.sentiment_source of analyses built here
+MAX_SNIPPETS_PER_TICKER = 10 # Most recent stored results scored per ticker
+POINT_THRESHOLD = 0.05 # |compound| a snippet needs to count as a bullish/bearish point (VADER's usual cut-off)
+
+_analyzer = None
+
+
+def available():
+    """True when vaderSentiment is installed."""
+    return SentimentIntensityAnalyzer is not None
+
+def _get_analyzer():
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = SentimentIntensityAnalyzer() # Loads the lexicon once
+    return _analyzer
+
+def result_text(result):
+    """Title and snippet of one search result as a single text."""
+    return ". ".join(part for part in (result.get('title'), result.get('snippet')) if part)
+
+def score_texts(texts):
+    """VADER compound scores (-1.0 to +1.0) for a batch of texts."""
+    analyzer = _get_analyzer()
+    return [analyzer.polarity_scores(text)['compound'] for text in texts]
+
+def build_analysis(search_results, scores, reason):
+    """Analysis dict in gemini_analyzer's format from per-result scores."""
+    ranked = sorted(zip(scores, search_results), key=lambda item: item[0])
+    bullish = list(dict.fromkeys(result.get('title') or result_text(result) for score, result in reversed(ranked) if score >= POINT_THRESHOLD))[:2]
+    bearish = list(dict.fromkeys(result.get('title') or result_text(result) for score, result in ranked if score <= -POINT_THRESHOLD))[:2]
+    return {
+        "summary": f"Local lexicon sentiment from {len(scores)} search snippets ({reason}).",
+        "bullish_points": bullish,
+        "bearish_points": bearish,
+        "sentiment_score": round(sum(scores) / len(scores), 4),
+        "source": SOURCE,
+    }
+
+def analyze_results(ticker, search_results, reason="Gemini unavailable"):
+    """Local analysis of one ticker's search results, or None when there is nothing to score."""
+    return analyze_many({ticker: search_results}, reason).get(ticker)
+
+def analyze_many(results_by_ticker, reason):
+    """
+    Scores the search results of many tickers in one batch.
+
+    Returns:
+        dict: ticker -> analysis, for tickers with at least one non-empty result.
+    """
+    texts, owners = [], []
+    for ticker, results in results_by_ticker.items():
+        for result in results:
+            text = result_text(result)
+            if text:
+                texts.append(text)
+                owners.append((ticker, result))
+    scores = score_texts(texts) if texts else []
+    scored = {}
+    for (ticker, result), score in zip(owners, scores):
+        scored.setdefault(ticker, ([], []))
+        scored[ticker][0].append(result)
+        scored[ticker][1].append(score)
+    return {ticker: build_analysis(results, ticker_scores, reason) for ticker, (results, ticker_scores) in scored.items()}
+
+def load_recent_snippets(conn, tickers, days=None):
+    """
+    Returns {ticker: [search result dicts]} of the results stored for each ticker
+    (search_store tables) within the last `days` days, newest first.
+    """
+    days = days or config.LOCAL_SENTIMENT_LOOKBACK_DAYS
+    cutoff = (datetime.now() - timedelta(days=days)).isoformat(timespec='seconds')
+    wanted = set(tickers)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT l.ticker, r.title, r.snippet, r.url, r.page_age
+        FROM ticker_search_results AS l
+        JOIN search_results AS r ON r.url_hash = l.url_hash
+        WHERE l.last_seen >= ?
+        ORDER BY l.ticker, l.last_seen DESC
+    """, (cutoff,))
+    snippets = {}
+    for row in cursor.fetchall():
+        if row['ticker'] not in wanted:
+            continue
+        results = snippets.setdefault(row['ticker'], [])
+        if len(results) < MAX_SNIPPETS_PER_TICKER:
+            results.append({'title': row['title'], 'snippet': row['snippet'], 'url': row['url'], 'date': row['page_age']})
+    return snippets
@@ -54,3 +54,11 @@ def setup_logger(logger_name, log_file, level=logging.INFO):
             return logging.getLogger(logger_name) # Return the logger even if file handler failed
 
     return logger
+
+def pipeline_logger(module_name):
+    """
+    Logger for a module the fetch pipeline drives (fetch_engine, async_analyzer,
+    prioritizer). It is a child of the 'data_fetcher' logger, so its messages go through
+    data_fetcher's handler into the fetcher log and follow that logger's level.
+    """
+    return logging.getLogger(f"data_fetcher.{module_name}")
@@ -0,0 +1,358 @@
+"""
+Versioned schema migrations for stocks.db.
+
+database.init_db() reads the schema_version table and, when it is behind LATEST_VERSION,
+applies the missing steps of MIGRATIONS in order, each in its own transaction together
+with its schema_version row. A current schema costs a single query.
+
+Steps are append-only: change the schema by adding a step with the next version number,
+never by editing one that may already have run.
+"""
+import sqlite3
+from datetime import datetime
+
+
+def _columns(cursor, table):
+    return {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+
+def _add_columns(cursor, table, columns):
+    """Adds the (name, type) columns that the table does not have yet."""
+    existing = _columns(cursor, table)
+    for name, column_type in columns:
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
+# Columns that init_db used to add with one ALTER TABLE probe each; databases created
+# before they were part of the CREATE TABLE statements may still lack them
+_INITIAL_ADDED_COLUMNS = {
+    'price_history': [('open_price', 'REAL')],
+    'news_articles': [
+        ('gemini_summary', 'TEXT'),
+        ('bullish_points', 'TEXT'),
+        ('bearish_points', 'TEXT'),
+        ('sentiment_source', 'TEXT'), # 'gemini', 'vader' (local tier) or 'none' (failed); NULL = 'gemini'
+    ],
+    'daily_scores': [
+        ('pe_ratio', 'REAL'),
+        ('dividend_yield', 'REAL'),
+        ('price_vs_ma50', 'TEXT'),
+        ('rsi', 'REAL'),
+        ('macd_signal', 'TEXT'),
+        ('bbands_signal', 'TEXT'),
+        ('debt_to_equity', 'REAL'),
+        ('next_day_open_price', 'REAL'),
+        ('next_day_perf_pct', 'REAL'),
+        ('pb_ratio', 'REAL'),
+        ('ps_ratio', 'REAL'),
+        ('price_vs_ma200', 'TEXT'),
+        ('atr_value', 'REAL'),
+    ],
+}
+
+
+def _initial_schema(cursor):
+    """
+    The schema as init_db built it before versioning. Every statement is idempotent, so
+    this step both creates a new database and adopts an existing unversioned one.
+    """
+    # Companies Table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS companies (
+            ticker TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            sector TEXT NOT NULL
+        )
+    ''')
+
+    # News Articles Table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS news_articles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticker TEXT NOT NULL,
+            url TEXT UNIQUE NOT NULL, -- URL might become less relevant if using Gemini summary
+            title TEXT NOT NULL, -- Title might become less relevant
+            snippet TEXT, -- Snippet might become less relevant
+            published_date TEXT NOT NULL, -- Date of original article if found, otherwise analysis date
+            fetched_date TEXT NOT NULL, -- Store as ISO 8601 string (Date of analysis)
+            sentiment_score REAL, -- Store Gemini sentiment score
+            gemini_summary TEXT, -- Store the summary generated by Gemini
+            bullish_points TEXT, -- Store JSON list of bullish points
+            bearish_points TEXT, -- Store JSON list of bearish points
+            FOREIGN KEY (ticker) REFERENCES companies (ticker)
+        )
+    ''')
+    # Index for faster lookups by ticker and date
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_news_ticker_date ON news_articles (ticker, published_date DESC);
+    ''')
+
+
+    # Search Results Table (Brave results, one row per normalized URL across all tickers and days)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS search_results (
+            url_hash TEXT PRIMARY KEY, -- SHA-256 of the normalized URL
+            url TEXT NOT NULL,
+            title TEXT,
+            snippet TEXT,
+            page_age TEXT, -- Brave's page_age, if given
+            first_seen TEXT NOT NULL, -- ISO 8601 timestamp of the first search that returned it
+            last_seen TEXT NOT NULL -- ISO 8601 timestamp of the latest search that returned it
+        )
+    ''')
+    # Which tickers' searches returned which results, and when a result was last part of a successful analysis
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ticker_search_results (
+            ticker TEXT NOT NULL,
+            url_hash TEXT NOT NULL,
+            first_seen TEXT NOT NULL,
+            last_seen TEXT NOT NULL,
+            analyzed_date TEXT, -- YYYY-MM-DD of the latest successful analysis that included it (NULL = never sent)
+            PRIMARY KEY (ticker, url_hash),
+            FOREIGN KEY (ticker) REFERENCES companies (ticker),
+            FOREIGN KEY (url_hash) REFERENCES search_results (url_hash)
+        )
+    ''')
+    # Recent Brave responses per query text, served from search_results within SEARCH_QUERY_TTL_HOURS
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS search_query_cache (
+            query TEXT PRIMARY KEY,
+            url_hashes TEXT NOT NULL, -- JSON list of search_results.url_hash in Brave's order
+            fetched_at TEXT NOT NULL -- ISO 8601 timestamp of the Brave request
+        )
+    ''')
+
+    # Pipeline Runs Table (checkpoints of the nightly fetch, see run_state.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pipeline_runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            trading_date TEXT NOT NULL, -- YYYY-MM-DD the run fetches data for; --resume continues the latest run of the same date
+            stage TEXT NOT NULL, -- 'companies', 'prices', 'analysis', 'retry' or 'finished'
+            status TEXT NOT NULL, -- 'running', 'completed' or 'failed'
+            tickers TEXT, -- JSON list of the tickers chosen by update_company_list
+            selection TEXT, -- JSON {"selected": [...], "over_budget": [...]} from the prioritizer
+            started_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_pipeline_runs_date ON pipeline_runs (trading_date, run_id DESC);
+    ''')
+    # Per-ticker completion status of each pipeline stage
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pipeline_ticker_status (
+            run_id INTEGER NOT NULL,
+            stage TEXT NOT NULL, -- 'prices', 'analysis' or 'local' (over-budget lexicon sentiment)
+            ticker TEXT NOT NULL,
+            status TEXT NOT NULL, -- 'done', 'failed' or 'fallback' (local sentiment after a Gemini failure)
+            attempts INTEGER NOT NULL,
+            error TEXT,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (run_id, stage, ticker),
+            FOREIGN KEY (run_id) REFERENCES pipeline_runs (run_id)
+        )
+    ''')
+
+    # Price History Table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS price_history (
+            ticker TEXT NOT NULL,
+            date TEXT NOT NULL, -- Store as YYYY-MM-DD
+            open_price REAL, -- Added Open Price
+            close_price REAL NOT NULL,
+            volume INTEGER,
+            PRIMARY KEY (ticker, date),
+            FOREIGN KEY (ticker) REFERENCES companies (ticker)
+        )
+    ''')
+
+    # Daily Scores Table (to store the calculated score for highlighting)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_scores (
+            ticker TEXT NOT NULL,
+            date TEXT NOT NULL, -- Store as YYYY-MM-DD
+            score REAL NOT NULL,
+            price_change_pct REAL,
+            volume_ratio REAL,
+            avg_sentiment REAL, -- Holds Gemini sentiment score
+            pe_ratio REAL, -- Add P/E ratio
+            dividend_yield REAL, -- Add Dividend Yield
+            price_vs_ma50 TEXT, -- Add MA comparison ('above', 'below', 'N/A')
+            rsi REAL, -- Add RSI value
+            macd_signal TEXT, -- Add MACD signal ('bullish_cross', 'bearish_cross', 'neutral')
+            bbands_signal TEXT, -- Add Bollinger Bands signal ('cross_lower', 'cross_upper', 'neutral')
+            debt_to_equity REAL, -- Add Debt-to-Equity ratio
+            next_day_open_price REAL, -- Store next day's open price for comparison
+            next_day_perf_pct REAL, -- Store performance (Close[D] -> Open[D+1]) %
+            pb_ratio REAL, -- Add Price-to-Book ratio
+            ps_ratio REAL, -- Add Price-to-Sales ratio
+            price_vs_ma200 TEXT, -- Add MA200 comparison ('above', 'below', 'N/A')
+            atr_value REAL, -- Add ATR value
+            PRIMARY KEY (ticker, date),
+            FOREIGN KEY (ticker) REFERENCES companies (ticker)
+        )
+    ''')
+    # Index for faster lookups by date and score
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_scores_date_score ON daily_scores (date DESC, score DESC);
+    ''')
+
+    # Portfolio Table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS portfolio (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticker TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            purchase_price REAL NOT NULL,
+            purchase_date TEXT NOT NULL, -- Store as YYYY-MM-DD
+            FOREIGN KEY (ticker) REFERENCES companies (ticker)
+        )
+    ''')
+
+    # Fundamentals Snapshot Table (ratios from yfinance .info, captured by the fetch stage)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fundamentals_snapshot (
+            ticker TEXT NOT NULL,
+            as_of_date TEXT NOT NULL, -- Date the .info data was fetched (YYYY-MM-DD)
+            pe_ratio REAL, -- Trailing P/E
+            dividend_yield REAL,
+            debt_to_equity REAL, -- Normalized to a ratio (yfinance often reports it as %)
+            pb_ratio REAL, -- Price-to-Book
+            ps_ratio REAL, -- Price-to-Sales (trailing 12 months)
+            PRIMARY KEY (ticker, as_of_date),
+            FOREIGN KEY (ticker) REFERENCES companies (ticker)
+        )
+    ''')
+
+    # Performance Analysis Table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS performance_analysis (
+            analysis_date TEXT NOT NULL, -- Date the analysis was run (YYYY-MM-DD)
+            score_bucket TEXT NOT NULL, -- e.g., "Score >= 4"
+            avg_next_day_perf REAL, -- Average next_day_perf_pct for this bucket
+            count INTEGER NOT NULL, -- Number of data points in this bucket for the analyzed period
+            PRIMARY KEY (analysis_date, score_bucket)
+        )
+    ''')
+
+    for table, columns in _INITIAL_ADDED_COLUMNS.items():
+        _add_columns(cursor, table, columns)
+
+def _price_high_low(cursor):
+    """Daily high and low, which the scorers read for ATR (filled by the fetch from now on)."""
+    _add_columns(cursor, 'price_history', [('high_price', 'REAL'), ('low_price', 'REAL')])
+
+def _ticker_latest(cursor):
+    """Per-ticker snapshot of the newest price bar, score and analysis, filled from the history tables."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ticker_latest (
+            ticker TEXT PRIMARY KEY,
+            price_date TEXT, -- Date of the newest price_history bar
+            open_price REAL,
+            high_price REAL,
+            low_price REAL,
+            close_price REAL,
+            volume INTEGER,
+            score_date TEXT, -- Date of the newest daily_scores row; the factor values below are from it
+            score REAL,
+            price_change_pct REAL,
+            volume_ratio REAL,
+            avg_sentiment REAL,
+            pe_ratio REAL,
+            dividend_yield REAL,
+            price_vs_ma50 TEXT,
+            rsi REAL,
+            macd_signal TEXT,
+            bbands_signal TEXT,
+            debt_to_equity REAL,
+            pb_ratio REAL,
+            ps_ratio REAL,
+            price_vs_ma200 TEXT,
+            atr_value REAL,
+            analysis_id INTEGER, -- news_articles.id of the newest analysis
+            analysis_date TEXT, -- Its published_date
+            FOREIGN KEY (ticker) REFERENCES companies (ticker)
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_ticker_latest_score ON ticker_latest (score_date, score DESC);
+    ''')
+    cursor.execute('''
+        INSERT OR REPLACE INTO ticker_latest
+        SELECT t.ticker,
+               ph.date, ph.open_price, ph.high_price, ph.low_price, ph.close_price, ph.volume,
+               ds.date, ds.score, ds.price_change_pct, ds.volume_ratio, ds.avg_sentiment, ds.pe_ratio, ds.dividend_yield,
+               ds.price_vs_ma50, ds.rsi, ds.macd_signal, ds.bbands_signal, ds.debt_to_equity, ds.pb_ratio, ds.ps_ratio,
+               ds.price_vs_ma200, ds.atr_value,
+               na.id, na.published_date
+        FROM (SELECT ticker FROM price_history GROUP BY ticker
+              UNION SELECT ticker FROM daily_scores GROUP BY ticker
+              UNION SELECT ticker FROM news_articles GROUP BY ticker) AS t
+        LEFT JOIN price_history ph ON ph.ticker = t.ticker
+            AND ph.date = (SELECT MAX(date) FROM price_history WHERE ticker = t.ticker)
+        LEFT JOIN daily_scores ds ON ds.ticker = t.ticker
+            AND ds.date = (SELECT MAX(date) FROM daily_scores WHERE ticker = t.ticker)
+        LEFT JOIN news_articles na ON na.id = (
+            SELECT id FROM news_articles WHERE ticker = t.ticker
+            ORDER BY published_date DESC, fetched_date DESC, id DESC LIMIT 1)
+    ''')
+
+
+# (version, description, step) in the order they are applied
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "price_history high_price/low_price", _price_high_low),
+    (3, "ticker_latest snapshot table", _ticker_latest),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    """Schema version of the database (0 = unversioned or empty)."""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError as e:
+        if "no such table" in str(e):
+            return 0
+        raise
+    return row[0] or 0
+
+def migrate(conn):
+    """
+    Applies the migrations above the database's version.
+
+    Each step runs in a BEGIN IMMEDIATE transaction, so a concurrent process waits for
+    it and then finds the step already recorded; a failing step leaves the schema at
+    the previous version.
+
+    Returns:
+        tuple: (version after migrating, list of (version, description) applied now).
+    """
+    version = current_version(conn)
+    if version >= LATEST_VERSION:
+        return version, []
+    applied = []
+    cursor = conn.cursor()
+    for step_version, description, step in MIGRATIONS:
+        if step_version <= version:
+            continue
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TEXT NOT NULL -- ISO 8601 timestamp
+                )
+            """)
+            if current_version(conn) >= step_version: # Applied by another process meanwhile
+                conn.commit()
+                continue
+            step(cursor)
+            cursor.execute("INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                           (step_version, description, datetime.now().isoformat(timespec='seconds')))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append((step_version, description))
+    return max(version, LATEST_VERSION), applied
@@ -0,0 +1,577 @@
+"""
+Vectorized cross-sectional scoring engine.
+
+Loads every ticker's price history for the scored dates with one query into
+(observations x tickers) NumPy arrays, computes each indicator series once for the
+whole universe, and applies the point thresholds with vectorized selects. Produces the
+same rows as scorer.calculate_scores_per_ticker.
+
+Layout: each column holds one ticker's own rows in date order (left-aligned, padded with
+NaN at the end), so indicators are computed over the ticker's own sequence exactly like
+the per-ticker path. Scoring a date D then looks up, per ticker, the position of its last
+row on or before D and how many rows fall in D's SCORING_LOOKBACK_DAYS window; the
+window size decides which factors are available, as in the per-ticker path.
+
+A single date loads exactly that window. A date range (backfill) loads the rows of the
+first date's window through the last date once, then cuts every date's own window out of
+them and computes the indicators on all windows of a chunk at once (one column per date
+and ticker). The recursive indicators (RSI, MACD, ATR) therefore start from the same row
+as in a single-date run, and a backfilled row equals the row the nightly run writes.
+"""
+import sqlite3
+from datetime import datetime, timedelta
+import time
+import numpy as np
+import pandas as pd
+import database # To use get_db_connection
+import config # Import the config file
+import indicators # NumPy indicator kernels
+import price_archive # Columnar price panels (PRICE_PANEL_SOURCE = 'archive')
+from log_setup import setup_logger # Import logger setup
+
+# --- Logger ---
+logger = setup_logger('scorer', config.LOG_FILE_SCORER)
+# -------------
+
+PRICE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+BACKFILL_CHUNK_DATES = 60 # Dates scored (and upserted) per step of a range backfill, bounds memory
+BACKFILL_WINDOW_CELLS = 4_000_000 # Max rows x columns of the per-date windows computed at once (32 MB per array)
+_NO_DATE = np.iinfo(np.int64).max # Day number used for padding rows (sorts after every real date)
+
+
+class PriceSeries:
+    """Left-aligned per-ticker price arrays (see module docstring)."""
+
+    def __init__(self, tickers, fields, days, counts):
+        self.tickers = tickers # list of ticker symbols (column order)
+        self.fields = fields # dict of field name -> (rows, n_tickers) float64 array
+        self.days = days # (rows, n_tickers) int64 day numbers of each row (_NO_DATE for padding)
+        self.counts = counts # rows per ticker
+
+
+def _day_number(date_str):
+    return np.datetime64(date_str, 'D').astype(np.int64)
+
+def _shift_date(date_str, days):
+    return (datetime.strptime(date_str, '%Y-%m-%d').date() + timedelta(days=days)).strftime('%Y-%m-%d')
+
+
+def load_price_series(conn, tickers, first_date_str, last_date_str):
+    """
+    Loads the price rows needed to score every date from first_date_str to last_date_str
+    with a single query: SCORING_LOOKBACK_DAYS before the first date for the indicators,
+    plus NEXT_DAY_LOOKAHEAD_DAYS after the last date for the next open.
+
+    With PRICE_PANEL_SOURCE = 'archive' the rows come from the columnar archive instead,
+    unless it is missing or older than the stored prices the window needs.
+    """
+    start = _shift_date(first_date_str, -config.SCORING_LOOKBACK_DAYS)
+    end = _shift_date(last_date_str, config.NEXT_DAY_LOOKAHEAD_DAYS)
+
+    if config.PRICE_PANEL_SOURCE == 'archive':
+        series = _load_price_series_from_archive(conn, tickers, start, end)
+        if series is not None:
+            return series
+
+    cursor = conn.cursor()
+    cursor.row_factory = None # Plain tuples load much faster than sqlite3.Row
+    cursor.execute("""
+        SELECT ticker, date, open_price, high_price, low_price, close_price, volume
+        FROM price_history
+        WHERE date >= ? AND date <= ?
+        ORDER BY ticker, date
+    """, (start, end))
+    df = pd.DataFrame(cursor.fetchall(), columns=['ticker', 'date', 'open', 'high', 'low', 'close', 'volume'])
+
+    n_tickers = len(tickers)
+    ticker_index = {ticker: i for i, ticker in enumerate(tickers)}
+    df['col'] = df['ticker'].map(ticker_index)
+    df = df[df['col'].notna()]
+    col = df['col'].to_numpy(dtype=np.int64)
+    counts = np.bincount(col, minlength=n_tickers)
+    width = max(int(counts.max()) if n_tickers else 0, 1)
+    row = df.groupby('col').cumcount().to_numpy() # Position within the ticker's own rows
+
+    fields = {}
+    for field in PRICE_FIELDS:
+        arr = np.full((width, n_tickers), np.nan)
+        arr[row, col] = df[field].to_numpy(dtype=float)
+        fields[field] = arr
+    days = np.full((width, n_tickers), _NO_DATE, dtype=np.int64)
+    days[row, col] = pd.to_datetime(df['date']).to_numpy().astype('datetime64[D]').astype(np.int64)
+    return PriceSeries(list(tickers), fields, days, counts)
+
+def _load_price_series_from_archive(conn, tickers, start, end):
+    """load_price_series from price_archive panels; None when the archive cannot serve the window."""
+    manifest = price_archive.read_manifest()
+    latest_stored = conn.execute("SELECT MAX(price_date) FROM ticker_latest").fetchone()[0]
+    needed = min(end, latest_stored) if latest_stored else end
+    if manifest is None or manifest['last_date'] is None or manifest['last_date'] < needed:
+        logger.warning(f"Price archive ends {manifest['last_date'] if manifest else 'nowhere'} but prices up to {needed} are needed; loading from SQLite.")
+        return None
+    panel = price_archive.load_panel(start, end, tickers=tickers)
+
+    # Left-align each ticker's bars (rows with a close) as in the SQLite path
+    present = ~np.isnan(panel.fields['close'])
+    counts = present.sum(axis=0)
+    width = max(int(counts.max()) if len(tickers) else 0, 1)
+    col, date_pos = np.nonzero(present.T) # Ticker-major, dates ascending within each ticker
+    row = np.arange(len(col)) - np.repeat(np.cumsum(counts) - counts, counts)
+    fields = {}
+    for field in PRICE_FIELDS:
+        arr = np.full((width, len(tickers)), np.nan)
+        arr[row, col] = panel.fields[field][date_pos, col]
+        fields[field] = arr
+    days = np.full((width, len(tickers)), _NO_DATE, dtype=np.int64)
+    days[row, col] = panel.dates.astype(np.int64)[date_pos]
+    return PriceSeries(list(tickers), fields, days, counts)
+
+
+def compute_indicator_series(series):
+    """Computes every indicator series once for all tickers (full length of the loaded rows)."""
+    return {**_rolling_indicators(series), **_recursive_indicators(series)}
+
+def _rolling_indicators(series):
+    """
+    Indicators over a fixed number of trailing rows (SMAs, Bollinger Bands). Where a date's
+    window holds enough rows for the factor, they do not depend on where the rows start.
+    """
+    close = series.fields['close']
+    lower, _, upper = indicators.bbands(close, config.BBANDS_PERIOD, config.BBANDS_STDDEV)
+    return {
+        'sma50': indicators.sma(close, config.MA_PERIOD),
+        'sma200': indicators.sma(close, config.MA200_PERIOD),
+        'bb_lower': lower,
+        'bb_upper': upper,
+    }
+
+def _recursive_indicators(series):
+    """Indicators that depend on every row since the start of the loaded rows (RSI, MACD, ATR, volume sums)."""
+    close = series.fields['close']
+    volume = series.fields['volume']
+    macd_line, signal_line, _ = indicators.macd(close, config.MACD_FAST, config.MACD_SLOW, config.MACD_SIGNAL)
+    # Running NaN-skipping volume sums/counts (exact for integer volumes) give any trailing average by subtraction
+    zero_row = np.zeros((1, volume.shape[1]))
+    return {
+        'rsi': indicators.rsi(close, config.RSI_PERIOD),
+        'macd': macd_line,
+        'macd_signal': signal_line,
+        'atr': indicators.atr(series.fields['high'], series.fields['low'], close, config.ATR_PERIOD),
+        'volume_sum': np.vstack([zero_row, np.nancumsum(volume, axis=0)]),
+        'volume_count': np.vstack([zero_row, np.cumsum(~np.isnan(volume), axis=0)]),
+    }
+
+
+def locate_dates(series, date_strs):
+    """
+    Finds, for every (date, ticker), the ticker's last row on or before the date and the
+    number of its rows inside the date's SCORING_LOOKBACK_DAYS window.
+
+    Returns:
+        tuple: (pos, n_obs) int arrays of shape (n_dates, n_tickers); pos is -1 if none.
+    """
+    targets = np.array([_day_number(d) for d in date_strs], dtype=np.int64)
+    window_starts = targets - config.SCORING_LOOKBACK_DAYS
+    n_tickers = len(series.tickers)
+    pos = np.empty((len(targets), n_tickers), dtype=np.int64)
+    first = np.empty((len(targets), n_tickers), dtype=np.int64)
+    for j in range(n_tickers):
+        days = series.days[:series.counts[j], j]
+        pos[:, j] = np.searchsorted(days, targets, side='right') - 1
+        first[:, j] = np.searchsorted(days, window_starts, side='left')
+    return pos, np.maximum(pos - first + 1, 0)
+
+
+def window_series(series, pos, n):
+    """
+    Cuts each (date, ticker)'s own SCORING_LOOKBACK_DAYS window, plus the next row for
+    the next open, out of series (pos, n from locate_dates).
+
+    Returns:
+        tuple: (PriceSeries with one column per date and ticker, date-major, and each
+        column's row of the date or -1).
+    """
+    n_dates, n_tickers = pos.shape
+    first = (pos - n + 1).ravel() # First row of each window in series
+    col = np.tile(np.arange(n_tickers), n_dates)
+    width = int(n.max()) + 1 if n.size else 1
+    src = first[None, :] + np.arange(width)[:, None]
+    inside = src < series.counts[col][None, :]
+    src = np.minimum(src, series.fields['close'].shape[0] - 1)
+
+    def gather(arr, fill=np.nan):
+        return np.where(inside, arr[src, col], fill)
+
+    fields = {field: gather(series.fields[field]) for field in PRICE_FIELDS}
+    windows = PriceSeries(list(series.tickers) * n_dates, fields, gather(series.days, _NO_DATE), inside.sum(axis=0))
+    return windows, np.where(n > 0, n - 1, -1).ravel()
+
+
+def compute_factor_values(series, ind, date_strs):
+    """
+    Looks up the raw value of every technical factor for each date.
+
+    Returns:
+        dict of name -> (n_dates, n_tickers) array. Availability follows the per-ticker
+        path: NaN where a factor could not be computed. ma50/ma200 are sign(price - SMA);
+        macd_cross/bbands_cross are +1 (bullish / lower-band cross), -1, 0 or NaN.
+    """
+    pos, n = locate_dates(series, date_strs)
+    targets = np.array([_day_number(d) for d in date_strs], dtype=np.int64)[:, None]
+    return _factor_values(series, ind, pos, n, targets)
+
+def compute_window_factor_values(series, rolling, date_strs):
+    """
+    compute_factor_values with the recursive indicators of every date computed over that
+    date's own window only (see window_series), as a single-date run computes them.
+
+    Args:
+        rolling (dict): _rolling_indicators(series), computed once for the whole range;
+            they are looked up only where the date's window holds their full length.
+    """
+    pos, n = locate_dates(series, date_strs)
+    windows, window_pos = window_series(series, pos, n)
+    ind = _recursive_indicators(windows)
+    # Only the date's row and the one before are read from the rolling indicators
+    full_pos = pos.ravel()
+    cols = np.arange(full_pos.size)
+    for name, values in rolling.items():
+        ind[name] = np.full(windows.fields['close'].shape, np.nan)
+        for offset in (0, -1):
+            valid = window_pos + offset >= 0
+            ind[name][window_pos[valid] + offset, cols[valid]] = values[full_pos[valid] + offset, cols[valid] % len(series.tickers)]
+    targets = np.repeat(np.array([_day_number(d) for d in date_strs], dtype=np.int64), len(series.tickers))
+    factors = _factor_values(windows, ind, window_pos[None, :], n.reshape(1, -1), targets[None, :])
+    return {name: values.reshape(pos.shape) for name, values in factors.items()}
+
+def _factor_values(series, ind, pos, n, targets):
+    """
+    compute_factor_values for explicit lookups: pos/n (shaped like the result) are the
+    row of the scored date in each column and the rows in its window, targets its day number.
+    """
+    rows = series.fields['close'].shape[0]
+    cols = np.arange(len(series.tickers))[None, :]
+
+    def at(arr, offset=0):
+        """arr at each ticker's row pos + offset (NaN outside the loaded rows)."""
+        p = pos + offset
+        values = arr[np.clip(p, 0, arr.shape[0] - 1), cols]
+        return np.where((p >= 0) & (p < rows), values, np.nan)
+
+    close = series.fields['close']
+    last_close = at(close)
+    has_tech = n >= config.PRICE_MOMENTUM_DAYS
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Price Momentum (needs the close PRICE_MOMENTUM_DAYS rows back inside the window)
+        price_start = at(close, -config.PRICE_MOMENTUM_DAYS)
+        momentum = np.where(has_tech & (n > config.PRICE_MOMENTUM_DAYS) & (price_start != 0),
+                            (last_close - price_start) / price_start * 100, np.nan)
+
+        # Volume Ratio (average of the VOLUME_AVG_DAYS rows before the latest day)
+        safe_pos = np.maximum(pos, 0)
+        lagged = np.maximum(pos - config.VOLUME_AVG_DAYS, 0)
+        volume_sum = ind['volume_sum'][safe_pos, cols] - ind['volume_sum'][lagged, cols]
+        volume_count = ind['volume_count'][safe_pos, cols] - ind['volume_count'][lagged, cols]
+        avg_volume = np.where(volume_count > 0, volume_sum / volume_count, np.nan)
+        volume_ratio = np.where(has_tech & (n >= config.VOLUME_AVG_DAYS + 1) & (avg_volume > 0),
+                                at(series.fields['volume']) / avg_volume, np.nan)
+
+        # Price vs. 50/200-day SMA
+        ma50 = np.where(has_tech & (n >= config.MA_PERIOD), np.sign(last_close - at(ind['sma50'])), np.nan)
+        ma200 = np.where(has_tech & (n >= config.MA200_PERIOD), np.sign(last_close - at(ind['sma200'])), np.nan)
+
+        # RSI
+        rsi = np.where(has_tech & (n >= config.RSI_PERIOD + 1), at(ind['rsi']), np.nan)
+
+        # MACD crossover (needs the last two MACD/signal values)
+        m_now, s_now, m_prev, s_prev = at(ind['macd']), at(ind['macd_signal']), at(ind['macd'], -1), at(ind['macd_signal'], -1)
+        valid = ~(np.isnan(m_now) | np.isnan(s_now) | np.isnan(m_prev) | np.isnan(s_prev))
+        cross = np.where((m_prev < s_prev) & (m_now > s_now), 1.0, np.where((m_prev > s_prev) & (m_now < s_now), -1.0, 0.0))
+        macd_cross = np.where(has_tech & (n >= config.MACD_SLOW + config.MACD_SIGNAL) & valid, cross, np.nan)
+
+        # Bollinger Bands crossover (the previous bands need a full window inside the date's window too)
+        lower_now, upper_now, lower_prev, upper_prev = at(ind['bb_lower']), at(ind['bb_upper']), at(ind['bb_lower'], -1), at(ind['bb_upper'], -1)
+        p_now, p_prev = last_close, at(close, -1)
+        valid = ~(np.isnan(p_now) | np.isnan(lower_now) | np.isnan(p_prev) | np.isnan(lower_prev) | np.isnan(upper_now) | np.isnan(upper_prev))
+        cross = np.where((p_prev > lower_prev) & (p_now < lower_now), 1.0, np.where((p_prev < upper_prev) & (p_now > upper_now), -1.0, 0.0))
+        bbands_cross = np.where(has_tech & (n >= config.BBANDS_PERIOD + 1) & valid, cross, np.nan)
+
+        # ATR
+        atr = np.where(has_tech & (n >= config.ATR_PERIOD + 1), at(ind['atr']), np.nan)
+
+        # Next Day Performance (Close[D] -> Open[D+1]), only computed when technicals are
+        next_days = series.days[np.clip(pos + 1, 0, rows - 1), cols]
+        has_next = has_tech & (pos + 1 < series.counts[None, :]) & (next_days <= targets + config.NEXT_DAY_LOOKAHEAD_DAYS)
+        next_open = np.where(has_next, at(series.fields['open'], 1), np.nan)
+        next_perf = np.where((last_close > 0) & (next_open != 0), (next_open - last_close) / last_close * 100, np.nan)
+
+    return {
+        'has_tech': has_tech,
+        'momentum': momentum,
+        'volume_ratio': volume_ratio,
+        'ma50': ma50,
+        'ma200': ma200,
+        'rsi': rsi,
+        'macd_cross': macd_cross,
+        'bbands_cross': bbands_cross,
+        'atr': atr,
+        'next_open': next_open,
+        'next_perf': next_perf,
+    }
+
+
+def score_factors(factors):
+    """
+    Applies the config point thresholds and weights with vectorized selects.
+
+    Args:
+        factors (dict): Arrays (any common shape) for 'sentiment', 'momentum',
+            'volume_ratio', 'ma50', 'ma200', 'rsi', 'macd_cross', 'bbands_cross', 'atr',
+            'pe_ratio', 'dividend_yield', 'debt_to_equity', 'pb_ratio', 'ps_ratio'
+            (NaN = unavailable), plus optional 'sentiment_weight' (SENTIMENT_SOURCE_WEIGHTS
+            multiplier, default 1.0).
+
+    Returns:
+        ndarray: Weighted total score, summed in the same order as the per-ticker path.
+    """
+    c = config
+    f = factors
+    with np.errstate(invalid='ignore'):
+        rsi = f['rsi']
+        rsi_pts = np.select(
+            [np.isnan(rsi), rsi < c.RSI_VERY_OVERSOLD_THRESHOLD, rsi < c.RSI_OVERSOLD_THRESHOLD,
+             rsi > c.RSI_VERY_OVERBOUGHT_THRESHOLD, rsi > c.RSI_OVERBOUGHT_THRESHOLD],
+            [0, c.RSI_VERY_OVERSOLD_PTS, c.RSI_OVERSOLD_PTS, c.RSI_VERY_OVERBOUGHT_PTS, c.RSI_OVERBOUGHT_PTS],
+            default=c.RSI_NEUTRAL_PTS)
+        weighted_points = [
+            (np.select([f['sentiment'] > 0.15, f['sentiment'] < -0.15], [c.SENTIMENT_POSITIVE_PTS, c.SENTIMENT_NEGATIVE_PTS], default=c.SENTIMENT_NEUTRAL_PTS), c.WEIGHT_SENTIMENT * f.get('sentiment_weight', 1.0)),
+            (np.select([f['momentum'] > c.PRICE_MOMENTUM_THRESHOLD_PCT, f['momentum'] < 0], [c.PRICE_POSITIVE_PTS, c.PRICE_NEGATIVE_PTS], default=c.PRICE_NEUTRAL_PTS), c.WEIGHT_MOMENTUM),
+            (np.where(f['volume_ratio'] > c.VOLUME_RATIO_THRESHOLD, c.VOLUME_HIGH_PTS, c.VOLUME_NORMAL_PTS), c.WEIGHT_VOLUME),
+            (np.select([f['ma50'] > 0, f['ma50'] < 0], [c.MA_PRICE_ABOVE_PTS, c.MA_PRICE_BELOW_PTS], default=0), c.WEIGHT_MA50),
+            (np.select([f['ma200'] > 0, f['ma200'] < 0], [c.MA200_PRICE_ABOVE_PTS, c.MA200_PRICE_BELOW_PTS], default=0), c.WEIGHT_MA200),
+            (rsi_pts, c.WEIGHT_RSI),
+            (np.select([f['macd_cross'] == 1, f['macd_cross'] == -1], [c.MACD_CROSS_BULLISH_PTS, c.MACD_CROSS_BEARISH_PTS], default=0), c.WEIGHT_MACD),
+            (np.select([f['bbands_cross'] == 1, f['bbands_cross'] == -1], [c.BBANDS_LOWER_CROSS_PTS, c.BBANDS_UPPER_CROSS_PTS], default=0), c.WEIGHT_BBANDS),
+            (np.select([f['atr'] < c.ATR_LOW_THRESHOLD, f['atr'] > c.ATR_HIGH_THRESHOLD], [c.ATR_LOW_PTS, c.ATR_HIGH_PTS], default=0), c.WEIGHT_ATR),
+            (np.select([(f['pe_ratio'] < c.PE_LOW_THRESHOLD) & (f['pe_ratio'] > 0), f['pe_ratio'] > c.PE_HIGH_THRESHOLD], [c.PE_LOW_PTS, c.PE_HIGH_PTS], default=c.PE_NEUTRAL_PTS_PE), c.WEIGHT_PE_RATIO),
+            (np.where(f['dividend_yield'] > c.DIV_YIELD_THRESHOLD, c.DIV_YIELD_PTS, 0), c.WEIGHT_DIVIDEND),
+            (np.select([(f['debt_to_equity'] < c.DE_RATIO_LOW_THRESHOLD) & (f['debt_to_equity'] >= 0), f['debt_to_equity'] > c.DE_RATIO_HIGH_THRESHOLD], [c.DE_RATIO_LOW_PTS, c.DE_RATIO_HIGH_PTS], default=0), c.WEIGHT_DE_RATIO),
+            (np.select([(f['pb_ratio'] < c.PB_RATIO_LOW_THRESHOLD) & (f['pb_ratio'] > 0), f['pb_ratio'] > c.PB_RATIO_HIGH_THRESHOLD], [c.PB_RATIO_LOW_PTS, c.PB_RATIO_HIGH_PTS], default=0), c.WEIGHT_PB_RATIO),
+            (np.select([(f['ps_ratio'] < c.PS_RATIO_LOW_THRESHOLD) & (f['ps_ratio'] > 0), f['ps_ratio'] > c.PS_RATIO_HIGH_THRESHOLD], [c.PS_RATIO_LOW_PTS, c.PS_RATIO_HIGH_PTS], default=0), c.WEIGHT_PS_RATIO),
+        ]
+    score = np.zeros(np.shape(f['sentiment']))
+    for pts, weight in weighted_points:
+        score = score + pts * weight
+    return score
+
+
+def _ma_status(sign):
+    return np.select([sign > 0, sign < 0], ['above', 'below'], default='N/A')
+
+def _cross_status(code, up_label, down_label):
+    return np.select([np.isnan(code), code == 1, code == -1], ['N/A', up_label, down_label], default='neutral')
+
+def _optional_list(values):
+    """Flattens an array to a list of Python floats with NaN -> None (for sqlite3)."""
+    values = np.asarray(values, dtype=float).ravel()
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+def load_sentiment(conn, tickers, date_strs):
+    """
+    Latest sentiment per (date, ticker) published within ANALYSIS_STALENESS_DAYS up to
+    each scored date (0.0 if none), from one query over the range.
+
+    Returns:
+        tuple: (values, weights) arrays of shape (n_dates, n_tickers); weights are the
+        SENTIMENT_SOURCE_WEIGHTS multipliers of the picked analyses (1.0 if none).
+    """
+    days = np.array(date_strs, dtype='datetime64[D]')
+    window_start = (days.min() - np.timedelta64(config.ANALYSIS_STALENESS_DAYS - 1, 'D')).astype(str)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT ticker, published_date, sentiment_score, sentiment_source
+        FROM news_articles
+        WHERE published_date >= ? AND published_date <= ?
+        ORDER BY fetched_date ASC
+    """, (window_start, max(date_strs)))
+    latest = {}
+    for row in cursor.fetchall():
+        source_weight = config.SENTIMENT_SOURCE_WEIGHTS.get(row['sentiment_source'] or 'gemini', 1.0) # NULL = legacy Gemini rows
+        latest.setdefault(row['ticker'], {})[row['published_date'][:10]] = (row['sentiment_score'], source_weight) # Later fetches overwrite earlier ones
+
+    values = np.zeros((len(date_strs), len(tickers)))
+    weights = np.ones((len(date_strs), len(tickers)))
+    for j, ticker in enumerate(tickers):
+        by_date = latest.get(ticker)
+        if not by_date:
+            continue
+        published = sorted(by_date)
+        scores = np.array([by_date[d][0] for d in published], dtype=float) # None -> nan
+        source_weights = np.array([by_date[d][1] for d in published], dtype=float)
+        published_days = np.array(published, dtype='datetime64[D]')
+        idx = np.searchsorted(published_days, days, side='right') - 1 # Latest analysis on or before each date
+        found = idx >= 0
+        age = np.where(found, (days - published_days[np.maximum(idx, 0)]).astype(int), config.ANALYSIS_STALENESS_DAYS)
+        in_window = found & (age < config.ANALYSIS_STALENESS_DAYS)
+        picked = np.where(in_window, scores[np.maximum(idx, 0)], np.nan)
+        values[:, j] = np.where(np.isnan(picked), 0.0, picked)
+        weights[:, j] = np.where(in_window, source_weights[np.maximum(idx, 0)], 1.0)
+    return values, weights
+
+def fundamentals_arrays(conn, tickers, date_strs):
+    """
+    Per-factor (n_dates, n_tickers) arrays following database.get_fundamentals_as_of
+    (NaN where missing). Ranges load the snapshot history once and pick each date's
+    snapshot with a binary search instead of running one query per date.
+    """
+    keys = ('pe_ratio', 'dividend_yield', 'debt_to_equity', 'pb_ratio', 'ps_ratio')
+    arrays = {key: np.full((len(date_strs), len(tickers)), np.nan) for key in keys}
+    if len(date_strs) == 1:
+        fundamentals = database.get_fundamentals_as_of(conn, date_strs[0])
+        for j, ticker in enumerate(tickers):
+            snapshot = fundamentals.get(ticker)
+            for key in keys:
+                if snapshot is not None and snapshot[key] is not None:
+                    arrays[key][0, j] = snapshot[key]
+        return arrays
+
+    ticker_index = {ticker: j for j, ticker in enumerate(tickers)}
+    history = [row for row in database.get_fundamentals_history(conn, max(date_strs)) if row['ticker'] in ticker_index]
+    if not history:
+        return arrays
+    # Rows arrive ordered by ticker, as_of_date; encode (ticker column, day) as one sortable key
+    cols = np.array([ticker_index[row['ticker']] for row in history], dtype=np.int64)
+    order = np.lexsort((np.array([row['as_of_date'] for row in history]), cols))
+    history = [history[i] for i in order]
+    cols = cols[order]
+    days = np.array([_day_number(row['as_of_date']) for row in history], dtype=np.int64)
+    targets = np.array([_day_number(d) for d in date_strs], dtype=np.int64)
+    span = int(max(days.max(), targets.max())) + 1
+    ticker_cols = np.arange(len(tickers))
+    block_start = np.searchsorted(cols, ticker_cols, side='left')
+    has_snapshot = block_start < np.searchsorted(cols, ticker_cols, side='right')
+    # Latest snapshot on or before each date, falling back to the ticker's earliest one
+    idx = np.searchsorted(cols * span + days, ticker_cols[None, :] * span + targets[:, None], side='right') - 1
+    idx = np.minimum(np.maximum(idx, block_start[None, :]), len(history) - 1)
+    for key in keys:
+        column = np.array([np.nan if row[key] is None else row[key] for row in history], dtype=float)
+        arrays[key] = np.where(has_snapshot[None, :], column[idx], np.nan)
+    return arrays
+
+
+def score_dates(conn, tickers, factors, date_strs):
+    """
+    Scores every ticker for each of the given dates from their technical factors
+    (compute_factor_values / compute_window_factor_values).
+
+    Returns:
+        list: daily_scores rows (see database.upsert_daily_scores), date-major.
+    """
+    factors['sentiment'], factors['sentiment_weight'] = load_sentiment(conn, tickers, date_strs)
+    factors.update(fundamentals_arrays(conn, tickers, date_strs))
+    score = score_factors(factors)
+
+    n_dates = len(date_strs)
+    columns = [
+        list(tickers) * n_dates,
+        [date for date in date_strs for _ in tickers],
+        score.ravel().tolist(),
+        _optional_list(factors['momentum']),
+        _optional_list(factors['volume_ratio']),
+        factors['sentiment'].ravel().tolist(),
+        _optional_list(factors['pe_ratio']),
+        _optional_list(factors['dividend_yield']),
+        _ma_status(factors['ma50']).ravel().tolist(),
+        _optional_list(factors['rsi']),
+        _cross_status(factors['macd_cross'], 'bullish_cross', 'bearish_cross').ravel().tolist(),
+        _cross_status(factors['bbands_cross'], 'cross_lower', 'cross_upper').ravel().tolist(),
+        _optional_list(factors['debt_to_equity']),
+        _optional_list(factors['pb_ratio']),
+        _optional_list(factors['ps_ratio']),
+        _ma_status(factors['ma200']).ravel().tolist(),
+        _optional_list(factors['atr']),
+        _optional_list(factors['next_open']),
+        _optional_list(factors['next_perf']),
+    ]
+    return list(zip(*columns))
+
+
+def _get_tickers(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT ticker FROM companies")
+    return [row['ticker'] for row in cursor.fetchall()]
+
+def calculate_scores_for_date(target_date_str):
+    """Panel-engine equivalent of scorer.calculate_scores_per_ticker."""
+    logger.info(f"Starting panel score calculation for date: {target_date_str}...")
+    start = time.perf_counter()
+    conn = database.get_db_connection()
+
+    # Get list of all tracked tickers
+    tickers = _get_tickers(conn)
+    if not tickers:
+        logger.warning("No companies found in the database to score.")
+        conn.close()
+        return
+
+    series = load_price_series(conn, tickers, target_date_str, target_date_str)
+    factors = compute_factor_values(series, compute_indicator_series(series), [target_date_str])
+    rows = score_dates(conn, tickers, factors, [target_date_str])
+    for row in rows:
+        logger.debug(f"Scored {row[0]} for {target_date_str}: Final Score={row[2]:.2f}")
+    try:
+        database.upsert_daily_scores(conn, rows)
+        logger.info(f"Successfully calculated and stored panel scores for {len(rows)} tickers in {time.perf_counter() - start:.2f}s.")
+    except Exception as e:
+        conn.rollback()
+        logger.exception(f"Error storing calculated scores: {e}") # Log traceback
+    conn.close()
+
+def calculate_scores_for_range(from_date_str, to_date_str):
+    """
+    Backfills daily_scores for every trading date (dates with stored prices) between
+    from_date_str and to_date_str inclusive, in a single pass over the price history.
+    """
+    logger.info(f"Starting score backfill from {from_date_str} to {to_date_str}...")
+    start = time.perf_counter()
+    conn = database.get_db_connection()
+
+    tickers = _get_tickers(conn)
+    if not tickers:
+        logger.warning("No companies found in the database to score.")
+        conn.close()
+        return
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT date FROM price_history WHERE date >= ? AND date <= ? ORDER BY date", (from_date_str, to_date_str))
+    dates = [row['date'] for row in cursor.fetchall()]
+    if not dates:
+        logger.warning(f"No price history between {from_date_str} and {to_date_str}; nothing to backfill.")
+        conn.close()
+        return
+
+    series = load_price_series(conn, tickers, dates[0], dates[-1])
+    _, n = locate_dates(series, dates)
+    window_rows = int(n.max()) + 1 if n.size else 1
+    chunk_dates = max(1, min(BACKFILL_CHUNK_DATES, BACKFILL_WINDOW_CELLS // (window_rows * len(tickers))))
+    rolling = _rolling_indicators(series)
+    logger.info(f"Loaded {int(series.counts.sum())} price rows for {len(tickers)} tickers in {time.perf_counter() - start:.2f}s; "
+                f"scoring {chunk_dates} dates per chunk.")
+
+    written = 0
+    for i in range(0, len(dates), chunk_dates):
+        chunk = dates[i:i + chunk_dates]
+        rows = score_dates(conn, tickers, compute_window_factor_values(series, rolling, chunk), chunk)
+        try:
+            database.upsert_daily_scores(conn, rows)
+        except Exception as e:
+            conn.rollback()
+            logger.exception(f"Error storing backfilled scores for {chunk[0]} to {chunk[-1]}: {e}")
+            conn.close()
+            return
+        written += len(rows)
+        logger.info(f"Backfilled {chunk[0]} to {chunk[-1]} ({i + len(chunk)}/{len(dates)} dates).")
+
+    logger.info(f"Backfill complete: {written} scores for {len(dates)} dates in {time.perf_counter() - start:.2f}s.")
+    conn.close()
@@ -0,0 +1,232 @@
+"""
+Columnar archive of price_history for analytics and backfills.
+
+Each field (open, high, low, close, volume) is one float64 .npy file of shape
+(dates x tickers) in Fortran order: every ticker's history is a contiguous column, and
+a dates x tickers panel is a plain memory-mapped view of the file. Missing bars are NaN.
+dates.npy holds the date index (datetime64[D]) and manifest.json the ticker order.
+
+sync() brings the archive up to date from SQLite: it re-reads the bars from
+PRICE_SYNC_OVERLAP_DAYS before the archive's last date (plus the full history of tickers
+it does not have yet) and writes a new generation directory. The CURRENT file is then
+switched to it atomically, so readers never see a half-written archive. The generation
+it replaced is kept until the next sync, so a reader that read CURRENT just before the
+switch can still open its files; older generations are removed.
+
+Run from the backend directory:
+
+    python3 price_archive.py sync [--full]
+    python3 price_archive.py info
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import config # Import the config file
+import database # Import database functions
+
+PRICE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+_COLUMNS = {'open': 'open_price', 'high': 'high_price', 'low': 'low_price', 'close': 'close_price', 'volume': 'volume'}
+CURRENT_FILE = "CURRENT"
+
+
+class PricePanel:
+    """
+    Dates x tickers price arrays from the archive. The arrays are read-only views of the
+    memory-mapped files unless a ticker selection forced a copy (see load_panel).
+    """
+
+    def __init__(self, dates, tickers, fields):
+        self.dates = dates # datetime64[D] array, ascending
+        self.tickers = tickers # list of ticker symbols (column order)
+        self.fields = fields # dict of field name -> (n_dates, n_tickers) float64 array
+
+    def frame(self, field):
+        """The field as a DataFrame (dates x tickers) sharing the panel's memory."""
+        return pd.DataFrame(self.fields[field], index=pd.DatetimeIndex(self.dates), columns=self.tickers, copy=False)
+
+
+def _archive_dir(archive_dir):
+    return archive_dir or config.PRICE_ARCHIVE_DIR
+
+def current_generation(archive_dir=None):
+    """Path of the archive generation readers should use, or None if nothing was synced yet."""
+    archive_dir = _archive_dir(archive_dir)
+    try:
+        with open(os.path.join(archive_dir, CURRENT_FILE)) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(archive_dir, name)
+
+def read_manifest(archive_dir=None):
+    """The current generation's manifest (tickers, date range, sync time), or None."""
+    generation = current_generation(archive_dir)
+    if generation is None:
+        return None
+    with open(os.path.join(generation, "manifest.json")) as f:
+        return json.load(f)
+
+def load_panel(first_date=None, last_date=None, tickers=None, fields=PRICE_FIELDS, archive_dir=None):
+    """
+    Loads a dates x tickers panel from the archive without going through SQLite.
+
+    The date range is a slice of the memory-mapped files, so with tickers=None (every
+    archived ticker, in archive order) no data is copied or read until it is used. A
+    ticker list selects and orders the columns, which copies them; tickers missing from
+    the archive get all-NaN columns.
+
+    Args:
+        first_date, last_date (str): Inclusive YYYY-MM-DD bounds (None = open-ended).
+        tickers (list): Columns to return (None = all).
+        fields (tuple): Price fields to load.
+
+    Returns:
+        PricePanel, or None if the archive has not been synced yet.
+    """
+    generation = current_generation(archive_dir)
+    if generation is None:
+        return None
+    with open(os.path.join(generation, "manifest.json")) as f:
+        manifest = json.load(f)
+    dates = np.load(os.path.join(generation, "dates.npy"))
+    lo = 0 if first_date is None else int(np.searchsorted(dates, np.datetime64(first_date, 'D'), side='left'))
+    hi = len(dates) if last_date is None else int(np.searchsorted(dates, np.datetime64(last_date, 'D'), side='right'))
+    archived = manifest['tickers']
+    if tickers is not None:
+        positions = {ticker: i for i, ticker in enumerate(archived)}
+        columns = np.array([positions.get(ticker, -1) for ticker in tickers], dtype=np.int64)
+    panel_fields = {}
+    for field in fields:
+        arr = np.load(os.path.join(generation, f"{field}.npy"), mmap_mode='r')[lo:hi]
+        if tickers is not None:
+            selected = arr[:, np.maximum(columns, 0)] if len(archived) else np.empty((hi - lo, len(columns)))
+            selected[:, columns < 0] = np.nan
+            arr = selected
+        panel_fields[field] = arr
+    return PricePanel(dates[lo:hi], list(archived if tickers is None else tickers), panel_fields)
+
+
+def _read_rows(conn, since=None, tickers=None):
+    """price_history rows as a DataFrame, optionally from a date and/or for some tickers only."""
+    conditions, params = [], []
+    if since is not None:
+        conditions.append("date >= ?")
+        params.append(since)
+    if tickers is not None:
+        conditions.append("ticker IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(sorted(tickers)))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    cursor = conn.cursor()
+    cursor.row_factory = None # Plain tuples load much faster than sqlite3.Row
+    cursor.execute(f"SELECT ticker, date, {', '.join(_COLUMNS.values())} FROM price_history {where}", params)
+    return pd.DataFrame(cursor.fetchall(), columns=['ticker', 'date', *PRICE_FIELDS])
+
+def sync(full=False, archive_dir=None):
+    """
+    Updates the archive from price_history (see module docstring).
+
+    Args:
+        full (bool): Rebuild from the whole table instead of the recent overlap.
+
+    Returns:
+        dict: 'dates', 'tickers' and 'rows' (bars read from SQLite) of the new generation.
+    """
+    archive_dir = _archive_dir(archive_dir)
+    previous = None if full else load_panel(archive_dir=archive_dir)
+    conn = database.get_db_connection(readonly=True)
+    try:
+        if previous is None or len(previous.dates) == 0:
+            previous = None
+            rows = _read_rows(conn)
+        else:
+            since = str(previous.dates[-1] - np.timedelta64(config.PRICE_SYNC_OVERLAP_DAYS, 'D'))
+            rows = _read_rows(conn, since=since)
+            known = set(previous.tickers)
+            all_tickers = {row[0] for row in conn.execute("SELECT DISTINCT ticker FROM price_history")}
+            new_tickers = all_tickers - known
+            if new_tickers:
+                rows = pd.concat([rows[~rows['ticker'].isin(new_tickers)], _read_rows(conn, tickers=new_tickers)], ignore_index=True)
+    finally:
+        conn.close()
+
+    row_dates = pd.to_datetime(rows['date']).to_numpy().astype('datetime64[D]')
+    if previous is not None:
+        keep = previous.dates < np.datetime64(since, 'D') # Older bars stay as archived; the overlap is re-read
+        tickers = list(previous.tickers) + sorted(set(rows['ticker']) - set(previous.tickers))
+        dates = np.union1d(previous.dates[keep], row_dates)
+    else:
+        tickers = sorted(set(rows['ticker']))
+        dates = np.unique(row_dates)
+    ticker_index = {ticker: i for i, ticker in enumerate(tickers)}
+    date_pos = np.searchsorted(dates, row_dates)
+    ticker_pos = rows['ticker'].map(ticker_index).to_numpy(dtype=np.int64)
+
+    os.makedirs(archive_dir, exist_ok=True)
+    name = datetime.now().strftime('gen-%Y%m%d-%H%M%S-%f')
+    generation = os.path.join(archive_dir, name)
+    os.makedirs(generation)
+    for field in PRICE_FIELDS:
+        out = np.lib.format.open_memmap(os.path.join(generation, f"{field}.npy"), mode='w+', dtype=np.float64,
+                                        shape=(len(dates), len(tickers)), fortran_order=True)
+        out[:] = np.nan
+        if previous is not None and keep.any():
+            old_pos = np.searchsorted(dates, previous.dates[keep])
+            out[old_pos, :len(previous.tickers)] = previous.fields[field][keep]
+        out[date_pos, ticker_pos] = rows[field].to_numpy(dtype=float)
+        out.flush()
+        del out
+    np.save(os.path.join(generation, "dates.npy"), dates)
+    manifest = {
+        'tickers': tickers,
+        'first_date': str(dates[0]) if len(dates) else None,
+        'last_date': str(dates[-1]) if len(dates) else None,
+        'synced_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    with open(os.path.join(generation, "manifest.json"), 'w') as f:
+        json.dump(manifest, f)
+
+    # Switch readers to the new generation, then drop all but it and the one it replaced
+    replaced = current_generation(archive_dir)
+    pointer_tmp = os.path.join(archive_dir, CURRENT_FILE + ".tmp")
+    with open(pointer_tmp, 'w') as f:
+        f.write(name)
+    os.replace(pointer_tmp, os.path.join(archive_dir, CURRENT_FILE))
+    previous = None # Release the old memory maps before deleting their files
+    keep_names = {name, os.path.basename(replaced) if replaced else None}
+    for entry in os.listdir(archive_dir):
+        if entry.startswith('gen-') and entry not in keep_names:
+            shutil.rmtree(os.path.join(archive_dir, entry), ignore_errors=True)
+    return {'dates': len(dates), 'tickers': len(tickers), 'rows': len(rows)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Columnar price archive (memory-mapped NumPy panels).")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    sync_parser = subparsers.add_parser('sync', help="Update the archive from price_history.")
+    sync_parser.add_argument('--full', action='store_true', help="Rebuild from the whole table.")
+    subparsers.add_parser('info', help="Show the archived tickers and date range.")
+    args = parser.parse_args(argv)
+
+    if args.command == 'sync':
+        start = time.perf_counter()
+        stats = sync(full=args.full)
+        print(f"Archived {stats['tickers']} tickers x {stats['dates']} dates ({stats['rows']:,} bars read) "
+              f"in {time.perf_counter() - start:.2f}s to {current_generation()}.")
+    else:
+        manifest = read_manifest()
+        if manifest is None:
+            print(f"No archive in {config.PRICE_ARCHIVE_DIR} yet; run 'python3 price_archive.py sync'.")
+            return 1
+        print(f"{len(manifest['tickers'])} tickers, {manifest['first_date']} to {manifest['last_date']}, "
+              f"synced {manifest['synced_at']} ({current_generation()}).")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Chooses which tickers get a fresh Brave + Gemini analysis in tonight's run.
+
+Runs after prices are stored and ranks tickers by cheap local signals:
+
+- volume spike: the last session's volume against the average of the 20 before it;
+- gap: the last open against the previous close;
+- move: the last close against the previous close;
+- staleness: days since the ticker's latest analysis in news_articles.
+
+Portfolio holdings are always refreshed. The ANALYSIS_DAILY_BUDGET slots then go first to
+tickers whose latest analysis is missing or older than ANALYSIS_STALENESS_DAYS (stalest
+first), then to the highest priority scores. Every other ticker keeps its latest analysis,
+which the scorer reuses while it is within the staleness limit. Only Gemini analyses count
+(news_articles.sentiment_source); local-tier and failed analyses do not reset staleness.
+"""
+from datetime import datetime, timedelta
+import numpy as np
+import config # Import the config file
+from log_setup import pipeline_logger # Import logger setup
+
+# --- Logger ---
+logger = pipeline_logger(__name__)
+# -------------
+
+VOLUME_AVERAGE_DAYS = 20 # Sessions averaged for the volume-spike baseline
+SIGNAL_LOOKBACK_DAYS = 45 # Calendar days of price history loaded (covers VOLUME_AVERAGE_DAYS + 1 sessions)
+
+
+def load_price_signals(conn, tickers, as_of_date_str):
+    """
+    Returns {ticker: {'volume_ratio', 'gap_pct', 'move_pct'}} from the latest sessions in
+    price_history on or before as_of_date_str (tickers with fewer than 2 sessions are left out).
+    """
+    start = (datetime.strptime(as_of_date_str, '%Y-%m-%d') - timedelta(days=SIGNAL_LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT ticker, open_price, close_price, volume
+        FROM price_history
+        WHERE date >= ? AND date <= ?
+        ORDER BY ticker, date
+    """, (start, as_of_date_str))
+    rows_by_ticker = {}
+    for row in cursor.fetchall():
+        rows_by_ticker.setdefault(row['ticker'], []).append((row['open_price'], row['close_price'], row['volume']))
+
+    signals = {}
+    for ticker in tickers:
+        rows = rows_by_ticker.get(ticker, [])
+        if len(rows) < 2:
+            continue
+        values = np.array(rows[-(VOLUME_AVERAGE_DAYS + 1):], dtype=float) # None -> nan
+        opens, closes, volumes = values[:, 0], values[:, 1], values[:, 2]
+        prev_close = closes[-2]
+        baseline = np.nanmean(volumes[:-1]) if np.isfinite(volumes[:-1]).any() else np.nan
+        with np.errstate(invalid='ignore', divide='ignore'):
+            signals[ticker] = {
+                'volume_ratio': float(volumes[-1] / baseline) if baseline > 0 else np.nan,
+                'gap_pct': float(abs(opens[-1] / prev_close - 1) * 100) if prev_close else np.nan,
+                'move_pct': float(abs(closes[-1] / prev_close - 1) * 100) if prev_close else np.nan,
+            }
+    return signals
+
+def load_last_analysis_dates(conn):
+    """Returns {ticker: latest published_date of a stored Gemini analysis}."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT ticker, MAX(published_date) AS last_date
+        FROM news_articles
+        WHERE COALESCE(sentiment_source, 'gemini') = 'gemini'
+        GROUP BY ticker
+    """)
+    return {row['ticker']: row['last_date'] for row in cursor.fetchall() if row['last_date']}
+
+def get_holdings(conn):
+    """Tickers currently held in the portfolio table."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT ticker FROM portfolio")
+    return {row['ticker'] for row in cursor.fetchall()}
+
+def priority_score(signals, days_since_analysis, weights=None):
+    """
+    Weighted sum of the event signals (missing signals count as 0):
+    volume spike above 1x, gap %, move % and days since the last analysis relative to
+    ANALYSIS_STALENESS_DAYS.
+    """
+    weights = weights or config.PRIORITY_WEIGHTS
+    def value(key):
+        v = signals.get(key) if signals else None
+        return 0.0 if v is None or not np.isfinite(v) else v
+    return (weights['volume_spike'] * max(value('volume_ratio') - 1.0, 0.0)
+            + weights['gap'] * value('gap_pct')
+            + weights['move'] * value('move_pct')
+            + weights['staleness'] * days_since_analysis / max(config.ANALYSIS_STALENESS_DAYS, 1))
+
+def select_tickers_for_analysis(conn, tickers, as_of_date_str, budget=None):
+    """
+    Picks the tickers to analyze tonight (see module docstring).
+
+    Args:
+        budget (int, optional): Fresh analyses allowed besides holdings; defaults to
+            config.ANALYSIS_DAILY_BUDGET. None there means every ticker is analyzed.
+
+    Returns:
+        tuple: (selected, over_budget). selected lists the tickers to analyze, holdings
+        first, then in priority order; over_budget lists the missing/stale tickers that did
+        not fit in the budget (candidates for the local sentiment tier).
+    """
+    budget = config.ANALYSIS_DAILY_BUDGET if budget is None else budget
+    if budget is None or budget >= len(tickers):
+        logger.info(f"Prioritization: budget covers all {len(tickers)} tickers; analyzing everything.")
+        return list(tickers), []
+
+    as_of = datetime.strptime(as_of_date_str, '%Y-%m-%d')
+    signals = load_price_signals(conn, tickers, as_of_date_str)
+    last_dates = load_last_analysis_dates(conn)
+    ticker_set = set(tickers)
+    holdings = sorted(get_holdings(conn) & ticker_set)
+
+    expired, candidates = [], []
+    for ticker in tickers:
+        if ticker in holdings:
+            continue
+        last = last_dates.get(ticker)
+        days_since = (as_of - datetime.strptime(last, '%Y-%m-%d')).days if last else None
+        if days_since is None or days_since >= config.ANALYSIS_STALENESS_DAYS:
+            # Reusing the latest analysis is no longer allowed: refresh, stalest (never analyzed) first
+            expired.append((float('inf') if days_since is None else days_since, ticker))
+        else:
+            candidates.append((priority_score(signals.get(ticker), days_since), ticker))
+
+    expired.sort(key=lambda item: (-item[0], item[1]))
+    candidates.sort(key=lambda item: (-item[0], item[1]))
+    chosen_expired = [ticker for _, ticker in expired[:budget]]
+    chosen_events = [ticker for _, ticker in candidates[:max(budget - len(chosen_expired), 0)]]
+    selected = holdings + chosen_expired + chosen_events
+
+    if len(expired) > budget:
+        logger.warning(f"Prioritization: {len(expired)} tickers have no analysis within {config.ANALYSIS_STALENESS_DAYS} days "
+                       f"but the budget is {budget}; {len(expired) - budget} get local sentiment at most. Consider raising ANALYSIS_DAILY_BUDGET.")
+    if chosen_events:
+        top = ", ".join(f"{ticker} ({score:.2f})" for score, ticker in candidates[:5])
+        logger.info(f"Prioritization: top event-driven tickers: {top}.")
+    logger.info(f"Prioritization: {len(selected)}/{len(tickers)} tickers get fresh analysis "
+                f"({len(holdings)} holdings, {len(chosen_expired)} missing/stale, {len(chosen_events)} event-driven; budget {budget}); "
+                f"{len(tickers) - len(selected)} reuse their latest analysis.")
+    return selected, [ticker for _, ticker in expired[budget:]]
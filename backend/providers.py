@@ -0,0 +1,536 @@
+"""
+Data providers: where prices, fundamentals, search results and LLM analyses come from.
+
+DATA_PROVIDER_MODE selects one provider for the whole process:
+- 'live' (default): yfinance, Brave Search and Gemini over the network.
+- 'record': live, and every response is also appended to PROVIDER_FIXTURE_DIR.
+- 'replay': responses recorded earlier are served from PROVIDER_FIXTURE_DIR with their
+  recorded latency (x PROVIDER_LATENCY_SCALE); requests that were never recorded are
+  answered by the synthetic generator, so a replay never touches the network.
+- 'synthetic': deterministic generated data with simulated latency
+  (SYNTHETIC_LATENCY_SECONDS x PROVIDER_LATENCY_SCALE); needs no fixtures or API keys.
+
+The mode is read from the environment, so the scheduler's subprocesses (fetch -> score
+-> analysis) all run against the same provider. Rate limiters, retries and caches sit
+above the provider and behave the same in every mode.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import statistics
+import threading
+import time
+import types
+from datetime import date
+import numpy as np
+import pandas as pd
+import requests
+import config # Import the config file
+
+MODES = ('live', 'record', 'replay', 'synthetic')
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+FIXTURE_KINDS = ('prices', 'info', 'search', 'llm') # One JSON-lines file per kind in the fixture directory
+
+BRAVE_HEADERS = {
+    'Accept': 'application/json',
+    'Accept-Encoding': 'gzip',
+    'X-Subscription-Token': config.BRAVE_API_KEY # Use key from config
+}
+
+def brave_params(query):
+    return {
+        'q': query,
+        'country': 'us',
+        'search_lang': 'en',
+        'spellcheck': 'false',
+        'count': 5 # Limit to 5 results for analysis
+    }
+
+def missing_api_keys(mode=None):
+    """Names of the API keys the provider mode (default: the installed provider's) needs but config does not have."""
+    mode = mode or (_provider.name if _provider is not None else config.DATA_PROVIDER_MODE)
+    if mode not in ('live', 'record'):
+        return []
+    return [name for name in ('GEMINI_API_KEY', 'BRAVE_API_KEY') if not getattr(config, name)]
+
+def response(text):
+    """Minimal stand-in for a Gemini response (only .text is used)."""
+    return types.SimpleNamespace(text=text)
+
+
+# --- Price frames ---
+
+def frame_to_json(frame):
+    """yfinance OHLCV DataFrame -> JSON-safe dict (dates as YYYY-MM-DD, NaN as null)."""
+    columns = [col for col in PRICE_COLUMNS if col in frame.columns]
+    values = frame[columns].astype(float)
+    return {
+        'dates': frame.index.strftime('%Y-%m-%d').tolist(),
+        'columns': {col: [None if np.isnan(v) else v for v in values[col].tolist()] for col in columns},
+    }
+
+def frame_from_json(data):
+    return pd.DataFrame({col: np.array(values, dtype=float) for col, values in data['columns'].items()},
+                        index=pd.DatetimeIndex(data['dates']))
+
+def slice_history(frame, period=None, start=None):
+    """Rows a yfinance history(period=...) or history(start=...) request would return from a longer frame."""
+    if start:
+        return frame[frame.index >= pd.Timestamp(start)]
+    if frame.empty or not period or period == 'max':
+        return frame
+    if period == 'ytd':
+        return frame[frame.index >= pd.Timestamp(frame.index[-1].year, 1, 1)]
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+    if not match:
+        raise ValueError(f"Unsupported history period: {period}")
+    n, unit = int(match.group(1)), match.group(2)
+    if unit == 'd': # Trading days
+        return frame.tail(n)
+    offset = {'wk': pd.DateOffset(weeks=n), 'mo': pd.DateOffset(months=n), 'y': pd.DateOffset(years=n)}[unit]
+    return frame[frame.index > frame.index[-1] - offset]
+
+def download_frame(frames):
+    """ticker -> OHLCV frame as one yf.download(group_by='ticker') shaped DataFrame."""
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, axis=1)
+
+
+class LiveProvider:
+    """yfinance, Brave Search and Gemini over the network."""
+    name = 'live'
+
+    def price_history(self, ticker, period=None, start=None):
+        import yfinance as yf
+        stock = yf.Ticker(ticker)
+        return stock.history(start=start) if start else stock.history(period=period)
+
+    def price_download(self, tickers, **range_kwargs):
+        import yfinance as yf
+        return yf.download(
+            tickers,
+            group_by='ticker',
+            auto_adjust=True, # Match Ticker.history() defaults
+            threads=True,
+            progress=False,
+            **range_kwargs
+        )
+
+    def company_info(self, ticker):
+        import yfinance as yf
+        return yf.Ticker(ticker).info
+
+    def search(self, session, query):
+        response = (session or requests).get(config.BRAVE_SEARCH_ENDPOINT, headers=BRAVE_HEADERS, params=brave_params(query), timeout=10) # Use endpoint from config
+        response.raise_for_status()
+        return response.json()
+
+    def model(self, model_name):
+        import google.generativeai as genai
+        genai.configure(api_key=config.GEMINI_API_KEY)
+        return genai.GenerativeModel(model_name)
+
+    def log_stats(self, logger):
+        pass
+
+
+class FixtureStore:
+    """Recorded responses: one JSON-lines file per kind of request ({"key", "elapsed", "response"} per line)."""
+
+    def __init__(self, directory=None):
+        self.directory = directory or config.PROVIDER_FIXTURE_DIR
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_string(key):
+        return json.dumps(key, sort_keys=True)
+
+    def path(self, kind):
+        return os.path.join(self.directory, f"{kind}.jsonl")
+
+    def append(self, kind, key, elapsed, response):
+        line = json.dumps({'key': key, 'elapsed': round(elapsed, 4), 'response': response}, default=str)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path(kind), 'a') as f:
+                f.write(line + "\n")
+
+    def load(self, kind):
+        """Returns key string -> (elapsed, response); later records of the same key win."""
+        records = {}
+        if not os.path.exists(self.path(kind)):
+            return records
+        with open(self.path(kind)) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    records[self.key_string(record['key'])] = (record['elapsed'], record['response'])
+        return records
+
+
+class RecordingModel:
+    """Wraps a live Gemini model and records every prompt's response text."""
+
+    def __init__(self, model, fixtures):
+        self._model = model
+        self._fixtures = fixtures
+
+    def generate_content(self, prompt):
+        start = time.perf_counter()
+        result = self._model.generate_content(prompt)
+        self._fixtures.append('llm', prompt_key(prompt), time.perf_counter() - start, result.text)
+        return result
+
+    async def generate_content_async(self, prompt):
+        start = time.perf_counter()
+        result = await self._model.generate_content_async(prompt)
+        self._fixtures.append('llm', prompt_key(prompt), time.perf_counter() - start, result.text)
+        return result
+
+def prompt_key(prompt):
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+class RecordingProvider(LiveProvider):
+    """Live provider that also writes every response (and how long it took) to the fixture directory."""
+    name = 'record'
+
+    def __init__(self, fixtures=None):
+        self.fixtures = fixtures or FixtureStore()
+
+    def _timed(self, call, *args, **kwargs):
+        start = time.perf_counter()
+        result = call(*args, **kwargs)
+        return result, time.perf_counter() - start
+
+    def price_history(self, ticker, period=None, start=None):
+        hist, elapsed = self._timed(super().price_history, ticker, period=period, start=start)
+        self.fixtures.append('prices', {'tickers': [ticker], 'period': period, 'start': start}, elapsed, {ticker: frame_to_json(hist)})
+        return hist
+
+    def price_download(self, tickers, **range_kwargs):
+        data, elapsed = self._timed(super().price_download, tickers, **range_kwargs)
+        frames = {}
+        for ticker in tickers:
+            try:
+                frames[ticker] = frame_to_json(data[ticker].dropna(subset=['Close']))
+            except KeyError:
+                continue
+        self.fixtures.append('prices', {'tickers': sorted(tickers), **range_kwargs}, elapsed, frames)
+        return data
+
+    def company_info(self, ticker):
+        info, elapsed = self._timed(super().company_info, ticker)
+        self.fixtures.append('info', ticker, elapsed, info)
+        return info
+
+    def search(self, session, query):
+        data, elapsed = self._timed(super().search, session, query)
+        self.fixtures.append('search', query, elapsed, data)
+        return data
+
+    def model(self, model_name):
+        return RecordingModel(super().model(model_name), self.fixtures)
+
+
+# --- Synthetic data ---
+
+SYNTHETIC_FIRST_DATE = '2015-01-02' # Price paths start here so any period or start date can be served
+SYNTHETIC_SECTORS = ['Technology', 'Healthcare', 'Industrials', 'Financial Services', 'Consumer Cyclical']
+SYNTHETIC_HEADLINES = {
+    1: ["{name} beats quarterly estimates", "{name} raises full-year guidance", "Analysts upgrade {name}",
+        "{name} wins major contract", "{name} reports record revenue"],
+    -1: ["{name} misses revenue estimates", "{name} cuts guidance amid weak demand", "Analysts downgrade {name}",
+         "{name} faces regulatory probe", "{name} announces layoffs"],
+    0: ["{name} to present at industry conference", "{name} announces quarterly dividend", "{name} files annual report",
+        "What to watch as {name} reports earnings", "{name} names new board member"],
+}
+
+def _rng(*parts):
+    """Generator seeded by the given values, so every request is reproducible."""
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode('utf-8')).digest()
+    return np.random.default_rng(int.from_bytes(digest[:8], 'little'))
+
+
+class SyntheticModel:
+    """Gemini stand-in answering query-generation, single and batched analysis prompts."""
+
+    def __init__(self, provider):
+        self._provider = provider
+
+    def generate_content(self, prompt):
+        text, latency = self._provider.answer(prompt)
+        self._provider.sleep(latency)
+        return response(text)
+
+    async def generate_content_async(self, prompt):
+        text, latency = self._provider.answer(prompt)
+        await asyncio.sleep(latency * config.PROVIDER_LATENCY_SCALE)
+        return response(text)
+
+
+class SyntheticProvider:
+    """
+    Deterministic generated data: mean-reverting price paths per ticker, .info dicts,
+    news-like search results (a few new articles per query each day) and analyses.
+    Latency is simulated from SYNTHETIC_LATENCY_SECONDS.
+    """
+    name = 'synthetic'
+
+    def __init__(self, seed=0, latency=None):
+        self.seed = seed
+        self.latency = latency or config.SYNTHETIC_LATENCY_SECONDS
+        self._paths = {} # ticker -> full OHLCV frame up to today
+        self._dates = None # Shared business-day index of the paths (slow to build)
+        self._lock = threading.Lock()
+        self.stats = {kind: 0 for kind in FIXTURE_KINDS}
+
+    def sleep(self, seconds):
+        if seconds > 0 and config.PROVIDER_LATENCY_SCALE > 0:
+            time.sleep(seconds * config.PROVIDER_LATENCY_SCALE)
+
+    def _count(self, kind, n=1):
+        with self._lock:
+            self.stats[kind] += n
+
+    def path(self, ticker):
+        """Full synthetic OHLCV history of a ticker from SYNTHETIC_FIRST_DATE to today."""
+        with self._lock:
+            frame = self._paths.get(ticker)
+        if frame is not None:
+            return frame
+        if self._dates is None or self._dates[-1] < pd.Timestamp(date.today()) - pd.offsets.BDay():
+            self._dates = pd.bdate_range(SYNTHETIC_FIRST_DATE, pd.Timestamp(date.today()))
+        dates = self._dates
+        rng = _rng(self.seed, 'prices', ticker)
+        n = len(dates)
+        # AR(1) log-price deviation around a base price: x_t = phi * x_(t-1) + e_t, vectorized
+        phi = 0.995
+        shocks = rng.normal(0, rng.uniform(0.01, 0.03), n)
+        powers = phi ** np.arange(n)
+        deviation = powers * np.cumsum(shocks / powers)
+        close = rng.uniform(3, 45) * np.exp(deviation)
+        open_ = np.concatenate([[close[0]], close[:-1]]) * (1 + rng.normal(0, 0.006, n))
+        spread = np.abs(rng.normal(0, 0.01, n))
+        volume = rng.lognormal(np.log(rng.uniform(2e5, 2e6)), 0.35, n) * np.where(rng.random(n) < 0.03, 3.0, 1.0) # Occasional spikes
+        frame = pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) * (1 + spread),
+            'Low': np.minimum(open_, close) * (1 - spread),
+            'Close': close,
+            'Volume': np.round(volume),
+        }, index=dates)
+        with self._lock:
+            self._paths[ticker] = frame
+        return frame
+
+    def price_history(self, ticker, period=None, start=None):
+        self._count('prices')
+        self.sleep(self.latency['yfinance'])
+        return slice_history(self.path(ticker), period=period, start=start)
+
+    def price_download(self, tickers, **range_kwargs):
+        self._count('prices')
+        self.sleep(self.latency['yfinance'] * (1 + len(tickers) / 50)) # One request, response grows with the chunk
+        return download_frame({ticker: slice_history(self.path(ticker), **range_kwargs) for ticker in tickers})
+
+    def company_info(self, ticker):
+        self._count('info')
+        self.sleep(self.latency['yfinance'])
+        rng = _rng(self.seed, 'info', ticker)
+        price = float(self.path(ticker)['Close'].iloc[-1])
+        return {
+            'longName': f"{ticker} Holdings Inc.",
+            'sector': SYNTHETIC_SECTORS[int(rng.integers(len(SYNTHETIC_SECTORS)))],
+            'currentPrice': round(price, 2),
+            'previousClose': round(price, 2),
+            'marketCap': int(price * rng.uniform(2e7, 5e8)),
+            'trailingPE': round(float(rng.uniform(5, 60)), 2) if rng.random() > 0.15 else None, # Loss-makers have no P/E
+            'dividendYield': round(float(rng.uniform(0.005, 0.05)), 4) if rng.random() > 0.5 else None,
+            'debtToEquity': round(float(rng.uniform(5, 250)), 2), # Reported as %, like yfinance
+            'priceToBook': round(float(rng.uniform(0.5, 8)), 2),
+            'priceToSalesTrailing12Months': round(float(rng.uniform(0.3, 10)), 2),
+        }
+
+    def search(self, session, query):
+        """Brave-shaped response; each query's window of articles moves forward one article per day."""
+        self._count('search')
+        self.sleep(self.latency['brave'])
+        name = re.split(r" (?:stock|earnings|guidance|analyst|news|risks)\b", query)[0] # Company part of the query
+        today = date.today().toordinal()
+        results = []
+        for article in range(today - 4, today + 1):
+            rng = _rng(self.seed, 'article', query, article)
+            tone = int(rng.choice([1, 0, -1], p=[0.4, 0.3, 0.3]))
+            headline = SYNTHETIC_HEADLINES[tone][int(rng.integers(5))].format(name=name)
+            results.append({
+                'title': headline,
+                'description': f"{headline}. Shares moved {rng.uniform(-6, 6):+.1f}% as investors weighed the news.",
+                'url': f"https://news.example.com/{hashlib.sha1(query.encode('utf-8')).hexdigest()[:10]}/{article}",
+                'page_age': date.fromordinal(article).isoformat(),
+            })
+        return {'web': {'results': results[::-1]}} # Newest first
+
+    def model(self, model_name):
+        return SyntheticModel(self)
+
+    def answer(self, prompt):
+        """(response text, simulated seconds) for a Gemini prompt built by gemini_analyzer."""
+        self._count('llm')
+        base, per_ticker = self.latency['gemini'], self.latency['gemini_per_ticker']
+        query_match = re.search(r"stock performance of (.+) \(ticker: (\S+)\)", prompt)
+        if query_match:
+            name, ticker = query_match.groups()
+            return json.dumps([f"{name} stock news", f"{name} earnings outlook", f"{ticker} analyst rating"]), base + per_ticker
+        parts = re.split(r"^\s*=== (\S+) \(.*$", prompt, flags=re.MULTILINE) # Batched: [intro, ticker, section, ...]
+        if len(parts) > 1:
+            sections = dict(zip(parts[1::2], parts[2::2]))
+            return json.dumps({ticker: self._analysis(ticker, section) for ticker, section in sections.items()}), base + per_ticker * len(sections)
+        single = re.search(r"regarding .+ \((\S+)\)\.", prompt)
+        return json.dumps(self._analysis(single.group(1) if single else '?', prompt)), base + per_ticker
+
+    def _analysis(self, ticker, context):
+        # Seeded by the URLs analyzed, so batched and single prompts give a ticker the same answer
+        rng = _rng(self.seed, 'analysis', ticker, *re.findall(r"URL: (\S+)", context))
+        return {
+            "summary": f"Synthetic analysis of recent coverage of {ticker}.",
+            "bullish_points": ["Results beat expectations."] if rng.random() > 0.3 else [],
+            "bearish_points": ["Guidance was cautious."] if rng.random() > 0.5 else [],
+            "sentiment_score": round(float(rng.uniform(-0.6, 0.8)), 2),
+        }
+
+    def log_stats(self, logger):
+        calls = ", ".join(f"{count} {kind}" for kind, count in self.stats.items() if count)
+        logger.info(f"Data provider '{self.name}': {calls or 'no'} requests served (latency scale {config.PROVIDER_LATENCY_SCALE:g}).")
+
+
+class ReplayModel:
+    """Gemini stand-in answering from recorded responses (synthetic answers for prompts never recorded)."""
+
+    def __init__(self, provider):
+        self._provider = provider
+
+    def generate_content(self, prompt):
+        text, latency = self._provider.replay_llm(prompt)
+        self._provider.sleep(latency)
+        return response(text)
+
+    async def generate_content_async(self, prompt):
+        text, latency = self._provider.replay_llm(prompt)
+        await asyncio.sleep(latency * config.PROVIDER_LATENCY_SCALE)
+        return response(text)
+
+
+class ReplayProvider:
+    """
+    Serves responses recorded by RecordingProvider, sleeping for the recorded latency.
+
+    Price requests are answered from everything recorded for the ticker (sliced to the
+    requested period or start date), since incremental start dates rarely repeat exactly.
+    Anything never recorded falls back to SyntheticProvider and is counted as a miss.
+    """
+    name = 'replay'
+
+    def __init__(self, fixtures=None, fallback=None):
+        self.fixtures = fixtures or FixtureStore()
+        self.fallback = fallback or SyntheticProvider()
+        self._records = {kind: self.fixtures.load(kind) for kind in FIXTURE_KINDS}
+        self._latency = {kind: statistics.median(elapsed for elapsed, _ in records.values()) if records else 0.0
+                         for kind, records in self._records.items()}
+        self._frames = {} # ticker -> every recorded bar, merged
+        for _, frames in self._records['prices'].values():
+            for ticker, data in frames.items():
+                frame = frame_from_json(data)
+                known = self._frames.get(ticker)
+                self._frames[ticker] = frame if known is None else frame.combine_first(known)
+        self._lock = threading.Lock()
+        self.stats = {kind: {'replayed': 0, 'missed': 0} for kind in FIXTURE_KINDS}
+
+    def sleep(self, seconds):
+        if seconds > 0 and config.PROVIDER_LATENCY_SCALE > 0:
+            time.sleep(seconds * config.PROVIDER_LATENCY_SCALE)
+
+    def _lookup(self, kind, key):
+        """(elapsed, response) recorded for key, or None; counts the replay or miss."""
+        record = self._records[kind].get(FixtureStore.key_string(key))
+        with self._lock:
+            self.stats[kind]['replayed' if record is not None else 'missed'] += 1
+        return record
+
+    def _frames_for(self, tickers, key, period=None, start=None):
+        record = self._lookup('prices', key)
+        self.sleep(record[0] if record is not None else self._latency['prices'])
+        frames = {}
+        for ticker in tickers:
+            frame = self._frames.get(ticker)
+            frames[ticker] = slice_history(frame if frame is not None else self.fallback.path(ticker), period=period, start=start)
+        return frames
+
+    def price_history(self, ticker, period=None, start=None):
+        return self._frames_for([ticker], {'tickers': [ticker], 'period': period, 'start': start}, period=period, start=start)[ticker]
+
+    def price_download(self, tickers, **range_kwargs):
+        return download_frame(self._frames_for(tickers, {'tickers': sorted(tickers), **range_kwargs}, **range_kwargs))
+
+    def company_info(self, ticker):
+        record = self._lookup('info', ticker)
+        if record is None:
+            return self.fallback.company_info(ticker)
+        self.sleep(record[0])
+        return record[1]
+
+    def search(self, session, query):
+        record = self._lookup('search', query)
+        if record is None:
+            return self.fallback.search(session, query)
+        self.sleep(record[0])
+        return record[1]
+
+    def replay_llm(self, prompt):
+        record = self._lookup('llm', prompt_key(prompt))
+        if record is None:
+            return self.fallback.answer(prompt)
+        return record[1], record[0]
+
+    def model(self, model_name):
+        return ReplayModel(self)
+
+    def log_stats(self, logger):
+        parts = [f"{s['replayed']} {kind} replayed ({s['missed']} synthetic)" for kind, s in self.stats.items() if s['replayed'] or s['missed']]
+        logger.info(f"Data provider 'replay' from {self.fixtures.directory}: {', '.join(parts) or 'no requests'} "
+                    f"(latency scale {config.PROVIDER_LATENCY_SCALE:g}).")
+
+
+def create_provider(mode=None, fixture_dir=None):
+    """Builds the provider for a DATA_PROVIDER_MODE value."""
+    mode = mode or config.DATA_PROVIDER_MODE
+    if mode == 'live':
+        return LiveProvider()
+    if mode == 'record':
+        return RecordingProvider(FixtureStore(fixture_dir))
+    if mode == 'replay':
+        return ReplayProvider(FixtureStore(fixture_dir))
+    if mode == 'synthetic':
+        return SyntheticProvider()
+    raise ValueError(f"Unknown DATA_PROVIDER_MODE '{mode}' (expected one of {', '.join(MODES)})")
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def get_provider():
+    """Returns the process-wide provider, created from config.DATA_PROVIDER_MODE on first use."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = create_provider()
+        return _provider
+
+def set_provider(provider):
+    """Installs a provider for the rest of the process (benchmarks); returns the previous one."""
+    global _provider
+    with _provider_lock:
+        previous, _provider = _provider, provider
+    return previous
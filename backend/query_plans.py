@@ -0,0 +1,68 @@
+import time
+import config # Import the config file
+from json_store import JsonFileStore
+
+
+def template_queries(ticker, company_name):
+    """Deterministic search queries built from config.SEARCH_QUERY_TEMPLATES (no API call)."""
+    return [template.format(ticker=ticker, name=company_name) for template in config.SEARCH_QUERY_TEMPLATES]
+
+
+class QueryPlanStore(JsonFileStore):
+    """
+    On-disk store of the search queries used for each ticker's analysis.
+
+    Gemini-generated queries are kept for QUERY_PLAN_TTL_DAYS and reused on every run
+    in between, so query generation costs one Gemini call per ticker per TTL instead of
+    one per night. A plan is regenerated early when the company name it was built for
+    changes. Lookups are counted so reuse/regeneration statistics can be logged.
+
+    File layout: {ticker: {"queries": [...], "company_name": ..., "created_at": unix_seconds}}
+    """
+
+    label = "query plans"
+
+    def __init__(self, path=None, ttl_days=None):
+        super().__init__(path or config.QUERY_PLAN_FILE)
+        self.ttl_seconds = (ttl_days or config.QUERY_PLAN_TTL_DAYS) * 86400
+        self.stats = {'reused': 0, 'missing': 0, 'expired': 0, 'name_changed': 0, 'generated': 0, 'templates': 0}
+
+    def get(self, ticker, company_name):
+        """
+        Returns the stored queries for a ticker, or None when the plan is missing, expired
+        or was built for a different company name (the reason is counted).
+        """
+        with self._lock:
+            plan = self._entries.get(ticker)
+            if plan is None:
+                reason = 'missing'
+            elif plan['company_name'] != company_name:
+                reason = 'name_changed'
+            elif time.time() - plan['created_at'] >= self.ttl_seconds:
+                reason = 'expired'
+            else:
+                self.stats['reused'] += 1
+                return list(plan['queries'])
+            self.stats[reason] += 1
+            return None
+
+    def put(self, ticker, company_name, queries):
+        """Stores freshly generated queries for a ticker."""
+        with self._lock:
+            self._entries[ticker] = {'queries': list(queries), 'company_name': company_name, 'created_at': time.time()}
+            self.stats['generated'] += 1
+
+    def record_template_fallback(self):
+        with self._lock:
+            self.stats['templates'] += 1
+
+    def log_stats(self, logger):
+        """Logs how many plans were reused, why the others were regenerated and how often templates were used."""
+        s = self.stats
+        looked_up = s['reused'] + s['missing'] + s['expired'] + s['name_changed']
+        if looked_up:
+            logger.info(f"Query plans: {s['reused']}/{looked_up} reused ({s['reused'] / looked_up:.0%}), "
+                        f"regenerated {s['missing']} missing / {s['expired']} expired / {s['name_changed']} renamed; "
+                        f"{s['generated']} generated by Gemini, {s['templates']} template fallbacks. "
+                        f"{s['reused']} Gemini query calls saved.")
+        logger.info(f"Query plan store holds {len(self._entries)} tickers ({self.path}).")
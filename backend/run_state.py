@@ -0,0 +1,212 @@
+"""
+Checkpoints for the nightly fetch pipeline (pipeline_runs, pipeline_ticker_status).
+
+Each run of data_fetcher.run_data_fetch_pipeline records its trading date, current
+stage, the ticker universe and the analysis selection, plus a status per ticker and
+stage ('prices', 'analysis'). `data_fetcher.py --resume` picks up the latest run for
+the same trading date and only processes tickers whose stage is not 'done' yet.
+"""
+import json
+import threading
+from datetime import datetime
+import database # Import database functions
+
+DONE = 'done'
+FAILED = 'failed'
+FALLBACK = 'fallback' # Analysis stored from the local tier after Gemini failed; retried like a failure
+
+
+def analysis_status(analysis_result):
+    """Checkpoint status of one analysis result (None = nothing new, the stored analysis stays current)."""
+    if analysis_result is None:
+        return DONE
+    source = analysis_result.get('source')
+    if source == 'none':
+        return FAILED
+    if source == 'vader':
+        return FALLBACK
+    return DONE
+
+def write_ticker_status(conn, run_id, stage, ticker, status, error=None):
+    """Upserts one ticker's status for a stage and commits (runs on the DB writer when one is used)."""
+    conn.execute("""
+        INSERT INTO pipeline_ticker_status (run_id, stage, ticker, status, attempts, error, updated_at)
+        VALUES (?, ?, ?, ?, 1, ?, ?)
+        ON CONFLICT(run_id, stage, ticker) DO UPDATE SET
+            status = excluded.status, attempts = pipeline_ticker_status.attempts + 1,
+            error = excluded.error, updated_at = excluded.updated_at
+    """, (run_id, stage, ticker, status, error, datetime.now().isoformat(timespec='seconds')))
+    conn.commit()
+
+def write_ticker_statuses(conn, run_id, stage, tickers, status, error=None):
+    """Upserts the same status for many tickers in one transaction (see write_ticker_status)."""
+    now = datetime.now().isoformat(timespec='seconds')
+    conn.executemany("""
+        INSERT INTO pipeline_ticker_status (run_id, stage, ticker, status, attempts, error, updated_at)
+        VALUES (?, ?, ?, ?, 1, ?, ?)
+        ON CONFLICT(run_id, stage, ticker) DO UPDATE SET
+            status = excluded.status, attempts = pipeline_ticker_status.attempts + 1,
+            error = excluded.error, updated_at = excluded.updated_at
+    """, [(run_id, stage, ticker, status, error, now) for ticker in tickers])
+    conn.commit()
+
+
+class PipelineRun:
+    """
+    One checkpointed pipeline run. Ticker statuses are kept in memory for the pending /
+    failed lookups and persisted through the DB writer or a short-lived connection. A
+    status that describes a data write is recorded by store_and_mark, in the same writer
+    task as that write, so it can never claim data that was not stored.
+    """
+
+    def __init__(self, run_id, trading_date, tickers=None, selection=None, statuses=None, resumed=False):
+        self.run_id = run_id
+        self.trading_date = trading_date
+        self.tickers = tickers # Universe chosen by update_company_list (None until stored)
+        self.selection = selection # {'selected': [...], 'over_budget': [...]} from the prioritizer (None until stored)
+        self.resumed = resumed
+        self._statuses = statuses or {} # (stage, ticker) -> status
+        self._lock = threading.Lock()
+
+    @classmethod
+    def start(cls, trading_date, resume=False):
+        """
+        Resumes the latest run for trading_date when resume is set and one exists;
+        otherwise starts a new run.
+        """
+        conn = database.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            row = None
+            if resume:
+                cursor.execute("SELECT * FROM pipeline_runs WHERE trading_date = ? ORDER BY run_id DESC LIMIT 1", (trading_date,))
+                row = cursor.fetchone()
+            now = datetime.now().isoformat(timespec='seconds')
+            if row is not None:
+                cursor.execute("UPDATE pipeline_runs SET status = 'running', updated_at = ? WHERE run_id = ?", (now, row['run_id']))
+                conn.commit()
+                cursor.execute("SELECT stage, ticker, status FROM pipeline_ticker_status WHERE run_id = ?", (row['run_id'],))
+                statuses = {(r['stage'], r['ticker']): r['status'] for r in cursor.fetchall()}
+                return cls(row['run_id'], trading_date,
+                           tickers=json.loads(row['tickers']) if row['tickers'] is not None else None,
+                           selection=json.loads(row['selection']) if row['selection'] is not None else None,
+                           statuses=statuses, resumed=True)
+            cursor.execute("INSERT INTO pipeline_runs (trading_date, stage, status, started_at, updated_at) VALUES (?, 'companies', 'running', ?, ?)",
+                           (trading_date, now, now))
+            conn.commit()
+            return cls(cursor.lastrowid, trading_date)
+        finally:
+            conn.close()
+
+    def _update_run(self, **fields):
+        fields['updated_at'] = datetime.now().isoformat(timespec='seconds')
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        conn = database.get_db_connection()
+        try:
+            conn.execute(f"UPDATE pipeline_runs SET {assignments} WHERE run_id = ?", (*fields.values(), self.run_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def set_stage(self, stage):
+        self._update_run(stage=stage)
+
+    def store_tickers(self, tickers):
+        """Checkpoints the ticker universe so a resumed run skips update_company_list."""
+        self.tickers = list(tickers)
+        self._update_run(tickers=json.dumps(self.tickers))
+
+    def store_selection(self, selected, over_budget):
+        """Checkpoints the prioritizer's choice so a resumed run keeps the same analysis budget."""
+        self.selection = {'selected': list(selected), 'over_budget': list(over_budget)}
+        self._update_run(selection=json.dumps(self.selection))
+
+    def finish(self, status='completed'):
+        """Marks the run completed (stage 'finished') or failed (stage kept for the resume)."""
+        if status == 'completed':
+            self._update_run(stage='finished', status=status)
+        else:
+            self._update_run(status=status)
+
+    def _set(self, stage, tickers, status):
+        with self._lock:
+            for ticker in tickers:
+                self._statuses[(stage, ticker)] = status
+
+    def store_and_mark(self, stage, tickers, status, write, *args, writer=None):
+        """
+        Runs write(conn, *args) and then records status for tickers, as one task on the
+        writer when given. The checkpoint is committed (and set in memory) only after the
+        write committed; if the write raises, the tickers are recorded FAILED with the
+        error instead and the exception is re-raised for the writer to count.
+        """
+        tickers = list(tickers)
+
+        def store_and_mark_task(conn):
+            try:
+                write(conn, *args)
+            except Exception as e:
+                conn.rollback()
+                self._set(stage, tickers, FAILED)
+                write_ticker_statuses(conn, self.run_id, stage, tickers, FAILED, error=str(e))
+                raise
+            write_ticker_statuses(conn, self.run_id, stage, tickers, status)
+            self._set(stage, tickers, status)
+        store_and_mark_task.__name__ = f"{getattr(write, '__name__', 'write')}+checkpoint" # Named in the writer's log
+
+        if writer is not None:
+            writer.submit(store_and_mark_task)
+        else:
+            conn = database.get_db_connection()
+            try:
+                store_and_mark_task(conn)
+            finally:
+                conn.close()
+
+    def mark(self, stage, ticker, status, error=None, writer=None):
+        """
+        Records a ticker's status for a stage (queued on the writer when given). For a
+        status that describes a data write, use store_and_mark.
+        """
+        self._set(stage, [ticker], status)
+        if writer is not None:
+            writer.submit(write_ticker_status, self.run_id, stage, ticker, status, error)
+        else:
+            conn = database.get_db_connection()
+            try:
+                write_ticker_status(conn, self.run_id, stage, ticker, status, error)
+            finally:
+                conn.close()
+
+    def mark_many(self, stage, tickers, status, writer=None):
+        """Records the same status for many tickers in one transaction (e.g. tickers a batch download missed)."""
+        tickers = list(tickers)
+        self._set(stage, tickers, status)
+        if writer is not None:
+            writer.submit(write_ticker_statuses, self.run_id, stage, tickers, status)
+        else:
+            conn = database.get_db_connection()
+            try:
+                write_ticker_statuses(conn, self.run_id, stage, tickers, status)
+            finally:
+                conn.close()
+
+    def pending(self, stage, tickers):
+        """Tickers whose stage is not done yet, in their original order."""
+        with self._lock:
+            return [ticker for ticker in tickers if self._statuses.get((stage, ticker)) != DONE]
+
+    def failed(self, stage):
+        """Tickers whose latest attempt at a stage failed (or fell back to the local tier)."""
+        with self._lock:
+            return sorted(ticker for (s, ticker), status in self._statuses.items() if s == stage and status != DONE)
+
+    def log_summary(self, logger):
+        with self._lock:
+            counts = {}
+            for (stage, _), status in self._statuses.items():
+                counts.setdefault(stage, {}).setdefault(status, 0)
+                counts[stage][status] += 1
+        for stage, by_status in sorted(counts.items()):
+            detail = ", ".join(f"{count} {status}" for status, count in sorted(by_status.items()))
+            logger.info(f"Run {self.run_id} ({self.trading_date}) stage '{stage}': {detail}.")
@@ -60,8 +60,12 @@ def daily_job():
 
     # 1. Run the data fetcher (includes Gemini analysis)
     logger.info("Step 1: Running data fetcher...")
-    fetch_command = [PYTHON_EXECUTABLE, DATA_FETCHER_SCRIPT]
+    # --resume continues a run interrupted earlier today; on a new date it starts a fresh run
+    fetch_command = [PYTHON_EXECUTABLE, DATA_FETCHER_SCRIPT, '--resume']
     fetch_success = run_script(' '.join(fetch_command), 'data_fetcher', config.LOG_FILE_FETCHER)
+    if not fetch_success:
+        logger.warning("Data fetcher failed; resuming it once from its checkpoints...")
+        fetch_success = run_script(' '.join(fetch_command), 'data_fetcher', config.LOG_FILE_FETCHER)
     if not fetch_success:
         logger.error("Data fetching failed. Skipping scoring and analysis for today.")
         return # Don't proceed if fetching failed
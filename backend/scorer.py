@@ -13,8 +13,10 @@ load_dotenv(dotenv_path=dotenv_path)
 import database # To use get_db_connection
 from datetime import datetime, timedelta
 import pandas as pd # Using pandas for easier calculations
-import pandas_ta as ta # Import pandas-ta
 import config # Import the config file
+import indicators # NumPy indicator kernels (default INDICATOR_BACKEND)
+if config.INDICATOR_BACKEND == 'pandas_ta':
+    import pandas_ta as ta # Optional: registers the DataFrame .ta accessor
 from log_setup import setup_logger # Import logger setup
 import numpy as np # For handling potential NaN/Inf
 
@@ -22,10 +24,29 @@ import numpy as np # For handling potential NaN/Inf
 logger = setup_logger('scorer', config.LOG_FILE_SCORER)
 # -------------
 
-def calculate_scores_for_date(target_date_str):
+def calculate_scores_for_date(target_date_str, engine=None):
     """
     Calculates scores for all tracked companies for a specific date
     based on data already fetched and stored in the database.
+
+    Args:
+        target_date_str (str): Date to score (YYYY-MM-DD).
+        engine (str, optional): 'panel' (vectorized, see panel_scorer) or 'per_ticker'.
+            Defaults to config.SCORING_ENGINE.
+    """
+    engine = engine or config.SCORING_ENGINE
+    if engine == 'panel':
+        import panel_scorer
+        return panel_scorer.calculate_scores_for_date(target_date_str)
+    return calculate_scores_per_ticker(target_date_str)
+
+def calculate_scores_per_ticker(target_date_str):
+    """
+    Per-ticker scoring path: one price query and one pandas/pandas_ta pass per ticker.
+
+    Kept as the reference implementation for the panel engine. Indicators come from
+    the NumPy kernels in indicators.py, or from pandas_ta when
+    config.INDICATOR_BACKEND is 'pandas_ta'.
     """
     logger.info(f"Starting score calculation for date: {target_date_str}...")
     conn = database.get_db_connection()
@@ -43,8 +64,13 @@ def calculate_scores_for_date(target_date_str):
     target_date = datetime.strptime(target_date_str, '%Y-%m-%d').date()
     # Fetch a larger window from DB for calculations (MA200 needs ~250 calendar days)
     # Also need High/Low for ATR
-    price_start_date_db_fetch = (target_date - timedelta(days=250)).strftime('%Y-%m-%d')
-    price_end_date_db_fetch = (target_date + timedelta(days=4)).strftime('%Y-%m-%d') # Look a few days ahead for next_day_open
+    price_start_date_db_fetch = (target_date - timedelta(days=config.SCORING_LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+    price_end_date_db_fetch = (target_date + timedelta(days=config.NEXT_DAY_LOOKAHEAD_DAYS)).strftime('%Y-%m-%d') # Look a few days ahead for next_day_open
+    # Analyses published after this date are reused for sentiment (tickers are not re-analyzed every night)
+    sentiment_window_start = (target_date - timedelta(days=config.ANALYSIS_STALENESS_DAYS)).strftime('%Y-%m-%d')
+
+    # Fundamentals for every ticker in one query (persisted by the fetch stage; no network calls here)
+    fundamentals = database.get_fundamentals_as_of(conn, target_date_str)
 
     all_scores = []
 
@@ -69,71 +95,35 @@ def calculate_scores_for_date(target_date_str):
         next_day_open = None # Initialize next day open
         next_day_perf = None # Initialize next day performance %
 
-        # --- Fetch Fundamental Data (P/E, Dividend Yield, D/E, P/B, P/S) ---
-        try:
-            import yfinance as yf
-            import time
-            stock_info = yf.Ticker(ticker).info
-            # Fetch and convert P/E ratio
-            try:
-                pe_value = stock_info.get('trailingPE')
-                pe_ratio = float(pe_value) if pe_value is not None else None
-            except (ValueError, TypeError):
-                 logger.warning(f"Could not convert P/E ratio '{pe_value}' to float for {ticker}.")
-                 pe_ratio = None
-            # Fetch and convert dividend yield
-            try:
-                div_value = stock_info.get('dividendYield')
-                dividend_yield = float(div_value) if div_value is not None else None
-            except (ValueError, TypeError):
-                 logger.warning(f"Could not convert Dividend Yield '{div_value}' to float for {ticker}.")
-                 dividend_yield = None
-            # Fetch and convert Debt-to-Equity ratio
-            try:
-                de_value = stock_info.get('debtToEquity')
-                if de_value is not None:
-                    # Normalize D/E (sometimes reported as %, sometimes as ratio)
-                    debt_to_equity = float(de_value) / 100.0 if float(de_value) > 5 else float(de_value)
-                else:
-                    debt_to_equity = None
-            except (ValueError, TypeError):
-                 logger.warning(f"Could not convert Debt-to-Equity '{de_value}' to float for {ticker}.")
-                 debt_to_equity = None
-            # Fetch and convert Price-to-Book ratio
-            try:
-                pb_value = stock_info.get('priceToBook')
-                pb_ratio = float(pb_value) if pb_value is not None else None
-            except (ValueError, TypeError):
-                 logger.warning(f"Could not convert Price-to-Book '{pb_value}' to float for {ticker}.")
-                 pb_ratio = None
-            # Fetch and convert Price-to-Sales ratio
-            try:
-                ps_value = stock_info.get('priceToSalesTrailing12Months')
-                ps_ratio = float(ps_value) if ps_value is not None else None
-            except (ValueError, TypeError):
-                 logger.warning(f"Could not convert Price-to-Sales '{ps_value}' to float for {ticker}.")
-                 ps_ratio = None
-
-            time.sleep(0.2) # Small delay
-        except Exception as e:
-            logger.warning(f"Could not fetch yfinance info for fundamentals for {ticker}: {e}")
+        # --- Fundamental Data (P/E, Dividend Yield, D/E, P/B, P/S) from the stored snapshot ---
+        ticker_fundamentals = fundamentals.get(ticker)
+        if ticker_fundamentals:
+            pe_ratio = ticker_fundamentals['pe_ratio']
+            dividend_yield = ticker_fundamentals['dividend_yield']
+            debt_to_equity = ticker_fundamentals['debt_to_equity']
+            pb_ratio = ticker_fundamentals['pb_ratio']
+            ps_ratio = ticker_fundamentals['ps_ratio']
+        else:
+            logger.warning(f"No fundamentals snapshot stored for {ticker}; fundamental factors score neutral.")
         # ----------------------------------------------------
 
-        # 1. Get Gemini Sentiment Score for the target date
+        # 1. Get the latest Gemini Sentiment Score within ANALYSIS_STALENESS_DAYS of the target date
         cursor.execute("""
-            SELECT sentiment_score
+            SELECT sentiment_score, sentiment_source
             FROM news_articles
-            WHERE ticker = ? AND published_date = ?
-            ORDER BY fetched_date DESC LIMIT 1
-        """, (ticker, target_date_str))
+            WHERE ticker = ? AND published_date <= ? AND published_date > ?
+            ORDER BY published_date DESC, fetched_date DESC LIMIT 1
+        """, (ticker, target_date_str, sentiment_window_start))
         result = cursor.fetchone()
         gemini_sentiment = result['sentiment_score'] if result and result['sentiment_score'] is not None else 0.0
+        # Local-tier (and failed) analyses count less than Gemini's; NULL source = legacy Gemini rows
+        sentiment_weight = config.WEIGHT_SENTIMENT * (config.SENTIMENT_SOURCE_WEIGHTS.get(result['sentiment_source'] or 'gemini', 1.0) if result else 1.0)
         sentiment_pts = 0
         if gemini_sentiment > 0.15: sentiment_pts = config.SENTIMENT_POSITIVE_PTS
         elif gemini_sentiment < -0.15: sentiment_pts = config.SENTIMENT_NEGATIVE_PTS
         else: sentiment_pts = config.SENTIMENT_NEUTRAL_PTS
-        score += sentiment_pts * config.WEIGHT_SENTIMENT
-        score_details['sentiment'] = {'value': gemini_sentiment, 'pts': sentiment_pts, 'weighted_pts': sentiment_pts * config.WEIGHT_SENTIMENT}
+        score += sentiment_pts * sentiment_weight
+        score_details['sentiment'] = {'value': gemini_sentiment, 'pts': sentiment_pts, 'weighted_pts': sentiment_pts * sentiment_weight}
 
         # 2. Fetch Price History (including OHLC for ATR)
         cursor.execute("""
@@ -223,7 +213,7 @@ def calculate_scores_for_date(target_date_str):
 
             # 200-day SMA
             ma200_pts = 0
-            ma200_period = 200 # Define the period
+            ma200_period = config.MA200_PERIOD # Define the period
             if len(df) >= ma200_period:
                 df['SMA_200'] = df['close'].rolling(window=ma200_period).mean()
                 latest_price = df['close'].iloc[-1]
@@ -250,8 +240,11 @@ def calculate_scores_for_date(target_date_str):
             rsi_pts = 0
             if len(df) >= config.RSI_PERIOD + 1:
                 if not pd.api.types.is_datetime64_any_dtype(df.index): df.index = pd.to_datetime(df.index)
-                df.ta.rsi(length=config.RSI_PERIOD, append=True)
                 rsi_col_name = f'RSI_{config.RSI_PERIOD}'
+                if config.INDICATOR_BACKEND == 'pandas_ta':
+                    df.ta.rsi(length=config.RSI_PERIOD, append=True)
+                else:
+                    df[rsi_col_name] = indicators.rsi(df['close'].to_numpy(dtype=float), config.RSI_PERIOD)
                 if rsi_col_name in df.columns and not pd.isna(df[rsi_col_name].iloc[-1]):
                     rsi_value = df[rsi_col_name].iloc[-1]
                     # Apply graded points
@@ -279,9 +272,12 @@ def calculate_scores_for_date(target_date_str):
             # MACD
             macd_pts = 0
             if len(df) >= config.MACD_SLOW + config.MACD_SIGNAL:
-                df.ta.macd(fast=config.MACD_FAST, slow=config.MACD_SLOW, signal=config.MACD_SIGNAL, append=True)
                 macd_line_col = f'MACD_{config.MACD_FAST}_{config.MACD_SLOW}_{config.MACD_SIGNAL}'
                 signal_line_col = f'MACDs_{config.MACD_FAST}_{config.MACD_SLOW}_{config.MACD_SIGNAL}'
+                if config.INDICATOR_BACKEND == 'pandas_ta':
+                    df.ta.macd(fast=config.MACD_FAST, slow=config.MACD_SLOW, signal=config.MACD_SIGNAL, append=True)
+                else:
+                    df[macd_line_col], df[signal_line_col], _ = indicators.macd(df['close'].to_numpy(dtype=float), config.MACD_FAST, config.MACD_SLOW, config.MACD_SIGNAL)
                 if macd_line_col in df.columns and signal_line_col in df.columns and \
                    not pd.isna(df[macd_line_col].iloc[-1]) and not pd.isna(df[signal_line_col].iloc[-1]) and \
                    not pd.isna(df[macd_line_col].iloc[-2]) and not pd.isna(df[signal_line_col].iloc[-2]):
@@ -305,9 +301,12 @@ def calculate_scores_for_date(target_date_str):
             # Bollinger Bands
             bbands_pts = 0
             if len(df) >= config.BBANDS_PERIOD:
-                df.ta.bbands(length=config.BBANDS_PERIOD, std=config.BBANDS_STDDEV, append=True)
                 lower_band_col = f'BBL_{config.BBANDS_PERIOD}_{config.BBANDS_STDDEV}'
                 upper_band_col = f'BBU_{config.BBANDS_PERIOD}_{config.BBANDS_STDDEV}'
+                if config.INDICATOR_BACKEND == 'pandas_ta':
+                    df.ta.bbands(length=config.BBANDS_PERIOD, std=config.BBANDS_STDDEV, append=True)
+                else:
+                    df[lower_band_col], _, df[upper_band_col] = indicators.bbands(df['close'].to_numpy(dtype=float), config.BBANDS_PERIOD, config.BBANDS_STDDEV)
                 if lower_band_col in df.columns and upper_band_col in df.columns and \
                    not pd.isna(df['close'].iloc[-1]) and not pd.isna(df[lower_band_col].iloc[-1]) and \
                    not pd.isna(df['close'].iloc[-2]) and not pd.isna(df[lower_band_col].iloc[-2]) and \
@@ -332,9 +331,12 @@ def calculate_scores_for_date(target_date_str):
             # ATR (Average True Range)
             atr_pts = 0
             if len(df) >= config.ATR_PERIOD + 1: # Need enough data for ATR
-                # pandas_ta needs high, low, close columns
-                df.ta.atr(length=config.ATR_PERIOD, append=True)
                 atr_col_name = f'ATRr_{config.ATR_PERIOD}' # pandas_ta appends 'r' for range
+                if config.INDICATOR_BACKEND == 'pandas_ta':
+                    # pandas_ta needs high, low, close columns
+                    df.ta.atr(length=config.ATR_PERIOD, append=True)
+                else:
+                    df[atr_col_name] = indicators.atr(df['high'].to_numpy(dtype=float), df['low'].to_numpy(dtype=float), df['close'].to_numpy(dtype=float), config.ATR_PERIOD)
                 if atr_col_name in df.columns and not pd.isna(df[atr_col_name].iloc[-1]):
                     atr_value = df[atr_col_name].iloc[-1]
                     # Score ATR based on thresholds
@@ -451,12 +453,7 @@ def calculate_scores_for_date(target_date_str):
 
     # Insert all calculated scores into the database
     try:
-        cursor.executemany("""
-            INSERT OR REPLACE INTO daily_scores
-            (ticker, date, score, price_change_pct, volume_ratio, avg_sentiment, pe_ratio, dividend_yield, price_vs_ma50, rsi, macd_signal, bbands_signal, debt_to_equity, pb_ratio, ps_ratio, price_vs_ma200, atr_value, next_day_open_price, next_day_perf_pct)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, all_scores) # Added atr_value and next day perf columns
-        conn.commit()
+        database.upsert_daily_scores(conn, all_scores)
         logger.info(f"Successfully calculated and stored scores for {len(all_scores)} tickers.")
     except Exception as e:
         conn.rollback()
@@ -465,19 +462,46 @@ def calculate_scores_for_date(target_date_str):
     conn.close()
 
 
+def calculate_scores_for_range(from_date_str, to_date_str):
+    """
+    Backfills scores for every trading date between from_date_str and to_date_str
+    (inclusive) in one pass of the panel engine: prices are loaded once, each date's
+    indicators use its own SCORING_LOOKBACK_DAYS window (same rows as single-date runs)
+    and the rows are written with bulk upserts.
+    """
+    import panel_scorer
+    return panel_scorer.calculate_scores_for_range(from_date_str, to_date_str)
+
+
 if __name__ == '__main__':
-    import sys
-    # Get target date from command line argument, default to yesterday if not provided
-    if len(sys.argv) > 1:
-        target_date_str = sys.argv[1]
+    import argparse
+
+    def valid_date(value):
         try:
-            # Validate date format
-            datetime.strptime(target_date_str, '%Y-%m-%d')
+            datetime.strptime(value, '%Y-%m-%d')
         except ValueError:
-            logger.error(f"Invalid date format '{target_date_str}'. Please use YYYY-MM-DD.")
-            sys.exit(1)
+            raise argparse.ArgumentTypeError(f"Invalid date format '{value}'. Please use YYYY-MM-DD.")
+        return value
+
+    parser = argparse.ArgumentParser(description="Calculate daily scores for one date, or backfill a date range.")
+    parser.add_argument('date', nargs='?', type=valid_date, help="Date to score (YYYY-MM-DD). Defaults to yesterday.")
+    parser.add_argument('--from', dest='from_date', type=valid_date, help="Backfill: first date to score (YYYY-MM-DD).")
+    parser.add_argument('--to', dest='to_date', type=valid_date, help="Backfill: last date to score (YYYY-MM-DD). Defaults to yesterday.")
+    args = parser.parse_args()
+
+    yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+    if args.from_date:
+        if args.date:
+            parser.error("Pass either a single date or --from/--to, not both.")
+        to_date = args.to_date or yesterday
+        if args.from_date > to_date:
+            parser.error(f"--from {args.from_date} is after --to {to_date}.")
+        calculate_scores_for_range(args.from_date, to_date)
+    elif args.to_date:
+        parser.error("--to requires --from.")
     else:
-        target_date_str = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-        logger.info(f"No date provided, defaulting to yesterday: {target_date_str}")
-
-    calculate_scores_for_date(target_date_str)
+        target_date_str = args.date
+        if not target_date_str:
+            target_date_str = yesterday
+            logger.info(f"No date provided, defaulting to yesterday: {target_date_str}")
+        calculate_scores_for_date(target_date_str)
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta, date
+import config # Import the config file
+import database # Import database functions
+from analysis_cache import normalize_url
+
+
+def url_hash(url):
+    """SHA-256 of the normalized URL; the search_results key shared by all tickers."""
+    return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+
+
+class SearchResultStore:
+    """
+    Brave search results kept in the database (search_results, ticker_search_results,
+    search_query_cache), deduplicated by URL across tickers and days.
+
+    - A query answered by Brave within SEARCH_QUERY_TTL_HOURS is served from the store
+      instead of calling Brave again.
+    - Each ticker's links remember which results were part of a successful analysis, so
+      only results the model has not read for that ticker are sent on the next run. When
+      a ticker has nothing new, its latest analysis stays current (last_analyzed_date).
+
+    Loaded once per run and written back on save(), like the JSON caches. Entries not
+    seen for SEARCH_RESULT_RETENTION_DAYS are pruned on save().
+    """
+
+    def __init__(self, query_ttl_hours=None, retention_days=None):
+        self.query_ttl = timedelta(hours=query_ttl_hours or config.SEARCH_QUERY_TTL_HOURS)
+        self.retention = timedelta(days=retention_days or config.SEARCH_RESULT_RETENTION_DAYS)
+        self._results = {} # url_hash -> {'url', 'title', 'snippet', 'page_age', 'first_seen', 'last_seen'}
+        self._queries = {} # query -> {'url_hashes': [...], 'fetched_at': iso}
+        self._analyzed = {} # ticker -> {url_hash: analyzed_date}
+        self._links = {} # (ticker, url_hash) -> {'last_seen', 'analyzed_date'} touched this run
+        self._dirty_results = set()
+        self._dirty_queries = set()
+        self._run_tickers_by_url = {} # url_hash -> tickers whose searches returned it this run
+        self._lock = threading.Lock()
+        self.stats = {'query_hits': 0, 'query_misses': 0, 'new_results': 0, 'known_results': 0, 'unchanged_tickers': 0}
+
+    @staticmethod
+    def _now():
+        return datetime.now().isoformat(timespec='seconds')
+
+    def load(self, conn=None):
+        """Loads fresh query responses, their results and each ticker's analyzed links."""
+        own_conn = conn is None
+        conn = conn or database.get_db_connection()
+        try:
+            now = datetime.now()
+            query_cutoff = (now - self.query_ttl).isoformat(timespec='seconds')
+            retention_cutoff = (now - self.retention).strftime('%Y-%m-%d')
+            cursor = conn.cursor()
+            cursor.execute("SELECT query, url_hashes, fetched_at FROM search_query_cache WHERE fetched_at >= ?", (query_cutoff,))
+            self._queries = {row['query']: {'url_hashes': json.loads(row['url_hashes']), 'fetched_at': row['fetched_at']}
+                             for row in cursor.fetchall()}
+            # Results of a fresh query were last seen when that query ran
+            cursor.execute("SELECT * FROM search_results WHERE last_seen >= ?", (query_cutoff,))
+            self._results = {row['url_hash']: {key: row[key] for key in ('url', 'title', 'snippet', 'page_age', 'first_seen', 'last_seen')}
+                             for row in cursor.fetchall()}
+            cursor.execute("SELECT ticker, url_hash, analyzed_date FROM ticker_search_results WHERE analyzed_date >= ?", (retention_cutoff,))
+            self._analyzed = {}
+            for row in cursor.fetchall():
+                self._analyzed.setdefault(row['ticker'], {})[row['url_hash']] = row['analyzed_date']
+        finally:
+            if own_conn:
+                conn.close()
+        return self
+
+    def save(self, conn=None):
+        """Writes the results, links and query responses touched this run, then prunes old entries."""
+        own_conn = conn is None
+        conn = conn or database.get_db_connection()
+        try:
+            with self._lock:
+                result_rows = [(h, r['url'], r['title'], r['snippet'], r['page_age'], r['first_seen'], r['last_seen'])
+                               for h, r in self._results.items() if h in self._dirty_results]
+                link_rows = [(ticker, h, link['last_seen'], link['last_seen'], link['analyzed_date'])
+                             for (ticker, h), link in self._links.items()]
+                query_rows = [(q, json.dumps(self._queries[q]['url_hashes']), self._queries[q]['fetched_at']) for q in self._dirty_queries]
+                self._dirty_results.clear()
+                self._dirty_queries.clear()
+                self._links = {}
+            cursor = conn.cursor()
+            cursor.executemany("""
+                INSERT INTO search_results (url_hash, url, title, snippet, page_age, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url_hash) DO UPDATE SET
+                    title = excluded.title, snippet = excluded.snippet, page_age = excluded.page_age, last_seen = excluded.last_seen
+            """, result_rows)
+            cursor.executemany("""
+                INSERT INTO ticker_search_results (ticker, url_hash, first_seen, last_seen, analyzed_date)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(ticker, url_hash) DO UPDATE SET
+                    last_seen = excluded.last_seen,
+                    analyzed_date = COALESCE(excluded.analyzed_date, ticker_search_results.analyzed_date)
+            """, link_rows)
+            cursor.executemany("INSERT OR REPLACE INTO search_query_cache (query, url_hashes, fetched_at) VALUES (?, ?, ?)", query_rows)
+
+            now = datetime.now()
+            retention_cutoff = (now - self.retention).isoformat(timespec='seconds')
+            cursor.execute("DELETE FROM search_query_cache WHERE fetched_at < ?", ((now - self.query_ttl).isoformat(timespec='seconds'),))
+            cursor.execute("DELETE FROM ticker_search_results WHERE last_seen < ?", (retention_cutoff,))
+            cursor.execute("DELETE FROM search_results WHERE last_seen < ?", (retention_cutoff,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if own_conn:
+                conn.close()
+
+    def get_query(self, query):
+        """Returns the stored results of a query answered within the TTL (recording a hit), or None (recording a miss)."""
+        with self._lock:
+            entry = self._queries.get(query)
+            if entry is None or entry['fetched_at'] < (datetime.now() - self.query_ttl).isoformat(timespec='seconds'):
+                self.stats['query_misses'] += 1
+                return None
+            self.stats['query_hits'] += 1
+            return [{'title': r['title'], 'snippet': r['snippet'], 'url': r['url'], 'date': r['page_age']}
+                    for r in (self._results[h] for h in entry['url_hashes'] if h in self._results)]
+
+    def put_query(self, query, results):
+        """Stores a Brave response: its results (deduplicated by URL) and the query's result order."""
+        now = self._now()
+        hashes = []
+        with self._lock:
+            for result in results:
+                if not result.get('url'):
+                    continue
+                h = url_hash(result['url'])
+                known = self._results.get(h)
+                self._results[h] = {'url': result['url'], 'title': result.get('title'), 'snippet': result.get('snippet'),
+                                    'page_age': result.get('date'), 'first_seen': known['first_seen'] if known else now, 'last_seen': now}
+                self._dirty_results.add(h)
+                hashes.append(h)
+            self._queries[query] = {'url_hashes': hashes, 'fetched_at': now}
+            self._dirty_queries.add(query)
+
+    def new_results(self, ticker, results):
+        """
+        Links the ticker to its collected results and returns those not yet part of a
+        successful analysis for it, in their original order.
+        """
+        now = self._now()
+        new = []
+        with self._lock:
+            analyzed = self._analyzed.get(ticker, {})
+            for result in results:
+                h = url_hash(result.get('url'))
+                if h not in self._results: # Collected without put_query (e.g. standalone use)
+                    self._results[h] = {'url': result.get('url'), 'title': result.get('title'), 'snippet': result.get('snippet'),
+                                        'page_age': result.get('date'), 'first_seen': now, 'last_seen': now}
+                    self._dirty_results.add(h)
+                link = self._links.setdefault((ticker, h), {'last_seen': now, 'analyzed_date': None})
+                link['last_seen'] = now
+                self._run_tickers_by_url.setdefault(h, set()).add(ticker)
+                if h in analyzed:
+                    self.stats['known_results'] += 1
+                else:
+                    self.stats['new_results'] += 1
+                    new.append(result)
+            if results and not new:
+                self.stats['unchanged_tickers'] += 1
+        return new
+
+    def mark_analyzed(self, ticker, results, analysis_date_str=None):
+        """Records that results were part of a successful analysis of the ticker."""
+        analysis_date_str = analysis_date_str or date.today().strftime('%Y-%m-%d')
+        now = self._now()
+        with self._lock:
+            analyzed = self._analyzed.setdefault(ticker, {})
+            for result in results:
+                h = url_hash(result.get('url'))
+                analyzed[h] = analysis_date_str
+                link = self._links.setdefault((ticker, h), {'last_seen': now, 'analyzed_date': None})
+                link['analyzed_date'] = analysis_date_str
+
+    def last_analyzed_date(self, ticker):
+        """YYYY-MM-DD of the ticker's latest successful analysis recorded in the store, or None."""
+        with self._lock:
+            dates = self._analyzed.get(ticker)
+            return max(dates.values()) if dates else None
+
+    def log_stats(self, logger):
+        """Logs Brave calls served from the store, new vs already analyzed results and cross-ticker URL overlap."""
+        s = self.stats
+        lookups = s['query_hits'] + s['query_misses']
+        if lookups:
+            logger.info(f"Search store: {s['query_hits']}/{lookups} queries served from the store ({s['query_hits'] / lookups:.0%}); "
+                        f"{s['query_hits']} Brave calls saved.")
+        collected = s['new_results'] + s['known_results']
+        if collected:
+            shared = sum(1 for tickers in self._run_tickers_by_url.values() if len(tickers) > 1)
+            logger.info(f"Search store: {s['new_results']}/{collected} collected results were new ({s['known_results']} already analyzed); "
+                        f"{s['unchanged_tickers']} tickers had nothing new and kept their latest analysis; "
+                        f"{shared} URLs were returned for more than one ticker.")
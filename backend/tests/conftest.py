@@ -0,0 +1,5 @@
+"""Makes the backend modules importable the way the scripts import them (import config, import indicators, ...)."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,52 @@
+"""The analytics engines on a small synthetic database, including a date range without any rows."""
+import contextlib
+import os
+import pytest
+import analytics
+import database
+import generate_synthetic_db
+
+pytestmark = pytest.mark.filterwarnings('error::FutureWarning') # pandas deprecations, e.g. downcasting on empty frames
+ENGINES = ['pandas', pytest.param('duckdb', marks=pytest.mark.skipif(not analytics.duckdb_available(), reason="duckdb is not installed"))]
+EMPTY_RANGE = ('1990-01-01', '1990-12-31')
+
+
+@pytest.fixture(scope='module')
+def db_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('analytics') / 'stocks.db')
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        generate_synthetic_db.generate(path, 20, 120, news_days=60, score_days=40)
+    return path
+
+@pytest.fixture(params=ENGINES)
+def engine(request, db_path):
+    engine = analytics.open_engine(request.param, db_path=db_path)
+    yield engine
+    engine.close()
+
+def score_range(db_path):
+    conn = database.connect(db_path, readonly=True)
+    first, last, count = conn.execute(
+        "SELECT MIN(date), MAX(date), COUNT(*) FROM daily_scores WHERE next_day_perf_pct IS NOT NULL").fetchone()
+    conn.close()
+    return first, last, count
+
+
+def test_empty_range(engine):
+    buckets = engine.score_buckets(*EMPTY_RANGE)
+    assert list(buckets.index) == analytics.BUCKET_LABELS
+    assert buckets['count'].dtype == int
+    assert (buckets['count'] == 0).all()
+    assert buckets['average_next_day_perf'].isna().all()
+    assert engine.score_quantiles(*EMPTY_RANGE).empty
+    assert engine.trailing_returns(*EMPTY_RANGE).empty
+
+def test_score_buckets_count_every_row(engine, db_path):
+    first, last, count = score_range(db_path)
+    assert count
+    buckets = engine.score_buckets(first, last)
+    assert buckets['count'].dtype == int
+    assert buckets['count'].sum() == count
+    quantiles = engine.score_quantiles(first, last, n_quantiles=5)
+    assert quantiles['count'].sum() == count
+    assert set(quantiles['quantile']) == {1, 2, 3, 4, 5}
@@ -0,0 +1,140 @@
+"""
+Parity of the NumPy kernels in indicators.py with pandas_ta 0.3.14b0, the library they
+replace. Needs the dev requirements (requirements-dev.txt); skipped without pandas_ta.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import config
+import indicators
+
+ta = pytest.importorskip("pandas_ta")
+
+RTOL = 1e-9
+ATOL = 1e-9
+SHORT_LENGTHS = (1, 2, 5, 13) # Shorter than every indicator period: pandas_ta returns None
+
+
+def random_walk(n_days, rng):
+    """OHLC arrays of a lognormal random walk."""
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.03, n_days)))
+    open_ = close * (1 + rng.normal(0, 0.01, n_days))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, n_days)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, n_days)))
+    return {'open': open_, 'high': high, 'low': low, 'close': close}
+
+def realistic(n_days, rng):
+    """A random walk rounded to cents, with trading halts (zero range, unchanged close)."""
+    bars = {field: np.round(values, 2) for field, values in random_walk(n_days, rng).items()}
+    halted = rng.random(n_days) < 0.03
+    halted[0] = False
+    bars['close'][halted] = np.roll(bars['close'], 1)[halted]
+    for field in ('open', 'high', 'low'):
+        bars[field][halted] = bars['close'][halted]
+    return bars
+
+SHAPES = {'random': random_walk, 'realistic': realistic}
+
+
+def _select(frame, *prefixes):
+    if frame is None:
+        return None
+    return [frame[next(column for column in frame.columns if column.startswith(prefix))] for prefix in prefixes]
+
+# name -> (NumPy kernel of OHLC arrays, pandas_ta reference of OHLC Series); both return a list of lines
+CASES = {
+    'sma': (lambda a: [indicators.sma(a['close'], config.MA_PERIOD)],
+            lambda s: [ta.sma(s['close'], length=config.MA_PERIOD, talib=False)]),
+    'ema': (lambda a: [indicators.ema(a['close'], config.MACD_SLOW)],
+            lambda s: [ta.ema(s['close'], length=config.MACD_SLOW, talib=False)]),
+    'rsi': (lambda a: [indicators.rsi(a['close'], config.RSI_PERIOD)],
+            lambda s: [ta.rsi(s['close'], length=config.RSI_PERIOD, talib=False)]),
+    'macd': (lambda a: list(indicators.macd(a['close'], config.MACD_FAST, config.MACD_SLOW, config.MACD_SIGNAL)),
+             lambda s: _select(ta.macd(s['close'], fast=config.MACD_FAST, slow=config.MACD_SLOW, signal=config.MACD_SIGNAL, talib=False),
+                               'MACD_', 'MACDs_', 'MACDh_')),
+    'bbands': (lambda a: list(indicators.bbands(a['close'], config.BBANDS_PERIOD, config.BBANDS_STDDEV)),
+               lambda s: _select(ta.bbands(s['close'], length=config.BBANDS_PERIOD, std=config.BBANDS_STDDEV, talib=False),
+                                 'BBL_', 'BBM_', 'BBU_')),
+    'atr': (lambda a: [indicators.atr(a['high'], a['low'], a['close'], config.ATR_PERIOD)],
+            lambda s: [ta.atr(s['high'], s['low'], s['close'], length=config.ATR_PERIOD, talib=False)]),
+}
+
+def reference(name, bars):
+    """pandas_ta's lines for one series as float arrays, or None when pandas_ta returns None."""
+    if not _computes(name, len(bars['close'])):
+        return None
+    result = CASES[name][1]({field: pd.Series(values) for field, values in bars.items()})
+    if result is None or any(line is None for line in result):
+        return None
+    return [line.to_numpy(dtype=float) for line in result]
+
+def _computes(name, n_days):
+    """
+    False where pandas_ta raises instead of returning None: its MACD gets a signal EMA of
+    None when the MACD line has fewer than `signal` values and fails on the histogram.
+    """
+    if name == 'macd':
+        return not config.MACD_SLOW <= n_days < config.MACD_SLOW + config.MACD_SIGNAL - 1
+    return True
+
+def assert_lines_match(actual, expected):
+    assert len(actual) == len(expected)
+    for actual_line, expected_line in zip(actual, expected):
+        np.testing.assert_allclose(actual_line, expected_line, rtol=RTOL, atol=ATOL, equal_nan=True)
+
+
+@pytest.mark.parametrize('name', CASES)
+@pytest.mark.parametrize('shape', SHAPES)
+@pytest.mark.parametrize('n_days', [60, 127, 400])
+def test_1d_matches_pandas_ta(name, shape, n_days):
+    bars = SHAPES[shape](n_days, np.random.default_rng(n_days))
+    expected = reference(name, bars)
+    assert expected is not None
+    assert_lines_match(CASES[name][0](bars), expected)
+
+@pytest.mark.parametrize('name', CASES)
+@pytest.mark.parametrize('shape', SHAPES)
+def test_2d_columns_match_pandas_ta_per_series(name, shape):
+    """Each panel column, padded with leading NaN to the panel length, equals pandas_ta on that series alone."""
+    rng = np.random.default_rng(11)
+    lengths = [300, 250, 120, 61, 300]
+    n_rows = max(lengths)
+    series = [SHAPES[shape](n_days, rng) for n_days in lengths]
+    panel = {field: np.full((n_rows, len(series)), np.nan) for field in ('open', 'high', 'low', 'close')}
+    for j, bars in enumerate(series):
+        for field, values in bars.items():
+            panel[field][n_rows - len(values):, j] = values
+    actual = CASES[name][0](panel)
+    for j, bars in enumerate(series):
+        expected = reference(name, bars)
+        assert expected is not None
+        padding = np.full(n_rows - len(bars['close']), np.nan)
+        assert_lines_match([line[:, j] for line in actual], [np.concatenate([padding, line]) for line in expected])
+
+@pytest.mark.parametrize('name', CASES)
+def test_leading_nan_1d_matches_unpadded_series(name):
+    bars = realistic(200, np.random.default_rng(5))
+    padded = {field: np.concatenate([np.full(37, np.nan), values]) for field, values in bars.items()}
+    expected = reference(name, bars)
+    assert_lines_match([line[37:] for line in CASES[name][0](padded)], expected)
+    assert all(np.isnan(line[:37]).all() for line in CASES[name][0](padded))
+
+@pytest.mark.parametrize('name', CASES)
+@pytest.mark.parametrize('n_days', SHORT_LENGTHS)
+def test_short_series_are_all_nan(name, n_days):
+    bars = random_walk(n_days, np.random.default_rng(n_days))
+    assert reference(name, bars) is None
+    for line in CASES[name][0](bars):
+        assert line.shape == (n_days,)
+        assert np.isnan(line).all()
+
+@pytest.mark.parametrize('name', CASES)
+def test_all_nan_and_empty_columns(name):
+    """A panel column without any data stays all-NaN and does not disturb its neighbours."""
+    bars = random_walk(150, np.random.default_rng(2))
+    panel = {field: np.column_stack([values, np.full(150, np.nan)]) for field, values in bars.items()}
+    actual = CASES[name][0](panel)
+    assert_lines_match([line[:, 0] for line in actual], reference(name, bars))
+    assert all(np.isnan(line[:, 1]).all() for line in actual)
+    empty = {field: np.empty((0, 3)) for field in bars}
+    assert all(line.shape == (0, 3) for line in CASES[name][0](empty))
@@ -0,0 +1,42 @@
+"""A range backfill writes the same daily_scores rows as single-date runs of the same dates."""
+import contextlib
+import os
+import pytest
+import database
+import generate_synthetic_db
+import panel_scorer
+
+
+@pytest.fixture(scope='module')
+def price_dates(tmp_path_factory):
+    db_path = str(tmp_path_factory.mktemp('panel') / 'stocks.db')
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        generate_synthetic_db.generate(db_path, 30, 320, news_days=200, score_days=0)
+    original_path = database.DATABASE_NAME
+    database.DATABASE_NAME = db_path
+    conn = database.get_db_connection()
+    dates = [row['date'] for row in conn.execute("SELECT DISTINCT date FROM price_history ORDER BY date")]
+    conn.close()
+    yield dates
+    database.close_connections()
+    database.DATABASE_NAME = original_path
+
+def stored_rows(dates):
+    conn = database.get_db_connection()
+    rows = {date: [tuple(row) for row in conn.execute("SELECT * FROM daily_scores WHERE date = ? ORDER BY ticker", (date,))]
+            for date in dates}
+    conn.close()
+    return rows
+
+
+@pytest.mark.parametrize('first, last', [(0, 25), (150, 230), (300, 320)]) # History shorter than the window, two chunks, the latest dates
+def test_range_matches_single_dates(price_dates, first, last):
+    dates = price_dates[first:last]
+    panel_scorer.calculate_scores_for_range(dates[0], dates[-1])
+    backfilled = stored_rows(dates)
+    for date in dates:
+        panel_scorer.calculate_scores_for_date(date)
+    single = stored_rows(dates)
+    assert all(backfilled[date] for date in dates)
+    for date in dates:
+        assert backfilled[date] == single[date], date
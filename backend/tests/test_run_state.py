@@ -0,0 +1,56 @@
+"""A checkpoint is only recorded as done once the data it describes has been written."""
+import contextlib
+import os
+import pytest
+import database
+import fetch_engine
+import run_state
+from data_fetcher import store_price_rows
+
+TRADING_DATE = '2024-03-01'
+GOOD_ROWS = [('GOOD', '2024-02-29', 10.0, 11.0, 9.5, 10.5, 1000), ('GOOD', '2024-03-01', 10.5, 11.5, 10.0, 11.0, 1200)]
+BAD_ROWS = [('BAD', '2024-03-01', 10.0)] # Too few columns: the upsert raises
+
+
+@pytest.fixture
+def db(tmp_path):
+    original_path = database.DATABASE_NAME
+    database.DATABASE_NAME = str(tmp_path / 'stocks.db')
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        database.init_db()
+    yield
+    database.close_connections()
+    database.DATABASE_NAME = original_path
+
+def stored_tickers():
+    conn = database.get_db_connection()
+    tickers = {row['ticker'] for row in conn.execute("SELECT DISTINCT ticker FROM price_history")}
+    conn.close()
+    return tickers
+
+
+def test_failed_write_leaves_ticker_pending(db):
+    run = run_state.PipelineRun.start(TRADING_DATE)
+    with fetch_engine.DBWriter() as writer:
+        run.store_and_mark('prices', ['GOOD'], run_state.DONE, store_price_rows, GOOD_ROWS, writer=writer)
+        run.store_and_mark('prices', ['BAD'], run_state.DONE, store_price_rows, BAD_ROWS, writer=writer)
+        writer.flush()
+        assert run.failed('prices') == ['BAD'] # Seen by the in-run retry pass
+    assert writer.failed == 1
+    assert stored_tickers() == {'GOOD'}
+
+    resumed = run_state.PipelineRun.start(TRADING_DATE, resume=True)
+    assert resumed.run_id == run.run_id
+    assert resumed.pending('prices', ['GOOD', 'BAD']) == ['BAD']
+
+def test_status_is_set_only_after_the_write(db):
+    run = run_state.PipelineRun.start(TRADING_DATE)
+    seen = []
+
+    def write(conn):
+        seen.append(run.pending('analysis', ['GOOD']))
+
+    run.store_and_mark('analysis', ['GOOD'], run_state.DONE, write)
+    assert seen == [['GOOD']]
+    assert run.pending('analysis', ['GOOD']) == []
+    assert run_state.PipelineRun.start(TRADING_DATE, resume=True).pending('analysis', ['GOOD']) == []
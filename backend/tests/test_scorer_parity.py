@@ -0,0 +1,42 @@
+"""The panel engine stores the same daily_scores rows as the per-ticker reference path."""
+import contextlib
+import os
+import pytest
+import database
+import generate_synthetic_db
+import panel_scorer
+import scorer
+
+
+@pytest.fixture(scope='module')
+def price_dates(tmp_path_factory):
+    db_path = str(tmp_path_factory.mktemp('parity') / 'stocks.db')
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        generate_synthetic_db.generate(db_path, 20, 300, news_days=200, score_days=0)
+    original_path = database.DATABASE_NAME
+    database.DATABASE_NAME = db_path
+    conn = database.get_db_connection()
+    dates = [row['date'] for row in conn.execute("SELECT DISTINCT date FROM price_history ORDER BY date")]
+    conn.close()
+    yield dates
+    database.close_connections()
+    database.DATABASE_NAME = original_path
+
+def stored_rows(date):
+    conn = database.get_db_connection()
+    rows = [tuple(row) for row in conn.execute("SELECT * FROM daily_scores WHERE date = ? ORDER BY ticker", (date,))]
+    conn.execute("DELETE FROM daily_scores WHERE date = ?", (date,))
+    conn.commit()
+    conn.close()
+    return rows
+
+
+@pytest.mark.parametrize('index', [30, 150, 298, 299]) # History shorter than the lookback, mid-range, the last two dates (no next-day open on the last)
+def test_panel_matches_per_ticker(price_dates, index):
+    date = price_dates[index]
+    scorer.calculate_scores_per_ticker(date)
+    per_ticker = stored_rows(date)
+    panel_scorer.calculate_scores_for_date(date)
+    panel = stored_rows(date)
+    assert per_ticker
+    assert panel == per_ticker